@@ -0,0 +1,91 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from lib.audio_features import extract_audio_features
+from lib.vad import vad
+from models.SoundCalibrator import SoundCalibrator
+
+# Per inbound frame cost of the audio features work in Peer.tap_audio_stream and its consumers,
+# against the per-consumer math it replaced
+#
+#   python benchmarks/audio_features_cost.py
+#   python benchmarks/audio_features_cost.py --frames 100000
+
+FRAME_SAMPLES = 960  # 20 ms at 48 kHz
+
+
+# Before - SpeechToText's vad converted to float32 and summed squares, SoundCalibrator summed int16 squares
+def vad_before(audio_data, energy_threshold=0.001):
+    audio_data = np.asarray(audio_data, dtype=np.float32)
+    max_energy = len(audio_data) * (32767 ** 2)
+    return np.sum(audio_data ** 2) > max_energy * energy_threshold
+
+
+def calibration_energy_before(audio_data):
+    return np.sum(audio_data ** 2)
+
+
+# Eager - the first fused version, which also computed peak and zero-crossing rate on every frame
+def features_eager(audio_data):
+    samples = np.asarray(audio_data, dtype=np.float64)
+    energy = float(np.dot(samples, samples))
+    peak = float(np.max(np.abs(samples)))
+    signs = np.signbit(samples)
+    return energy, peak, np.count_nonzero(signs[1:] != signs[:-1]) / len(samples)
+
+
+def time_per_frame(work, frames) -> float:
+    start = time.perf_counter()
+    for frame in frames:
+        work(frame)
+    return (time.perf_counter() - start) / len(frames) * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per frame audio features cost")
+    parser.add_argument("--frames", type=int, default=50_000)
+    args = parser.parse_args()
+
+    # Frames as tap_audio_stream sees them - the left channel of an interleaved stereo frame
+    rng = np.random.default_rng(7)
+    interleaved = rng.normal(0, 3000, (256, FRAME_SAMPLES * 2)).clip(-32768, 32767).astype(np.int16)
+    frames = [interleaved[index % 256][::2] for index in range(args.frames)]
+    calibrator = SoundCalibrator()
+    calibrator.on("measurement", lambda measurement: None)
+
+    def before(frame):
+        vad_before(frame)
+
+    def before_calibrating(frame):
+        vad_before(frame)
+        calibration_energy_before(frame)
+
+    def eager(frame):
+        energy, _, _ = features_eager(frame)
+        return energy > FRAME_SAMPLES * 32767 ** 2 * 0.001
+
+    def fused(frame):
+        vad(energy_threshold=0.001, features=extract_audio_features(frame))
+
+    def fused_calibrating(frame):
+        features = extract_audio_features(frame)
+        vad(energy_threshold=0.001, features=features)
+        calibrator.add_audio_data(frame, features=features)
+
+    for name, work in (
+        ("before: vad", before),
+        ("before: vad + calibration", before_calibrating),
+        ("eager fused: vad", eager),
+        ("fused: vad", fused),
+        ("fused: vad + calibration", fused_calibrating),
+    ):
+        print(f"{name:<28} {time_per_frame(work, frames):6.2f} us per frame")
+
+
+if __name__ == "__main__":
+    main()
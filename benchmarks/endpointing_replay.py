@@ -0,0 +1,228 @@
+import argparse
+import asyncio
+import os
+import random
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from models.AdaptiveEndpointer import AdaptiveEndpointer
+from models.SpeechToText import SpeechToText
+
+# Replays caller audio through SpeechToText and reports when each turn was finalized:
+#   endpoint delay - end of the turn's last voiced audio to the finalize request (median and p95)
+#   false cuts     - turns finalized at a pause inside the turn, before the caller had finished
+#
+#   python benchmarks/endpointing_replay.py                                   # synthesized turns
+#   python benchmarks/endpointing_replay.py --pcm caller.pcm --turn-ends 2.1,5.8,9.4
+#
+# --pcm takes a 48 kHz mono int16 file, e.g. a ConversationRecorder <source>.pcm, with the end of every
+# turn in seconds. Synthesized turns are 1-4 phrases separated by thinking pauses. Phrases that end a
+# turn usually fade out and get a complete partial transcript; phrases that don't usually stop at full
+# energy and end on a continuation word. Those rates are the assumptions the results depend on.
+
+SAMPLE_RATE = 48000
+FRAME_SAMPLES = 960  # 20 ms
+PARTIAL_LATENCY_MS = 150
+
+
+class Turn:
+    def __init__(self, phrases: list, pauses: list):
+        self.phrases = phrases  # [(samples, text)]
+        self.pauses = pauses  # Silence after each phrase but the last, in samples
+
+
+# Synthesize Phrase - harmonic syllables at a declining pitch, optionally fading out at the end
+def synthesize_phrase(rng: random.Random, fades: bool) -> np.ndarray:
+    syllables = []
+    pitch = rng.uniform(100, 220)
+    level = rng.uniform(2500, 7000)
+    for index in range(rng.randint(2, 14)):
+        length = int(SAMPLE_RATE * rng.uniform(0.12, 0.3))
+        t = np.arange(length) / SAMPLE_RATE
+        phase = 2 * np.pi * pitch * t
+        voiced = sum(np.sin(harmonic * phase) / harmonic for harmonic in range(1, 8))
+        envelope = np.sin(np.pi * np.arange(length) / length) ** 0.5
+        syllables.append(voiced * envelope * level * rng.uniform(0.7, 1.2))
+        pitch *= 0.985
+    phrase = np.concatenate(syllables)
+    if fades:
+        tail = min(len(phrase), int(SAMPLE_RATE * 0.4))
+        phrase[-tail:] *= np.linspace(1, 0.2, tail)
+    return phrase
+
+
+def synthesize_turns(count: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    turns = []
+    for _ in range(count):
+        phrase_count = rng.choice([1, 1, 2, 2, 3, 4])
+        phrases, pauses = [], []
+        for index in range(phrase_count):
+            last = index == phrase_count - 1
+            fades = rng.random() < (0.75 if last else 0.3)
+            if last:
+                text = rng.choice(["that's all.", "thanks.", "can you do that?", "yes.", "no, I'm good"])
+            else:
+                text = rng.choice(["I want to", "and then", "so, um", "because", "well,", "okay."])
+            phrases.append((synthesize_phrase(rng, fades), text))
+            if not last:
+                # Thinking pauses - mostly short, a few longer than a second
+                pauses.append(int(SAMPLE_RATE * min(rng.lognormvariate(np.log(0.45), 0.5), 1.6)))
+        turns.append(Turn(phrases, pauses))
+    return turns
+
+
+class ReplayStream:
+    # Stands in for the transcription stream on the replay's sample clock
+    def __init__(self, replay: "Replay"):
+        self.replay = replay
+
+    async def add_audio_data(self, id, audio_data, sample_rate=None):
+        pass
+
+    async def partial_transcription(self, id, sample_rate):
+        text = self.replay.transcript_so_far()
+        due = self.replay.position + SAMPLE_RATE * PARTIAL_LATENCY_MS // 1000
+        future = asyncio.get_running_loop().create_future()
+        self.replay.pending_partials.append((due, future, text))
+        return await future
+
+    async def finalize_transcription(self, id, sample_rate):
+        self.replay.finalized.append(self.replay.position)
+        return None
+
+    async def cancel_transcription(self, id):
+        self.replay.cancelled.append(self.replay.position)
+
+    def enqueue_cancel(self, id):
+        pass
+
+    def close(self):
+        pass
+
+
+class Replay:
+    def __init__(self, audio: np.ndarray, turn_ends: list, transcripts: list):
+        self.audio = audio
+        self.turn_ends = turn_ends  # Sample position where each turn's last phrase ends
+        self.transcripts = transcripts  # [(position, text so far)] sorted by position
+        self.position = 0
+        self.pending_partials = []
+        self.finalized = []
+        self.cancelled = []
+
+    def transcript_so_far(self):
+        text = None
+        for position, transcript in self.transcripts:
+            if position > self.position:
+                break
+            text = transcript
+        return text
+
+    async def run(self, speech_to_text: SpeechToText):
+        speech_to_text.transcription_service = ReplayStream(self)
+
+        async def ignore(*args):
+            pass
+        for event in ("speech_detected", "partial_speech_detected", "is_speaking_status"):
+            speech_to_text.on(event, ignore)
+
+        for start in range(0, len(self.audio) - FRAME_SAMPLES + 1, FRAME_SAMPLES):
+            self.position = start + FRAME_SAMPLES
+            for item in [item for item in self.pending_partials if item[0] <= self.position]:
+                self.pending_partials.remove(item)
+                if not item[1].done():
+                    item[1].set_result(item[2])
+            await speech_to_text.add_audio_data(self.audio[start:start + FRAME_SAMPLES], SAMPLE_RATE)
+            for _ in range(3):
+                await asyncio.sleep(0)
+
+    # Score - endpoint delay of each turn and whether it was cut early
+    def score(self, turn_starts: list) -> tuple:
+        delays, false_cuts = [], 0
+        for turn_start, turn_end in zip(turn_starts, self.turn_ends):
+            if any(turn_start < position < turn_end for position in self.finalized):
+                false_cuts += 1
+            after = [position for position in self.finalized if position >= turn_end]
+            if after:
+                delays.append((after[0] - turn_end) * 1000 / SAMPLE_RATE)
+        return delays, false_cuts
+
+
+def build_synthesized(turn_count: int, seed: int):
+    rng = np.random.default_rng(seed)
+    chunks, turn_starts, turn_ends, transcripts = [], [], [], []
+    position = 0
+
+    def append(samples):
+        nonlocal position
+        chunks.append(samples)
+        position += len(samples)
+
+    append(np.zeros(SAMPLE_RATE))
+    for turn in synthesize_turns(turn_count, seed):
+        turn_starts.append(position)
+        words = []
+        for index, (phrase, text) in enumerate(turn.phrases):
+            append(phrase)
+            words.append(text)
+            transcripts.append((position, " ".join(words)))
+            if index < len(turn.pauses):
+                append(np.zeros(turn.pauses[index]))
+        turn_ends.append(position)
+        append(np.zeros(SAMPLE_RATE * 3))  # The agent answers
+    audio = np.concatenate(chunks)
+    audio = audio + rng.normal(0, 60, len(audio))  # Line noise, far below the VAD threshold
+    return np.clip(audio, -32768, 32767).astype(np.int16), turn_starts, turn_ends, transcripts
+
+
+def build_recorded(pcm_path: str, turn_end_seconds: list):
+    audio = np.fromfile(pcm_path, dtype=np.int16)
+    turn_ends = [int(seconds * SAMPLE_RATE) for seconds in turn_end_seconds]
+    turn_starts = [0] + turn_ends[:-1]
+    return audio, turn_starts, turn_ends, []
+
+
+def percentile(values: list, q: float) -> float:
+    return float(np.percentile(values, q)) if values else float("nan")
+
+
+async def replay_config(name: str, make_speech_to_text, audio, turn_starts, turn_ends, transcripts):
+    replay = Replay(audio, turn_ends, transcripts)
+    await replay.run(make_speech_to_text())
+    delays, false_cuts = replay.score(turn_starts)
+    print(
+        f"{name:<34} median {percentile(delays, 50):6.0f} ms   p95 {percentile(delays, 95):6.0f} ms   "
+        f"false cuts {false_cuts / len(turn_ends):6.1%}   missed {len(turn_ends) - len(delays)}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Replay caller audio through SpeechToText endpointing")
+    parser.add_argument("--turns", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--pcm", help="48 kHz mono int16 recording to replay instead of synthesized turns")
+    parser.add_argument("--turn-ends", help="Comma separated end of each turn in the recording, in seconds")
+    args = parser.parse_args()
+
+    if args.pcm:
+        audio, turn_starts, turn_ends, transcripts = build_recorded(args.pcm, [float(s) for s in args.turn_ends.split(",")])
+    else:
+        audio, turn_starts, turn_ends, transcripts = build_synthesized(args.turns, args.seed)
+    print(f"Replaying {len(audio) / SAMPLE_RATE:.0f} s of audio, {len(turn_ends)} turns")
+
+    configs = [
+        ("fixed 1000 ms", lambda: SpeechToText("replay", silence_duration_ms=1000)),
+        ("fixed 700 ms", lambda: SpeechToText("replay", silence_duration_ms=700)),
+        ("fixed 500 ms", lambda: SpeechToText("replay", silence_duration_ms=500)),
+        ("adaptive", lambda: SpeechToText("replay", endpointer=AdaptiveEndpointer())),
+        ("adaptive + partials every 200 ms", lambda: SpeechToText("replay", endpointer=AdaptiveEndpointer(), partial_interval_ms=200)),
+    ]
+    for name, make_speech_to_text in configs:
+        await replay_config(name, make_speech_to_text, audio, turn_starts, turn_ends, transcripts)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,129 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+import numpy as np
+import websockets
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, ROOT)
+
+from benchmarks.endpointing_replay import FRAME_SAMPLES, SAMPLE_RATE, synthesize_turns
+from models.AdaptiveEndpointer import AdaptiveEndpointer
+from models.SpeechToText import SpeechToText
+from models.TranscriptionServicePool import TranscriptionServicePool
+from transcription_stand_in import TranscriptionStandIn
+
+# End of speech to final transcript latency, streaming caller audio in real time through SpeechToText
+# and the connection pool to a local transcription stand-in:
+#   endpoint   - end of the turn's last voiced frame to the finalize request
+#   round trip - finalize request to the transcript arriving
+#   total      - end of speech to the transcript, what the caller waits before the agent can answer
+#
+#   python benchmarks/final_transcript_latency.py                         # 6 turns per config, ~2 minutes
+#   python benchmarks/final_transcript_latency.py --turns 20 --transcribe-delay-ms 150
+#
+# Turns are synthesized as in endpointing_replay.py. The stand-in answers partial transcripts with a
+# summary rather than words, so the adaptive endpointer only sees partials as non-terminal text.
+
+
+class TurnTimer:
+    def __init__(self, speech_to_text: SpeechToText):
+        self.speech_to_text = speech_to_text
+        self.speech_ended = None
+        self.finalize_sent = None
+        self.results = []  # (endpoint, round trip) in seconds
+
+        stream = speech_to_text.transcription_service
+        finalize_transcription = stream.finalize_transcription
+
+        async def timed_finalize_transcription(id, sample_rate):
+            self.finalize_sent = time.perf_counter()
+            return await finalize_transcription(id, sample_rate)
+        stream.finalize_transcription = timed_finalize_transcription
+
+        async def on_speech_detected(text):
+            if self.speech_ended is not None and self.finalize_sent is not None:
+                now = time.perf_counter()
+                self.results.append((self.finalize_sent - self.speech_ended, now - self.finalize_sent))
+            self.speech_ended = self.finalize_sent = None
+
+        async def ignore(*args):
+            pass
+        speech_to_text.on("speech_detected", on_speech_detected)
+        for event in ("partial_speech_detected", "is_speaking_status", "connection_status"):
+            speech_to_text.on(event, ignore)
+
+
+async def stream_turns(speech_to_text: SpeechToText, timer: TurnTimer, turns: list):
+    start = time.perf_counter()
+    frame_index = 0
+
+    async def play(samples, voiced):
+        nonlocal frame_index
+        samples = np.clip(samples, -32768, 32767).astype(np.int16)
+        for offset in range(0, len(samples) - FRAME_SAMPLES + 1, FRAME_SAMPLES):
+            frame_index += 1
+            # Frames arrive on the real time clock, like tap_audio_stream
+            delay = start + frame_index * FRAME_SAMPLES / SAMPLE_RATE - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await speech_to_text.add_audio_data(samples[offset:offset + FRAME_SAMPLES], SAMPLE_RATE)
+        if voiced:
+            timer.speech_ended = time.perf_counter()
+
+    await play(np.zeros(SAMPLE_RATE), False)
+    for turn in turns:
+        for index, (phrase, _) in enumerate(turn.phrases):
+            await play(phrase, True)
+            if index < len(turn.pauses):
+                await play(np.zeros(turn.pauses[index]), False)
+        await play(np.zeros(SAMPLE_RATE * 3), False)  # The agent answers
+
+
+def report(name: str, results: list, turn_count: int):
+    if not results:
+        print(f"{name:<34} no transcripts")
+        return
+    endpoint, round_trip = (np.array(values) * 1000 for values in zip(*results))
+    total = endpoint + round_trip
+    print(
+        f"{name:<34} total median {np.median(total):6.0f} ms  p95 {np.percentile(total, 95):6.0f} ms   "
+        f"endpoint {np.median(endpoint):6.0f} ms   round trip {np.median(round_trip):5.1f} ms   "
+        f"{len(results)}/{turn_count} turns"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="End of speech to final transcript latency against the stand-in")
+    parser.add_argument("--turns", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--transcribe-delay-ms", type=int, default=0, help="Time the stand-in takes per transcribe call")
+    args = parser.parse_args()
+
+    stand_in = TranscriptionStandIn(transcribe_delay=args.transcribe_delay_ms / 1000)
+    server = await websockets.serve(stand_in.handle_connection, "localhost", 0)
+    url = f"ws://localhost:{server.sockets[0].getsockname()[1]}"
+    turns = synthesize_turns(args.turns, args.seed)
+
+    configs = [
+        ("fixed 1000 ms", lambda: SpeechToText(url, silence_duration_ms=1000)),
+        ("fixed 1000 ms + partials 200 ms", lambda: SpeechToText(url, silence_duration_ms=1000, partial_interval_ms=200)),
+        ("adaptive + partials 200 ms", lambda: SpeechToText(url, endpointer=AdaptiveEndpointer(), partial_interval_ms=200)),
+    ]
+    for name, make_speech_to_text in configs:
+        speech_to_text = make_speech_to_text()
+        await speech_to_text.connect()
+        timer = TurnTimer(speech_to_text)
+        await stream_turns(speech_to_text, timer, turns)
+        report(name, timer.results, len(turns))
+        speech_to_text.close()
+
+    TranscriptionServicePool.for_url(url).close()
+    server.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
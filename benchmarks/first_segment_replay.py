@@ -0,0 +1,126 @@
+import argparse
+import asyncio
+import os
+import random
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from lib import sentence_stream as sentence_stream_module
+from lib.sentence_stream import sentence_stream
+
+# Replays LLM token timing traces through sentence_stream and reports the time from a response's first
+# token to its first segment, i.e. the first TTS request, with and without the early first chunk
+#
+#   python benchmarks/first_segment_replay.py
+#   python benchmarks/first_segment_replay.py --responses 2000 --tokens-per-second 25
+#
+# Traces are synthesized: responses open with a short lead-in clause, a plain long sentence, a title
+# abbreviation or a number, and tokens arrive at a jittered rate with occasional stalls. Time runs on
+# a virtual clock, so the replay takes no wall time.
+
+LEAD_INS = ["Sure,", "Okay, so", "Great question -", "Well,", "Right;", "Absolutely, and", "Hmm, let me see:"]
+WORDS = (
+    "the order was shipped yesterday and should arrive within three business days if the carrier "
+    "keeps to its schedule but you can always track it from your account page where every update shows up"
+).split()
+NAMES = ["Dr. Smith", "Mr. Jones", "Prof. Lee", "St. Mary's"]
+NUMBERS = ["1,250", "3.5", "2,000", "10.75"]
+
+
+# Synthesize Response - the text of one response, opening in one of several styles
+def synthesize_response(rng: random.Random) -> str:
+    def words(count):
+        start = rng.randint(0, len(WORDS) - count)
+        return " ".join(WORDS[start:start + count])
+
+    style = rng.choice(["lead_in", "plain", "abbreviation", "number"])
+    if style == "lead_in":
+        first = f"{rng.choice(LEAD_INS)} {words(rng.randint(6, 18))}."
+    elif style == "plain":
+        first = f"{words(rng.randint(8, 25)).capitalize()}."
+    elif style == "abbreviation":
+        first = f"You can ask {rng.choice(NAMES)} about {words(rng.randint(5, 15))}."
+    else:
+        first = f"It comes to {rng.choice(NUMBERS)} dollars for {words(rng.randint(5, 15))}."
+    rest = " ".join(f"{words(rng.randint(5, 15)).capitalize()}." for _ in range(rng.randint(1, 3)))
+    return f"{first} {rest}"
+
+
+# Tokenize - word-ish tokens like an LLM emits: leading space, punctuation sometimes split off
+def tokenize(rng: random.Random, text: str) -> list:
+    tokens = []
+    for index, word in enumerate(text.split(" ")):
+        word = word if index == 0 else " " + word
+        if word[-1] in ",.;:" and rng.random() < 0.5:
+            tokens += [word[:-1], word[-1]]
+        else:
+            tokens.append(word)
+    return tokens
+
+
+# Token Gaps - seconds before each token after the first, jittered around the rate with rare stalls
+def token_gaps(rng: random.Random, count: int, tokens_per_second: float) -> list:
+    gaps = []
+    for _ in range(count):
+        gap = rng.lognormvariate(np.log(1 / tokens_per_second), 0.4)
+        if rng.random() < 0.02:
+            gap += rng.uniform(0.2, 0.6)
+        gaps.append(gap)
+    return gaps
+
+
+class VirtualClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+
+async def first_segment(tokens: list, gaps: list, clock: VirtualClock, **kwargs) -> tuple:
+    async def token_generator():
+        for index, token in enumerate(tokens):
+            if index:
+                clock.now += gaps[index - 1]
+            yield token
+
+    start = clock.now
+    async for segment in sentence_stream(token_generator(), **kwargs):
+        return (clock.now - start) * 1000, len(segment.split())
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Time to first TTS request, replaying token timing traces")
+    parser.add_argument("--responses", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--tokens-per-second", type=float, default=40)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    traces = []
+    for _ in range(args.responses):
+        tokens = tokenize(rng, synthesize_response(rng))
+        traces.append((tokens, token_gaps(rng, len(tokens), args.tokens_per_second)))
+
+    clock = VirtualClock()
+    sentence_stream_module.time.monotonic = clock.monotonic
+    configs = [
+        ("full sentences", {}),
+        ("early first chunk", {"early_first_chunk": True}),
+        ("early, no time budget", {"early_first_chunk": True, "first_chunk_max_delay_ms": None}),
+        ("early, 8 word budget", {"early_first_chunk": True, "first_chunk_max_words": 8}),
+    ]
+    print(f"Replaying {len(traces)} responses at ~{args.tokens_per_second:.0f} tokens/s")
+    for name, kwargs in configs:
+        results = [await first_segment(tokens, gaps, clock, **kwargs) for tokens, gaps in traces]
+        latencies, word_counts = (np.array(values) for values in zip(*results))
+        print(
+            f"{name:<24} first segment median {np.median(latencies):5.0f} ms   p95 {np.percentile(latencies, 95):5.0f} ms   "
+            f"words median {np.median(word_counts):4.0f}   min {word_counts.min():2d}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
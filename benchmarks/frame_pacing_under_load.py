@@ -0,0 +1,86 @@
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from lib.webrtc.MediaClock import MediaClock
+from lib.webrtc.SyntheticAudioTrack import SyntheticAudioTrack
+
+# Inter-frame jitter of synthetic tracks pulled like the sender pulls them, while other work blocks the
+# event loop for a few milliseconds at random intervals. Reports the receive-side intervals between
+# frames and the tracks' own pacing counters (jitter_ms, late_frames, resyncs)
+#
+#   python benchmarks/frame_pacing_under_load.py
+#   python benchmarks/frame_pacing_under_load.py --tracks 100 --seconds 10
+
+FRAME_PERIOD_MS = 20
+
+# name, blocking work per burst in ms, mean time between bursts in ms
+LOADS = [
+    ("idle", 0, 0),
+    ("light: 2 ms every ~10 ms", 2, 10),
+    ("heavy: 15 ms every ~50 ms", 15, 50),
+    ("stalls: 150 ms every ~1 s", 150, 1000),
+]
+
+
+# Load - busy work on the loop thread, like JSON parsing or numpy work in a handler
+async def load(block_ms: float, every_ms: float, rng: random.Random):
+    while True:
+        await asyncio.sleep(rng.expovariate(1 / every_ms) / 1000)
+        end = time.perf_counter() + block_ms / 1000
+        while time.perf_counter() < end:
+            pass
+
+
+async def pull_frames(track: SyntheticAudioTrack, seconds: float) -> list:
+    intervals_ms = []
+    last_ns = None
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        await track.recv()
+        now_ns = time.monotonic_ns()
+        if last_ns is not None:
+            intervals_ms.append((now_ns - last_ns) / 1_000_000)
+        last_ns = now_ns
+    return intervals_ms
+
+
+async def run_load(track_count: int, seconds: float, block_ms: float, every_ms: float, seed: int) -> tuple:
+    clock = MediaClock()
+    tracks = [SyntheticAudioTrack(media_clock=clock) for _ in range(track_count)]
+    load_task = asyncio.create_task(load(block_ms, every_ms, random.Random(seed))) if block_ms else None
+    intervals = await asyncio.gather(*(pull_frames(track, seconds) for track in tracks))
+    if load_task:
+        load_task.cancel()
+    return np.concatenate(intervals), [track.pacing_stats() for track in tracks]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Frame pacing jitter under simulated event loop load")
+    parser.add_argument("--tracks", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--seed", type=int, default=19)
+    args = parser.parse_args()
+
+    print(f"{args.tracks} tracks, {args.seconds:g} s per load")
+    for name, block_ms, every_ms in LOADS:
+        intervals, stats = await run_load(args.tracks, args.seconds, block_ms, every_ms, args.seed)
+        deviation = np.abs(intervals - FRAME_PERIOD_MS)
+        frames = sum(track_stats["frames_sent"] for track_stats in stats)
+        late = sum(track_stats["late_frames"] for track_stats in stats)
+        print(
+            f"{name:<28} interval deviation p50 {np.median(deviation):5.2f} ms  p99 {np.percentile(deviation, 99):6.2f} ms  "
+            f"max {deviation.max():6.1f} ms   jitter_ms {np.mean([s['jitter_ms'] for s in stats]):5.2f}   "
+            f"late {late / frames:6.1%}   max lateness {max(s['max_lateness_ms'] for s in stats):6.1f} ms   "
+            f"resyncs {sum(s['resyncs'] for s in stats)}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+import av
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from lib.webrtc.MediaClock import MediaClock
+from lib.webrtc.SyntheticAudioTrack import SyntheticAudioTrack
+
+# CPU use of SyntheticAudioTrack's pooled frames and cached silence at 200 simultaneous tracks, against
+# building a fresh zeroed array and av.AudioFrame for every frame as before
+#
+#   python benchmarks/frame_pool_cpu.py
+#   python benchmarks/frame_pool_cpu.py --tracks 500 --seconds 10
+#
+# Two measurements per variant, for silence (most of a call) and for speech:
+#   prepare  - CPU per frame of prepare_frame alone, called back to back across the tracks
+#   realtime - process CPU while every track is pulled through one MediaClock at 50 frames/s
+
+
+class FreshFrameTrack(SyntheticAudioTrack):
+    # The previous frame path: new sample arrays and a new av.AudioFrame every 20ms, silence included
+    def prepare_frame(self, due_ns: int, sent_ns: int):
+        self.track_pacing(due_ns, sent_ns)
+        frame_data = np.zeros(self.frame_size * self.channels, dtype=np.int16)
+        if self.audio.available(self) >= self.frame_size:
+            mono = np.empty(self.frame_size, dtype=np.int16)
+            self.audio.read_into(self, mono)
+            frame_data[0::2] = mono
+            frame_data[1::2] = mono
+        audio_frame = av.AudioFrame.from_ndarray(frame_data.reshape((1, -1)), format='s16', layout='stereo')
+        audio_frame.sample_rate = self.sample_rate
+        audio_frame.pts = self.timestamp
+        audio_frame.time_base = self.time_base
+        self.timestamp += self.frame_size
+        return audio_frame
+
+
+def create_tracks(track_class, count: int, clock: MediaClock, speech: np.ndarray) -> list:
+    tracks = []
+    for _ in range(count):
+        track = track_class(media_clock=clock)
+        track.on("is_speaking_sentence", lambda sentence_id: None)
+        track.on("stoped_speaking", lambda: None)
+        if speech is not None:
+            track.enqueue_audio_samples(speech)
+        tracks.append(track)
+    return tracks
+
+
+def prepare_cost(track_class, count: int, frames_per_track: int, speech: np.ndarray) -> float:
+    tracks = create_tracks(track_class, count, MediaClock(), speech)
+    start = time.process_time()
+    for _ in range(frames_per_track):
+        now_ns = time.monotonic_ns()
+        for track in tracks:
+            track.prepare_frame(now_ns, now_ns)
+    return (time.process_time() - start) / (count * frames_per_track) * 1_000_000
+
+
+async def realtime_cpu(track_class, count: int, seconds: float, speech: np.ndarray) -> float:
+    tracks = create_tracks(track_class, count, MediaClock(), speech)
+
+    async def pull(track):
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            await track.recv()
+
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    await asyncio.gather(*(pull(track) for track in tracks))
+    return (time.process_time() - cpu_start) / (time.perf_counter() - wall_start)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Frame pool CPU use at many simultaneous tracks")
+    parser.add_argument("--tracks", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    frames_per_track = int(args.seconds * 50)
+    # Enough queued speech per track to last the run
+    speech = np.random.default_rng(20).normal(0, 3000, 48000 * int(args.seconds + 1)).astype(np.int16)
+    print(f"{args.tracks} tracks, {args.seconds:g} s")
+    for audio_name, audio in (("silence", None), ("speech", speech)):
+        for name, track_class in (("fresh frames", FreshFrameTrack), ("pooled frames", SyntheticAudioTrack)):
+            per_frame_us = prepare_cost(track_class, args.tracks, frames_per_track, audio)
+            cpu = await realtime_cpu(track_class, args.tracks, args.seconds, audio)
+            print(f"{audio_name:<8} {name:<14} prepare {per_frame_us:5.2f} us per frame   realtime CPU {cpu:6.1%}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,121 @@
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from lib.webrtc.MediaClock import MediaClock
+from lib.webrtc.SyntheticAudioTrack import SyntheticAudioTrack
+
+# Event loop wakeups, timers, tick tasks started and CPU per second with every track pulled like the sender pulls it, for:
+#   per-track sleep      - each recv() sleeps until its own frame is due, the design MediaClock replaced
+#   clock, task per tick - MediaClock's first run loop, which exited whenever a tick emptied the waiters
+#   shared clock         - MediaClock as used
+#
+#   python benchmarks/media_clock_wakeups.py
+#   python benchmarks/media_clock_wakeups.py --tracks 50 200 500 1000 --seconds 5
+#
+# A wakeup is one pass of the event loop (one select call). Tracks start at random phases within a
+# frame period, as peers connect at arbitrary times.
+
+
+class SleepPacedTrack(SyntheticAudioTrack):
+    # The previous recv(): one asyncio.sleep per track per frame on the track's own monotonic schedule
+    async def recv(self):
+        now_ns = time.monotonic_ns()
+        if self.clock_anchor_ns is None:
+            self.start_schedule(now_ns)
+        due_ns = self.frame_due_ns()
+        if due_ns > now_ns:
+            await asyncio.sleep((due_ns - now_ns) / 1_000_000_000)
+        elif now_ns - due_ns > 5 * self.frame_period_ns:
+            self.start_schedule(now_ns, resync=True)
+            due_ns = now_ns
+        return self.prepare_frame(due_ns, time.monotonic_ns())
+
+
+class TaskPerTickClock(MediaClock):
+    # The first run(): every tick hands out all waiting frames, so the loop exits and recv() starts a new task
+    async def run(self):
+        while self.waiters:
+            now_ns = time.monotonic_ns()
+            tick_due_ns = self.tick_at_or_before(now_ns) + self.frame_period_ns
+            await asyncio.sleep((tick_due_ns - now_ns) / 1_000_000_000)
+            self.tick(tick_due_ns)
+
+
+class LoopCounter:
+    # Counts event loop iterations and scheduled timers by wrapping the running loop's methods
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.wakeups = 0
+        self.timers = 0
+        run_once, call_at = loop._run_once, loop.call_at
+
+        def counting_run_once():
+            self.wakeups += 1
+            run_once()
+
+        def counting_call_at(*args, **kwargs):
+            self.timers += 1
+            return call_at(*args, **kwargs)
+        loop._run_once = counting_run_once
+        loop.call_at = counting_call_at
+
+
+async def pull(track: SyntheticAudioTrack, start_delay: float, end: float):
+    await asyncio.sleep(start_delay)
+    while time.monotonic() < end:
+        await track.recv()
+
+
+def measure(track_class, clock: MediaClock, track_count: int, seconds: float, seed: int) -> tuple:
+    async def run():
+        rng = random.Random(seed)
+        tracks = [track_class(media_clock=clock) for _ in range(track_count)]
+        for track in tracks:
+            track.on("stoped_speaking", lambda: None)
+        warm_up = 0.1
+        end = time.monotonic() + warm_up + seconds
+        pulls = asyncio.gather(*(pull(track, rng.uniform(0, 0.02), end) for track in tracks))
+        await asyncio.sleep(warm_up)  # Let every track start before counting
+
+        counter = LoopCounter(asyncio.get_running_loop())
+        tick_tasks_started = clock.tick_tasks_started
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        await pulls
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        frames = sum(track.frames_sent for track in tracks)
+        tick_tasks = clock.tick_tasks_started - tick_tasks_started
+        return counter.wakeups / wall, counter.timers / wall, tick_tasks / wall, cpu / wall, frames / wall
+
+    return asyncio.run(run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Event loop wakeups and CPU, shared media clock against per-track sleeps")
+    parser.add_argument("--tracks", type=int, nargs="+", default=[50, 200, 500])
+    parser.add_argument("--seconds", type=float, default=3)
+    parser.add_argument("--seed", type=int, default=21)
+    args = parser.parse_args()
+
+    designs = [
+        ("per-track sleep", SleepPacedTrack, MediaClock),  # recv() never reaches the clock
+        ("clock, task per tick", SyntheticAudioTrack, TaskPerTickClock),
+        ("shared clock", SyntheticAudioTrack, MediaClock),
+    ]
+    for track_count in args.tracks:
+        for name, track_class, clock_class in designs:
+            clock = clock_class()
+            wakeups, timers, tick_tasks, cpu, frames = measure(track_class, clock, track_count, args.seconds, args.seed)
+            print(
+                f"{track_count:4d} tracks  {name:<21} {wakeups:6.0f} wakeups/s  {timers:6.0f} timers/s  {tick_tasks:4.0f} tasks/s  "
+                f"CPU {cpu:6.1%}   {frames:7.0f} frames/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from lib.webrtc.JSONRPCPeer import JSONRPCPeer
+from lib.webrtc.functions.till_true import till_true
+
+# Round trip time of awaited JSONRPCPeer calls between two in-process peers, resolving replies through
+# futures against the pre-rewrite till_true polling (100 ms interval)
+#
+#   python benchmarks/rpc_round_trip.py
+#   python benchmarks/rpc_round_trip.py --calls 5000 --concurrency 50
+
+
+class PollingJSONRPCPeer(JSONRPCPeer):
+    # The pre-rewrite call - replies are stored in response_queue and polled for
+    async def call(self, method, params, await_response=False, timeout=5):
+        msg_id = str(uuid.uuid4()) if await_response else None
+        await self.sender(self.encode_call(method, params, msg_id))
+        if not await_response:
+            return
+        self.response_queue[msg_id] = None
+        if not await till_true(lambda: self.response_queue[msg_id] is not None, timeout=timeout):
+            raise TimeoutError(f"Timeout waiting for response to {method}")
+        response = self.response_queue.pop(msg_id)
+        if response.result.get("error"):
+            raise Exception(f"Error in response to {method}: {response.result['error']}")
+        return response.result
+
+    async def handle_parsed_message(self, parsed_message):
+        if "method" in parsed_message:
+            return await super().handle_parsed_message(parsed_message)
+        if parsed_message.get("id") in self.response_queue:
+            self.response_queue[parsed_message["id"]] = PolledResponse(parsed_message.get("result", {}))
+
+
+class PolledResponse:
+    def __init__(self, result):
+        self.result = result
+
+
+# Connect - two peers whose messages are delivered on the next loop iteration, like a socket read
+def connect(client_class):
+    client = server = None
+
+    async def to_server(message):
+        asyncio.get_running_loop().call_soon(lambda: asyncio.create_task(server.handle_message(message)))
+
+    async def to_client(message):
+        asyncio.get_running_loop().call_soon(lambda: asyncio.create_task(client.handle_message(message)))
+
+    client = client_class(sender=to_server)
+    server = JSONRPCPeer(sender=to_client)
+
+    async def echo(value):
+        return {"value": value}
+    server.on("echo", echo)
+    return client
+
+
+async def measure(client_class, calls: int, concurrency: int) -> tuple:
+    client = connect(client_class)
+    round_trips = []
+
+    async def caller(count):
+        for index in range(count):
+            start = time.perf_counter()
+            await client.call("echo", {"value": index}, await_response=True)
+            round_trips.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(caller(calls // concurrency) for _ in range(concurrency)))
+    seconds = time.perf_counter() - start
+    return np.array(round_trips) * 1000, len(round_trips) / seconds
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="JSONRPCPeer awaited call round trip")
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--polling-calls", type=int, default=40, help="Calls for the polling peer, each takes ~100 ms")
+    parser.add_argument("--concurrency", type=int, default=1)
+    args = parser.parse_args()
+
+    for name, client_class, calls in (
+        ("futures", JSONRPCPeer, args.calls),
+        ("polling (pre-rewrite)", PollingJSONRPCPeer, args.polling_calls),
+    ):
+        round_trips, calls_per_second = await measure(client_class, max(calls, args.concurrency), args.concurrency)
+        print(
+            f"{name:<22} {len(round_trips):5d} calls x{args.concurrency}: median {np.median(round_trips):8.3f} ms   "
+            f"p95 {np.percentile(round_trips, 95):8.3f} ms   {calls_per_second:9.0f} calls/s"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,56 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, ROOT)
+
+from lib.sentence_stream import sentence_stream
+from tests.test_sentence_stream import reference_sentence_stream
+
+# Throughput of sentence_stream on long token streams
+#
+#   python benchmarks/sentence_stream_throughput.py                    # 100k tokens
+#   python benchmarks/sentence_stream_throughput.py --reference 20000  # also time the pre-rewrite scanner
+
+
+def token_streams(count: int) -> dict:
+    return {
+        "no sentence end ('word ')": ["word "] * count,
+        "code block": ["    x = compute(a, b)", " + 1", "\n"] * (count // 3),
+        "prose": ["The", " quick", " brown", " fox", " jumps", ".", " Then", " it", " rests", "!", " "] * (count // 11),
+    }
+
+
+async def run(stream_function, tokens, **kwargs) -> tuple:
+    async def token_generator():
+        for token in tokens:
+            yield token
+    start = time.perf_counter()
+    sentences = 0
+    async for _ in stream_function(token_generator(), **kwargs):
+        sentences += 1
+    return time.perf_counter() - start, sentences
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="sentence_stream throughput")
+    parser.add_argument("--tokens", type=int, default=100_000)
+    parser.add_argument("--reference", type=int, default=0, help="Also time the old scanner on this many tokens (it is quadratic)")
+    args = parser.parse_args()
+
+    for name, tokens in token_streams(args.tokens).items():
+        for early in (False, True):
+            seconds, sentences = await run(sentence_stream, tokens, early_first_chunk=early)
+            print(f"{name:<26} early={early!s:<5} {len(tokens)} tokens: {seconds:7.3f} s, {len(tokens) / seconds:10.0f} tokens/s, {sentences} segments")
+        if args.reference:
+            reference_tokens = token_streams(args.reference)[name]
+            seconds, _ = await run(reference_sentence_stream, reference_tokens)
+            print(f"{name:<26} reference  {len(reference_tokens)} tokens: {seconds:7.3f} s, {len(reference_tokens) / seconds:10.0f} tokens/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
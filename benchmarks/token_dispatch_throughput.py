@@ -0,0 +1,117 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from lib.webrtc.JSONRPCPeer import JSONRPCPeer
+from models.TokenStreamingService import TokenStreamingService
+
+# Inbound token stream events per second through TokenStreamingService's single dispatcher, against the
+# task per message path it replaced, where every websocket message got its own handle_message task and
+# every token its own on_token call
+#
+#   python benchmarks/token_dispatch_throughput.py
+#   python benchmarks/token_dispatch_throughput.py --messages 200000 --tool-call-rate 0.01
+#
+# Messages arrive in bursts of random size, like websocket reads, with the loop yielding between bursts.
+
+
+def synthesize_messages(count: int, tool_call_rate: float, rng: random.Random) -> list:
+    messages = []
+    for index in range(count):
+        if rng.random() < tool_call_rate:
+            params = {"call_id": f"call-{index}", "tool_name": "lookup", "tool_input": {}}
+            messages.append(json.dumps({"method": "on_tool_call", "params": params, "id": None}))
+        else:
+            params = {"token": f" t{index}", "response_id": f"response-{index // 200}"}
+            messages.append(json.dumps({"method": "on_token", "params": params, "id": None}))
+    return messages
+
+
+async def feed(receive, messages: list, rng: random.Random):
+    for message in messages:
+        await receive(message)
+        if rng.random() < 0.1:
+            await asyncio.sleep(0)
+
+
+async def run_dispatcher(messages: list, seed: int) -> float:
+    delivered = 0
+    done = asyncio.Event()
+
+    async def on_tokens(tokens, response_id):
+        nonlocal delivered
+        delivered += len(tokens)
+        if delivered == len(messages):
+            done.set()
+
+    async def on_tool_call(call_id, tool_name, tool_input):
+        nonlocal delivered
+        delivered += 1
+        if delivered == len(messages):
+            done.set()
+
+    async def sender(message):
+        pass
+
+    service = TokenStreamingService("ws://unused", "benchmark")
+    service.on("tokens", on_tokens)
+    service.on("tool_call", on_tool_call)
+    service.start_dispatch(sender)
+
+    start = time.perf_counter()
+    await feed(service.receive_message, messages, random.Random(seed))
+    await done.wait()
+    elapsed = time.perf_counter() - start
+    service.close()
+    return elapsed
+
+
+# Task Per Message - the previous path: websocket.on("message", lambda msg: asyncio.create_task(rpc_layer.handle_message(msg)))
+async def run_task_per_message(messages: list, seed: int) -> float:
+    delivered = 0
+    done = asyncio.Event()
+
+    async def on_event(**params):
+        nonlocal delivered
+        delivered += 1
+        if delivered == len(messages):
+            done.set()
+
+    async def sender(message):
+        pass
+
+    rpc_layer = JSONRPCPeer(sender=sender)
+    rpc_layer.on("on_token", on_event)
+    rpc_layer.on("on_tool_call", on_event)
+
+    async def receive(message):
+        asyncio.create_task(rpc_layer.handle_message(message))
+
+    start = time.perf_counter()
+    await feed(receive, messages, random.Random(seed))
+    await done.wait()
+    return time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Token streaming dispatch throughput")
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--tool-call-rate", type=float, default=0.005)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=15)
+    args = parser.parse_args()
+
+    messages = synthesize_messages(args.messages, args.tool_call_rate, random.Random(args.seed))
+    for name, run in (("task per message", run_task_per_message), ("single dispatcher", run_dispatcher)):
+        elapsed = min([await run(messages, args.seed) for _ in range(args.repeats)])
+        print(f"{name:<18} {len(messages) / elapsed:9.0f} events/s   {elapsed / len(messages) * 1_000_000:5.2f} us per event")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
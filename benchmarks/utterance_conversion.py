@@ -0,0 +1,114 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import wave
+import numpy as np
+from pydub import AudioSegment
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from lib.audio_bytes import pcm_to_wav_bytes
+from lib.webrtc.SyntheticAudioTrack import SyntheticAudioTrack
+
+# Per utterance latency and file syscalls from synthesized PCM to queued track audio, through a temporary
+# WAV file read back with pydub as before, against the in-memory enqueue_wav_bytes and enqueue_pcm_bytes
+#
+#   python benchmarks/utterance_conversion.py
+#   python benchmarks/utterance_conversion.py --seconds 2 --source-rate 22050   # espeak's native rate
+#
+# Syscalls are counted from /proc/self/io (read and write) and audit events (open and unlink), so the
+# counts cover the whole process - nothing else runs while an utterance is converted.
+
+
+class SyscallCounter:
+    def __init__(self):
+        self.counting = False
+        self.opens = 0
+        self.unlinks = 0
+        sys.addaudithook(self.audit)
+
+    def audit(self, event, args):
+        if not self.counting:
+            return
+        if event == "open":
+            self.opens += 1
+        elif event == "os.remove":
+            self.unlinks += 1
+
+    @staticmethod
+    def reads_and_writes():
+        with open("/proc/self/io") as f:
+            io_counts = dict(line.split(": ") for line in f.read().splitlines())
+        return int(io_counts["syscr"]), int(io_counts["syscw"])
+
+
+# Through File - the previous path: write the utterance as a WAV file, read it back with pydub, enqueue, delete
+def through_file(track: SyntheticAudioTrack, samples: np.ndarray, sample_rate: int):
+    fd, wav_path = tempfile.mkstemp(suffix=".wav")
+    os.close(fd)
+    try:
+        with wave.open(wav_path, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(sample_rate)
+            wf.writeframes(samples.tobytes())
+        audio = AudioSegment.from_wav(wav_path)
+        if audio.frame_rate != track.sample_rate:
+            audio = audio.set_frame_rate(track.sample_rate)
+        track.enqueue_audio_samples(np.frombuffer(audio.raw_data, dtype=np.int16))
+    finally:
+        os.remove(wav_path)
+
+
+def wav_in_memory(track: SyntheticAudioTrack, samples: np.ndarray, sample_rate: int):
+    track.enqueue_wav_bytes(pcm_to_wav_bytes(samples, sample_rate))
+
+
+def pcm_in_memory(track: SyntheticAudioTrack, samples: np.ndarray, sample_rate: int):
+    track.enqueue_pcm_bytes(samples.tobytes())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per utterance conversion latency and file syscalls")
+    parser.add_argument("--utterances", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=4)
+    parser.add_argument("--source-rate", type=int, default=48000, help="Sample rate of the synthesized utterance")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(17)
+    samples = rng.normal(0, 3000, int(args.seconds * args.source_rate)).clip(-32768, 32767).astype(np.int16)
+    track = SyntheticAudioTrack()
+    counter = SyscallCounter()
+
+    paths = [("temp WAV file + pydub", through_file), ("enqueue_wav_bytes", wav_in_memory)]
+    if args.source_rate == track.sample_rate:
+        paths.append(("enqueue_pcm_bytes", pcm_in_memory))  # Raw PCM carries no rate, it must match the track
+
+    print(f"{args.utterances} utterances of {args.seconds:g} s mono at {args.source_rate} Hz")
+    for name, convert in paths:
+        latencies = []
+        counter.opens = counter.unlinks = 0
+        reads, writes = counter.reads_and_writes()
+        for _ in range(args.utterances):
+            counter.counting = True
+            start = time.perf_counter()
+            convert(track, samples, args.source_rate)
+            latencies.append(time.perf_counter() - start)
+            counter.counting = False
+            track.flush()
+        end_reads, end_writes = counter.reads_and_writes()
+        # Each /proc/self/io read itself costs one read syscall
+        reads_per = (end_reads - reads - 1) / args.utterances
+        writes_per = (end_writes - writes) / args.utterances
+        latencies = np.array(latencies) * 1000
+        print(
+            f"{name:<22} median {np.median(latencies):6.2f} ms   p95 {np.percentile(latencies, 95):6.2f} ms   "
+            f"per utterance: {counter.opens / args.utterances:.1f} opens  {reads_per:.1f} reads  "
+            f"{writes_per:.1f} writes  {counter.unlinks / args.utterances:.1f} unlinks"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,10 @@
 import json
+import os
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from models.ConversationOrchestrator import ConversationOrchestrator
+from lib.text_to_speech_stream import tts_audio_cache
 
 
 app = FastAPI()
@@ -21,6 +23,11 @@ app.add_middleware(
 async def health():
     return {"status": "ok"}
 
+# TTS cache counters
+@app.get("/tts-cache")
+async def tts_cache_stats():
+    return tts_audio_cache.stats()
+
 # Connect to Context
 class RequestAgentConnect(BaseModel):
     context_id: str
@@ -38,7 +45,23 @@ async def wake_agent(
     print(f"Received token: {token}")
 
     # You can now use `token` in your orchestrator or for authentication
-    orchestrator = ConversationOrchestrator(context_id, auth_token=token)
+    transcription_sample_rate = os.getenv("TRANSCRIPTION_SAMPLE_RATE")
+    partial_transcription_interval_ms = os.getenv("PARTIAL_TRANSCRIPTION_INTERVAL_MS")
+    # Adaptive end of turn detection is opt-in - "1" turns it on, a JSON object also overrides AdaptiveEndpointer settings.
+    # It only beat the fixed wait with partial transcripts on (PARTIAL_TRANSCRIPTION_INTERVAL_MS), and only on synthetic turns
+    adaptive_endpointing = os.getenv("ADAPTIVE_ENDPOINTING", "0")
+    if adaptive_endpointing.startswith("{"):
+        adaptive_endpointing = json.loads(adaptive_endpointing)
+    else:
+        adaptive_endpointing = {} if adaptive_endpointing.lower() in ("1", "true", "yes") else None
+    orchestrator = ConversationOrchestrator(
+        context_id,
+        auth_token=token,
+        recording_dir=os.getenv("RECORDING_DIR"),
+        transcription_sample_rate=int(transcription_sample_rate) if transcription_sample_rate else None,
+        partial_transcription_interval_ms=int(partial_transcription_interval_ms) if partial_transcription_interval_ms else None,
+        adaptive_endpointing=adaptive_endpointing,
+    )
     await orchestrator.initialize()
     
     return {
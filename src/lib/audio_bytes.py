@@ -0,0 +1,103 @@
+import io
+import struct
+import wave
+from math import gcd
+from typing import Optional, Tuple, Union
+import av
+import numpy as np
+from scipy.signal import resample_poly
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+
+# PCM to WAV Bytes - 16-bit interleaved samples wrapped in a WAV header, no file involved
+def pcm_to_wav_bytes(pcm_samples, sample_rate: int, channels: int = 1) -> bytes:
+    samples = np.asarray(pcm_samples, dtype=np.int16)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)  # 16-bit PCM
+        wf.setframerate(sample_rate)
+        wf.writeframes(memoryview(samples).cast("B"))
+    return buffer.getvalue()
+
+
+# WAV Bytes to PCM - returns (samples, sample_rate, channels); the samples view the input buffer unless converted
+def wav_bytes_to_pcm(
+        wav_bytes: BytesLike,
+        sample_rate: Optional[int] = None,
+        channels: Optional[int] = None,
+    ) -> Tuple[np.ndarray, int, int]:
+    view = memoryview(wav_bytes).cast("B")
+    if len(view) < 12 or view[0:4] != b"RIFF" or view[8:12] != b"WAVE":
+        raise ValueError("Not a WAV file")
+
+    # Walk the RIFF chunks for the format and the sample data
+    source_rate = source_channels = bits_per_sample = None
+    data = None
+    offset = 12
+    while offset + 8 <= len(view):
+        chunk_id = bytes(view[offset:offset + 4])
+        chunk_size = struct.unpack_from("<I", view, offset + 4)[0]
+        body = view[offset + 8:offset + 8 + chunk_size]
+        if chunk_id == b"fmt ":
+            audio_format, source_channels, source_rate = struct.unpack_from("<HHI", body, 0)
+            bits_per_sample = struct.unpack_from("<H", body, 14)[0]
+            if audio_format != 1 or bits_per_sample != 16:
+                raise ValueError(f"Unsupported WAV format {audio_format} with {bits_per_sample} bits per sample")
+        elif chunk_id == b"data":
+            data = body
+            break
+        offset += 8 + chunk_size + (chunk_size % 2)  # Chunks are word aligned
+
+    if source_rate is None or data is None:
+        raise ValueError("WAV file is missing its fmt or data chunk")
+
+    samples = np.frombuffer(data[:len(data) - len(data) % 2], dtype=np.int16)
+    return convert_pcm(samples, source_rate, source_channels, sample_rate, channels)
+
+
+# MP3 Bytes to PCM - decodes in process with PyAV, returns (samples, sample_rate, channels); None keeps the source's
+def mp3_bytes_to_pcm(
+        mp3_bytes: BytesLike,
+        sample_rate: Optional[int] = 48000,
+        channels: Optional[int] = 1,
+    ) -> Tuple[np.ndarray, int, int]:
+    layout = {None: None, 1: "mono", 2: "stereo"}[channels]
+    resampler = av.AudioResampler(format="s16", layout=layout, rate=sample_rate)
+    chunks = []
+    with av.open(io.BytesIO(mp3_bytes), format="mp3") as container:
+        stream = container.streams.audio[0]
+        sample_rate = sample_rate or stream.rate
+        channels = channels or stream.channels
+        for frame in container.decode(stream):
+            for resampled in resampler.resample(frame):
+                chunks.append(resampled.to_ndarray().reshape(-1))
+        for resampled in resampler.resample(None):
+            chunks.append(resampled.to_ndarray().reshape(-1))
+    samples = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int16)
+    return samples, sample_rate, channels
+
+
+# Convert PCM - channel and sample rate conversion, returns the input unchanged when nothing to do
+def convert_pcm(
+        samples: np.ndarray,
+        source_rate: int,
+        source_channels: int,
+        sample_rate: Optional[int] = None,
+        channels: Optional[int] = None,
+    ) -> Tuple[np.ndarray, int, int]:
+    sample_rate = sample_rate or source_rate
+    channels = channels or source_channels
+    if source_rate == sample_rate and source_channels == channels:
+        return samples, sample_rate, channels
+
+    # Work on mono, then fan back out to the requested channel count
+    mono = samples.reshape(-1, source_channels).mean(axis=1) if source_channels > 1 else samples
+    if source_rate != sample_rate:
+        divisor = gcd(sample_rate, source_rate)
+        mono = resample_poly(mono, up=sample_rate // divisor, down=source_rate // divisor)
+    mono = np.clip(np.round(mono), -32768, 32767).astype(np.int16)
+    if channels > 1:
+        mono = np.repeat(mono, channels)
+    return mono, sample_rate, channels
@@ -0,0 +1,34 @@
+import numpy as np
+
+
+class AudioFeatures:
+    # Energy is computed up front since every frame's VAD needs it - peak and zero-crossing rate
+    # only when something reads them
+    def __init__(self, samples: np.ndarray, energy: float):
+        self.samples = samples  # float64
+        self.energy = energy
+        self.sample_count = len(samples)
+        self.computed_peak = None
+        self.computed_zero_crossing_rate = None
+
+    @property
+    def peak(self) -> float:
+        if self.computed_peak is None:
+            self.computed_peak = float(np.max(np.abs(self.samples))) if self.sample_count else 0.0
+        return self.computed_peak
+
+    @property
+    def zero_crossing_rate(self) -> float:
+        if self.computed_zero_crossing_rate is None:
+            signs = np.signbit(self.samples)
+            crossings = np.count_nonzero(signs[1:] != signs[:-1])
+            self.computed_zero_crossing_rate = crossings / self.sample_count if self.sample_count else 0.0
+        return self.computed_zero_crossing_rate
+
+
+# Extract Audio Features - one float64 conversion of the frame, shared by every feature
+def extract_audio_features(audio_data) -> AudioFeatures:
+    samples = np.asarray(audio_data, dtype=np.float64)
+
+    # float64 avoids the int16 overflow of squaring (and of abs(-32768))
+    return AudioFeatures(samples, energy=float(np.dot(samples, samples)))
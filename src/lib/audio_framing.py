@@ -0,0 +1,48 @@
+import struct
+import uuid
+import numpy as np
+
+
+# Binary audio frames sent over the transcription websocket:
+# version (uint8) | transcribe id (16 byte uuid) | sequence number (uint32) | payload
+# The version names the payload: PCM s16le samples, or one Opus packet
+AUDIO_FRAME_VERSION = 1
+OPUS_FRAME_VERSION = 2
+AUDIO_FRAME_HEADER = struct.Struct("!B16sI")
+
+
+def pack_audio_frame(transcribe_id: str, sequence: int, audio_data) -> bytes:
+    return pack_frame(AUDIO_FRAME_VERSION, transcribe_id, sequence, np.asarray(audio_data, dtype="<i2").tobytes())
+
+
+def pack_opus_frame(transcribe_id: str, sequence: int, packet: bytes) -> bytes:
+    return pack_frame(OPUS_FRAME_VERSION, transcribe_id, sequence, packet)
+
+
+def pack_frame(version: int, transcribe_id: str, sequence: int, payload: bytes) -> bytes:
+    header = AUDIO_FRAME_HEADER.pack(
+        version,
+        uuid.UUID(transcribe_id).bytes,
+        sequence & 0xFFFFFFFF,
+    )
+    return header + payload
+
+
+def unpack_audio_frame(frame: bytes):
+    version, transcribe_id, sequence = unpack_frame_header(frame)
+    if version != AUDIO_FRAME_VERSION:
+        raise ValueError(f"Unsupported audio frame version: {version}")
+    samples = np.frombuffer(frame, dtype="<i2", offset=AUDIO_FRAME_HEADER.size)
+    return transcribe_id, sequence, samples
+
+
+def unpack_opus_frame(frame: bytes):
+    version, transcribe_id, sequence = unpack_frame_header(frame)
+    if version != OPUS_FRAME_VERSION:
+        raise ValueError(f"Not an Opus audio frame: version {version}")
+    return transcribe_id, sequence, bytes(frame[AUDIO_FRAME_HEADER.size:])
+
+
+def unpack_frame_header(frame: bytes):
+    version, id_bytes, sequence = AUDIO_FRAME_HEADER.unpack_from(frame)
+    return version, str(uuid.UUID(bytes=id_bytes)), sequence
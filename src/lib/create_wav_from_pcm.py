@@ -1,13 +1,9 @@
-import wave
-import numpy as np
 import uuid
+from lib.audio_bytes import pcm_to_wav_bytes
 
 
 def create_wav_from_pcm(pcm_samples, sample_rate):
     file_path = f"/app/wav_files/{uuid.uuid4()}.wav"
-    with wave.open(file_path, "wb") as wf:
-        wf.setnchannels(1)  # Mono
-        wf.setsampwidth(2)  # 16-bit PCM
-        wf.setframerate(sample_rate)
-        wf.writeframes(np.array(pcm_samples, dtype=np.int16).tobytes())
-        return file_path
\ No newline at end of file
+    with open(file_path, "wb") as f:
+        f.write(pcm_to_wav_bytes(pcm_samples, sample_rate))  # Mono 16-bit PCM
+    return file_path
@@ -0,0 +1,47 @@
+import asyncio
+import threading
+from typing import AsyncGenerator, Callable, Iterable
+
+_END = object()
+
+
+async def iterate_in_thread(make_iterable: Callable[[], Iterable]) -> AsyncGenerator:
+    # Runs a blocking iterator in a worker thread and yields its items as soon as they are produced
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def push(item, error=None):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, (item, error))
+        except RuntimeError:
+            # Event loop already closed - nobody is listening anymore
+            stop.set()
+
+    def produce():
+        iterator = None
+        try:
+            iterator = iter(make_iterable())
+            for item in iterator:
+                if stop.is_set():
+                    break
+                push(item)
+            push(_END)
+        except Exception as e:
+            push(_END, e)
+        finally:
+            # Release the underlying connection if the consumer stopped early
+            if iterator is not None and hasattr(iterator, "close"):
+                iterator.close()
+
+    loop.run_in_executor(None, produce)
+    try:
+        while True:
+            item, error = await queue.get()
+            if item is _END:
+                if error:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
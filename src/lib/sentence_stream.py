@@ -15,29 +15,129 @@
 #         yield text
 
 import re
-from typing import AsyncGenerator
+import time
+from typing import AsyncGenerator, Optional, Union
 
 
 # Regex to match sentence-ending punctuation
 SENTENCE_END_RE = re.compile(r"([.!?])([\s\n]|$)")
 
-async def sentence_stream(token_generator: AsyncGenerator[str, None]) -> AsyncGenerator[str, None]:
-    buffer = ""
+# Clause boundaries for the early first chunk - punctuation must be followed by whitespace,
+# so decimals ("3,5"), thousands ("1,000") and URLs ("https://") never match
+CLAUSE_END_RE = re.compile(r"([,;:]|\s[-\u2013\u2014])\s")
+
+# Longest first segment scanned for an early cut before falling back to full sentences
+FIRST_CHUNK_MAX_SCAN_CHARS = 1000
+
+# Words that end in a period without ending a sentence
+ABBREVIATIONS = {
+    "mr.", "mrs.", "ms.", "dr.", "prof.", "sr.", "jr.", "st.", "vs.", "etc.",
+    "e.g.", "i.e.", "approx.", "no.", "inc.", "ltd.", "co.", "jan.", "feb.",
+    "mar.", "apr.", "jun.", "jul.", "aug.", "sep.", "sept.", "oct.", "nov.", "dec.",
+}
+
+
+# Marks the start of a new LLM response in a token stream
+class ResponseStart:
+    def __init__(self, response_id: Optional[str]):
+        self.response_id = response_id
+
+
+async def sentence_stream(
+        token_generator: AsyncGenerator[Union[str, ResponseStart], None],
+        early_first_chunk: bool = False,
+        first_chunk_min_words: int = 3,
+        first_chunk_max_words: int = 12,
+        first_chunk_max_delay_ms: Optional[float] = 600,
+    ) -> AsyncGenerator[str, None]:
+    # Unmatched text is kept as a list of pieces and only joined when a sentence is emitted.
+    # A sentence end can only start inside the newest token: if the text before it ended in
+    # punctuation, that punctuation already matched at end of buffer. So each token is scanned
+    # once and the whole stream is processed in linear time.
+    pieces: list[str] = []
+    pieces_len = 0
+    # Latency-aware mode: the first segment of each response may end at a clause boundary or budget
+    first_segment_pending = early_first_chunk
+    response_started_at = None
 
     async for token in token_generator:
-        buffer += token
+        # New response - flush what's left of the previous one and reset the first-chunk state
+        if isinstance(token, ResponseStart):
+            remaining = "".join(pieces).strip()
+            if remaining:
+                yield remaining
+            pieces, pieces_len = [], 0
+            first_segment_pending = early_first_chunk
+            response_started_at = None
+            continue
+
+        if response_started_at is None:
+            response_started_at = time.monotonic()
 
+        scan_idx = 0
         while True:
-            match = SENTENCE_END_RE.search(buffer)
+            match = SENTENCE_END_RE.search(token, scan_idx)
             if not match:
                 break
 
             end_idx = match.end()
-            sentence = buffer[:end_idx].strip()
+            pieces.append(token[scan_idx:end_idx])
+            sentence = "".join(pieces).strip()
+            pieces, pieces_len = [], 0
             if sentence:
                 yield sentence
-            buffer = buffer[end_idx:]
+                first_segment_pending = False
+            scan_idx = end_idx
+
+        if scan_idx < len(token):
+            pieces.append(token[scan_idx:])
+            pieces_len += len(token) - scan_idx
+
+        if first_segment_pending and pieces:
+            # Give up on an early cut for text without usable boundaries so rescanning stays bounded
+            if pieces_len > FIRST_CHUNK_MAX_SCAN_CHARS:
+                first_segment_pending = False
+                continue
+            buffer = "".join(pieces)
+            pieces = [buffer]
+            elapsed_ms = (time.monotonic() - response_started_at) * 1000
+            end_idx = first_chunk_end(buffer, first_chunk_min_words, first_chunk_max_words, first_chunk_max_delay_ms, elapsed_ms)
+            if end_idx is not None:
+                yield buffer[:end_idx].strip()
+                pieces = [buffer[end_idx:]]
+                pieces_len = len(pieces[0])
+                first_segment_pending = False
 
     # Flush any remaining text at the end
-    if buffer.strip():
-        yield buffer.strip()
\ No newline at end of file
+    remaining = "".join(pieces).strip()
+    if remaining:
+        yield remaining
+
+
+# First Chunk End - where to cut the first segment of a response early, or None to keep waiting
+def first_chunk_end(
+        buffer: str,
+        min_words: int,
+        max_words: int,
+        max_delay_ms: Optional[float],
+        elapsed_ms: float,
+    ) -> Optional[int]:
+    # Clause boundary with enough words in front of it
+    for match in CLAUSE_END_RE.finditer(buffer):
+        if len(buffer[:match.start()].split()) >= min_words:
+            return match.end()
+
+    # Word or time budget - cut after the last complete word
+    word_count = len(buffer.split())
+    over_word_budget = word_count > max_words
+    over_time_budget = max_delay_ms is not None and elapsed_ms >= max_delay_ms and word_count > min_words
+    if not (over_word_budget or over_time_budget):
+        return None
+
+    cut_idx = max(buffer.rfind(" "), buffer.rfind("\n"))
+    if cut_idx <= 0:
+        return None
+    words_before_cut = buffer[:cut_idx].split()
+    if len(words_before_cut) < min_words or words_before_cut[-1].lower() in ABBREVIATIONS:
+        return None
+    return cut_idx + 1
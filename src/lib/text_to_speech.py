@@ -1,14 +1,24 @@
 import uuid
 import pyttsx3
-engine = pyttsx3.init()
 
-def text_to_speech(text: str):
+# Created on first use so importing this module doesn't start a speech engine
+engine = None
+
+def get_engine():
+    global engine
+    if engine is None:
+        engine = pyttsx3.init()
+    return engine
+
+def text_to_speech(text: str, wav_path: str = None):
     try:
         # Set properties before saving
-        wav_path = f"/app/wav_files/{uuid.uuid4()}.wav"
+        if wav_path is None:
+            wav_path = f"/app/wav_files/{uuid.uuid4()}.wav"
         text = f"   {text.strip()}    "
+        engine = get_engine()
         engine.save_to_file(text, wav_path)
         engine.runAndWait()
         return wav_path
     except Exception as e:
-        raise Exception(f"Error converting text to speech: {e}")
\ No newline at end of file
+        raise Exception(f"Error converting text to speech: {e}")
@@ -1,48 +1,38 @@
-import asyncio
 import os
-from typing import AsyncGenerator
+from typing import Optional
 import numpy as np
-from elevenlabs.client import ElevenLabs
-from elevenlabs import VoiceSettings
 from scipy.signal import resample_poly
+from lib.tts.TTSEngine import TTSEngine
+from lib.tts.get_tts_engine import get_tts_engine
+from models.TTSAudioCache import TTSAudioCache
 
-client = ElevenLabs(api_key=os.getenv('ELEVENLABS_API_KEY'))
+tts_audio_cache = TTSAudioCache(
+    max_memory_bytes=int(os.getenv("TTS_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+    disk_dir=os.getenv("TTS_CACHE_DIR"),
+)
 
-async def text_to_speech_stream(text: str, voice_id: str):
+
+async def text_to_speech_stream(text: str, voice_id: str, engine: Optional[TTSEngine] = None):
+
+    if engine is None:
+        engine = get_tts_engine()
 
     if not voice_id:
-        voice_id = "5egO01tkUjEzu7xSSE8M"  # Default voice ID if not provided
-
-    voice_settings = VoiceSettings(
-        stability=0.75,
-        similarity_boost=0.75,
-        style=0.5,
-        speed=1,
-        use_speaker_boost=True
-    )
-
-    loop = asyncio.get_event_loop()
-
-    # Use a thread to avoid blocking the event loop with ElevenLabs call
-    stream = await loop.run_in_executor(None, lambda: client.text_to_speech.convert_as_stream(
-        text=text,
-        voice_id=voice_id,
-        model_id="eleven_multilingual_v2",
-        voice_settings=voice_settings,
-        output_format="pcm_48000"
-    ))
-
-    # Now parse stream in executor too
-    def process_stream():
-        for chunk in stream:
-            if not isinstance(chunk, bytes):
-                continue
-            samples = np.frombuffer(chunk, dtype=np.int16)
-            stereo = np.column_stack((samples, samples)).flatten()
-            # resampled = resample_poly(samples, up=48000, down=22050).astype(np.int16)
-            # stereo = np.column_stack((resampled, resampled)).flatten()
-            yield stereo
-
-    # Use executor to yield PCM chunks without blocking event loop
-    for pcm_chunk in await loop.run_in_executor(None, lambda: list(process_stream())):
-        yield pcm_chunk
+        voice_id = engine.default_voice_id  # Default voice ID if not provided
+
+    # Cached sentences go straight to the track without a network round trip
+    cache_key = tts_audio_cache.make_key(text, voice_id, engine.cache_id(), engine.voice_settings)
+    cached_samples = tts_audio_cache.get(cache_key)
+    if cached_samples is not None:
+        yield cached_samples
+        return
+
+    # Stream mono chunks from the engine, keeping them to cache once the sentence completes
+    synthesized = []
+    async for samples in engine.stream(text, voice_id):
+        synthesized.append(samples)
+        # resampled = resample_poly(samples, up=48000, down=22050).astype(np.int16)
+        yield samples
+
+    if synthesized:
+        tts_audio_cache.put(cache_key, np.concatenate(synthesized))
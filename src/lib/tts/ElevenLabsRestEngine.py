@@ -0,0 +1,24 @@
+import asyncio
+from typing import AsyncGenerator, Optional
+import numpy as np
+from lib.audio_bytes import mp3_bytes_to_pcm
+from lib.text_to_wav_file import request_elevenlabs_mp3, DEFAULT_VOICE_ID, MODEL_ID, VOICE_SETTINGS
+from lib.tts.TTSEngine import TTSEngine
+
+
+class ElevenLabsRestEngine(TTSEngine):
+    # Requests a whole MP3 per sentence from the ElevenLabs REST endpoint and decodes it off the event loop
+    name = "elevenlabs_rest"
+    sample_rate = 48000
+    default_voice_id = DEFAULT_VOICE_ID
+    voice_settings = VOICE_SETTINGS
+
+    def cache_id(self) -> str:
+        return f"{self.name}/{MODEL_ID}/{self.sample_rate}"
+
+    async def stream(self, text: str, voice_id: Optional[str] = None) -> AsyncGenerator[np.ndarray, None]:
+        loop = asyncio.get_running_loop()
+        mp3_bytes = await loop.run_in_executor(None, request_elevenlabs_mp3, text, voice_id or self.default_voice_id)
+        samples, _, _ = await loop.run_in_executor(None, mp3_bytes_to_pcm, mp3_bytes, self.sample_rate, 1)
+        for chunk in self.chunk_samples(samples):
+            yield chunk
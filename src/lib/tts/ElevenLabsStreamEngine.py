@@ -0,0 +1,55 @@
+import os
+from typing import AsyncGenerator, Optional
+import numpy as np
+from elevenlabs.client import ElevenLabs
+from elevenlabs import VoiceSettings
+from lib.iterate_in_thread import iterate_in_thread
+from lib.tts.TTSEngine import TTSEngine
+
+
+class ElevenLabsStreamEngine(TTSEngine):
+    # Streams raw PCM from the ElevenLabs streaming endpoint as it is generated
+    name = "elevenlabs"
+    sample_rate = 48000
+    default_voice_id = "5egO01tkUjEzu7xSSE8M"
+    model_id = "eleven_multilingual_v2"
+    output_format = "pcm_48000"
+    voice_settings = {
+        "stability": 0.75,
+        "similarity_boost": 0.75,
+        "style": 0.5,
+        "speed": 1,
+        "use_speaker_boost": True,
+    }
+
+    def __init__(self):
+        self.client = ElevenLabs(api_key=os.getenv('ELEVENLABS_API_KEY'))
+
+    def cache_id(self) -> str:
+        return f"{self.model_id}/{self.output_format}"
+
+    async def stream(self, text: str, voice_id: Optional[str] = None) -> AsyncGenerator[np.ndarray, None]:
+
+        def open_stream():
+            return self.client.text_to_speech.convert_as_stream(
+                text=text,
+                voice_id=voice_id or self.default_voice_id,
+                model_id=self.model_id,
+                voice_settings=VoiceSettings(**self.voice_settings),
+                output_format=self.output_format
+            )
+
+        # Read the ElevenLabs stream in a thread and yield PCM chunks as they arrive
+        remainder = b""
+        async for chunk in iterate_in_thread(open_stream):
+            if not isinstance(chunk, bytes):
+                continue
+
+            # Network chunks can split a 16-bit sample - carry the odd byte over
+            chunk = remainder + chunk
+            usable = len(chunk) - (len(chunk) % 2)
+            remainder = chunk[usable:]
+            if usable == 0:
+                continue
+
+            yield np.frombuffer(chunk[:usable], dtype=np.int16)
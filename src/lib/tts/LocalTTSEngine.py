@@ -0,0 +1,78 @@
+import asyncio
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncGenerator, Optional
+import numpy as np
+from lib.audio_bytes import wav_bytes_to_pcm
+from lib.tts.TTSEngine import TTSEngine
+
+
+# Runs once in each worker process so the first sentence doesn't pay for engine start up
+def warm_up_worker():
+    from lib.text_to_speech import get_engine
+    get_engine()
+
+
+# Synthesize In Worker - pyttsx3 to a temporary WAV, returned as mono int16 bytes at sample_rate
+def synthesize_in_worker(text: str, sample_rate: int) -> bytes:
+    from lib.text_to_speech import text_to_speech
+    fd, wav_path = tempfile.mkstemp(suffix=".wav")
+    os.close(fd)
+    try:
+        text_to_speech(text, wav_path)
+        with open(wav_path, "rb") as f:
+            wav_bytes = f.read()
+    finally:
+        os.remove(wav_path)
+
+    samples, _, _ = wav_bytes_to_pcm(wav_bytes, sample_rate=sample_rate, channels=1)
+    return samples.tobytes()
+
+
+class LocalTTSEngine(TTSEngine):
+    # Offline pyttsx3/espeak synthesis in a pool of warm worker processes, one engine per process
+    name = "local"
+    sample_rate = 48000
+
+    def __init__(self, max_workers: Optional[int] = None):
+        if max_workers is None:
+            max_workers = int(os.getenv("LOCAL_TTS_WORKERS", 2))
+        self.max_workers = max_workers
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.start_workers()
+
+    def start_workers(self):
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=warm_up_worker,
+        )
+        # Start the workers now rather than on the first sentence
+        for _ in range(self.max_workers):
+            self.executor.submit(int)
+
+    def cache_id(self) -> str:
+        return f"{self.name}/{self.sample_rate}"
+
+    async def stream(self, text: str, voice_id: Optional[str] = None) -> AsyncGenerator[np.ndarray, None]:
+        # pyttsx3 voices are local to the machine, so the agent's voice id is not used
+        loop = asyncio.get_running_loop()
+        executor = self.executor
+        try:
+            pcm_bytes = await loop.run_in_executor(executor, synthesize_in_worker, text, self.sample_rate)
+        except BrokenProcessPool:
+            # A worker died (e.g. the speech engine crashed) - replace the pool for the next sentence,
+            # unless a concurrent stream that hit the same broken pool already has
+            if self.executor is executor:
+                print("Local TTS worker pool broke, restarting it")
+                executor.shutdown(wait=False, cancel_futures=True)
+                self.start_workers()
+            raise
+        for chunk in self.chunk_samples(np.frombuffer(pcm_bytes, dtype=np.int16)):
+            yield chunk
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
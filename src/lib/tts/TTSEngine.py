@@ -0,0 +1,28 @@
+from abc import ABC, abstractmethod
+from typing import AsyncGenerator, Optional
+import numpy as np
+
+
+class TTSEngine(ABC):
+    # Base for text to speech engines - stream() yields mono int16 PCM chunks at sample_rate
+    name = "base"
+    sample_rate = 48000
+    default_voice_id: Optional[str] = None
+    voice_settings: dict = {}
+
+    # Cache ID - identifies the engine configuration in TTS cache keys
+    def cache_id(self) -> str:
+        return self.name
+
+    @abstractmethod
+    def stream(self, text: str, voice_id: Optional[str] = None) -> AsyncGenerator[np.ndarray, None]:
+        pass
+
+    def close(self):
+        pass
+
+    # Chunk Samples - splits a fully synthesized sentence into stream-sized chunks
+    def chunk_samples(self, samples: np.ndarray, chunk_ms: int = 100):
+        chunk_size = self.sample_rate * chunk_ms // 1000
+        for start in range(0, len(samples), chunk_size):
+            yield samples[start:start + chunk_size]
@@ -0,0 +1,25 @@
+import os
+from typing import Optional
+from lib.tts.TTSEngine import TTSEngine
+from lib.tts.ElevenLabsStreamEngine import ElevenLabsStreamEngine
+from lib.tts.ElevenLabsRestEngine import ElevenLabsRestEngine
+from lib.tts.LocalTTSEngine import LocalTTSEngine
+
+TTS_ENGINES = {
+    "elevenlabs": ElevenLabsStreamEngine,
+    "elevenlabs_rest": ElevenLabsRestEngine,
+    "local": LocalTTSEngine,
+}
+
+# Engines are shared process-wide so clients and worker pools are created once
+tts_engines: dict[str, TTSEngine] = {}
+
+
+def get_tts_engine(name: Optional[str] = None) -> TTSEngine:
+    name = name or os.getenv("TTS_ENGINE", "elevenlabs")
+    if name not in TTS_ENGINES:
+        print(f"Unknown TTS engine: {name}, using elevenlabs")
+        name = "elevenlabs"
+    if name not in tts_engines:
+        tts_engines[name] = TTS_ENGINES[name]()
+    return tts_engines[name]
@@ -1,16 +1,19 @@
 import numpy as np
+from lib.audio_features import AudioFeatures, extract_audio_features
+
+MAX_SAMPLE = 32767
 
 def calculate_energy(audio_data):
-    energy = np.sum(audio_data ** 2)
+    samples = np.asarray(audio_data, dtype=np.float64)
+    return float(np.dot(samples, samples))
+
+def vad(audio_data=None, energy_threshold=0.001, features: AudioFeatures = None):
+    # Reuse the frame's precomputed features when available
+    if features is None:
+        features = extract_audio_features(audio_data)
 
-def vad(audio_data, energy_threshold=0.001):
-    audio_data = np.asarray(audio_data, dtype=np.float32)
-    #print(f"Max audio_data: ", np.max(audio_data))
-        
-    MAX_SAMPLE = 32767
-    max_energy = len(audio_data) * (MAX_SAMPLE ** 2)
-    energy = np.sum(audio_data ** 2)
+    max_energy = features.sample_count * (MAX_SAMPLE ** 2)
 
-    #print(f"{max_energy} : {energy}")
+    #print(f"{max_energy} : {features.energy}")
     
-    return energy > max_energy * energy_threshold
+    return features.energy > max_energy * energy_threshold
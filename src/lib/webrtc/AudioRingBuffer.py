@@ -0,0 +1,78 @@
+import numpy as np
+
+
+class AudioRingBuffer:
+    def __init__(self, capacity: int = 48000 * 2 * 10, dtype=np.int16):
+        self.buffer = np.zeros(capacity, dtype=dtype)
+        # Absolute positions - the physical index is position % capacity
+        self.read_position = 0
+        self.write_position = 0
+
+    def __len__(self):
+        return self.write_position - self.read_position
+
+    @property
+    def capacity(self):
+        return len(self.buffer)
+
+    # Write - copies samples in with at most two slice assignments, growing the buffer if needed
+    def write(self, samples):
+        samples = np.asarray(samples, dtype=self.buffer.dtype).reshape(-1)
+        count = len(samples)
+        if count == 0:
+            return
+        if len(self) + count > self.capacity:
+            self.grow(len(self) + count)
+
+        start = self.write_position % self.capacity
+        first = min(count, self.capacity - start)
+        self.buffer[start:start + first] = samples[:first]
+        if first < count:
+            self.buffer[:count - first] = samples[first:]
+        self.write_position += count
+
+    # Read Into - copies the next len(out) samples into out and consumes them
+    def read_into(self, out: np.ndarray):
+        self.copy_into(self.read_position, out)
+        self.read_position += len(out)
+        return out
+
+    # Copy Into - copies len(out) buffered samples starting at an absolute position, without consuming them
+    def copy_into(self, position: int, out: np.ndarray):
+        count = len(out)
+        if position < self.read_position or position + count > self.write_position:
+            raise ValueError(f"Cannot read {count} samples at {position}, buffered {self.read_position}-{self.write_position}")
+
+        start = position % self.capacity
+        first = min(count, self.capacity - start)
+        out[:first] = self.buffer[start:start + first]
+        if first < count:
+            out[first:] = self.buffer[:count - first]
+        return out
+
+    # Discard To - consumes everything before an absolute position
+    def discard_to(self, position: int):
+        self.read_position = min(max(position, self.read_position), self.write_position)
+
+    # Read - consumes the next count samples into a new array
+    def read(self, count: int) -> np.ndarray:
+        return self.read_into(np.empty(count, dtype=self.buffer.dtype))
+
+    # Clear - drops everything buffered
+    def clear(self):
+        self.read_position = self.write_position
+
+    # Grow - reallocates to at least min_capacity. Positions stay absolute, so each buffered sample
+    # moves to position % new capacity and positions held elsewhere (cursors, sentence ranges) stay valid
+    def grow(self, min_capacity: int):
+        capacity = self.capacity
+        while capacity < min_capacity:
+            capacity *= 2
+        buffered = len(self)
+        new_buffer = np.zeros(capacity, dtype=self.buffer.dtype)
+        start = self.read_position % capacity
+        first = min(buffered, capacity - start)
+        self.copy_into(self.read_position, new_buffer[start:start + first])
+        if first < buffered:
+            self.copy_into(self.read_position + first, new_buffer[:buffered - first])
+        self.buffer = new_buffer
@@ -1,7 +1,7 @@
+import asyncio
 import json
 import uuid
-from typing import Callable, Dict, Any, Optional
-from lib.webrtc.functions.till_true import till_true
+from typing import Awaitable, Callable, Dict, Any, Optional
 
 
 class JSONRPCResponse:
@@ -13,12 +13,21 @@ class JSONRPCResponse:
 class JSONRPCPeer:
     def __init__(self, sender: Callable[[str], None]):
         self.sender = sender
-        self.response_queue: Dict[str, Optional[JSONRPCResponse]] = {}
+        self.response_queue: Dict[str, asyncio.Future] = {}
         self.handler_registry: Dict[str, Callable[[Dict[str, Any]], Any]] = {}
 
     def on(self, method: str, handler: Callable[[Dict[str, Any]], Any]):
         self.handler_registry[method] = handler
 
+    # Encode Call - serializes a request so it can be built once and sent to many peers
+    @staticmethod
+    def encode_call(method: str, params: Dict[str, Any], msg_id: Optional[str] = None) -> str:
+        return json.dumps({
+            "method": method,
+            "params": params,
+            "id": msg_id
+        })
+
     async def call(
         self,
         method: str,
@@ -27,25 +36,49 @@ class JSONRPCPeer:
         timeout: int = 5
     ) -> Optional[Dict[str, Any]]:
 
-        msg_id = str(uuid.uuid4()) if await_response else None
+        if not await_response:
+            await self.sender(self.encode_call(method, params))
+            return
+
+        response = await self.request(method, params, timeout=timeout)
+        return await response
 
-        message = json.dumps({
-            "method": method,
-            "params": params,
-            "id": msg_id
-        })
+    # Request - sends a call and returns once it is sent, with an awaitable for its response
+    async def request(
+        self,
+        method: str,
+        params: Dict[str, Any],
+        timeout: int = 5
+    ) -> Awaitable[Dict[str, Any]]:
 
-        await self.sender(message)
+        msg_id = str(uuid.uuid4())
 
-        if not await_response or msg_id is None:
-            return
+        # Register the pending call before sending so a fast reply can't be missed
+        response_future = asyncio.get_running_loop().create_future()
+        self.response_queue[msg_id] = response_future
+
+        try:
+            await self.sender(self.encode_call(method, params, msg_id))
+        except Exception:
+            self.response_queue.pop(msg_id, None)
+            raise
 
-        self.response_queue[msg_id] = None
+        return self.wait_for_response(method, msg_id, response_future, timeout)
 
-        if not await till_true(lambda: self.response_queue[msg_id] is not None, timeout=timeout):
+    async def wait_for_response(
+        self,
+        method: str,
+        msg_id: str,
+        response_future: asyncio.Future,
+        timeout: int
+    ) -> Dict[str, Any]:
+
+        try:
+            response: JSONRPCResponse = await asyncio.wait_for(response_future, timeout=timeout)
+        except asyncio.TimeoutError:
             raise TimeoutError(f"Timeout waiting for response to {method}")
-        
-        response = self.response_queue.pop(msg_id)
+        finally:
+            self.response_queue.pop(msg_id, None)
 
         if response.result.get("error"):
             raise Exception(f"Error in response to {method}: {response.result['error']}")
@@ -59,6 +92,10 @@ class JSONRPCPeer:
             print("Error parsing message", e)
             return
 
+        await self.handle_parsed_message(parsed_message)
+
+    # Handle Parsed Message - dispatches an already decoded message
+    async def handle_parsed_message(self, parsed_message: Dict[str, Any]):
         # Request
         if "method" in parsed_message and "params" in parsed_message:
             handler = self.handler_registry.get(parsed_message["method"])
@@ -92,7 +129,10 @@ class JSONRPCPeer:
             print("Response Queue", self.response_queue)
             return
 
-        self.response_queue[parsed_message["id"]] = JSONRPCResponse(
+        response_future = self.response_queue[parsed_message["id"]]
+        if response_future.done():
+            return
+        response_future.set_result(JSONRPCResponse(
             id=parsed_message["id"],
             result=parsed_message.get("result", {})
-        )
+        ))
@@ -0,0 +1,125 @@
+import asyncio
+import time
+from typing import Optional
+
+
+class MediaClock:
+    # One timer for every outbound synthetic track: each tick prepares the next frame of every
+    # track waiting in recv() in a single batch, instead of one asyncio.sleep per track per frame.
+    # Every track keeps its own schedule (its anchor plus its media time), anchored on the clock's
+    # tick grid so tracks that keep up are all due on the same tick
+    shared_clock: Optional["MediaClock"] = None
+
+    def __init__(self, frame_period_ns: int = 20_000_000, max_lag_frames: int = 5, idle_ticks_before_stop: int = 50):
+        # Configuration
+        self.frame_period_ns = frame_period_ns
+        self.max_lag_ns = max_lag_frames * frame_period_ns  # Beyond this behind schedule, a track resyncs instead of catching up
+        self.idle_ticks_before_stop = idle_ticks_before_stop  # Ticks with no track waiting before the tick task exits
+
+        # State variables
+        self.waiters: dict = {}  # track -> future for its next frame
+        self.tick_task: Optional[asyncio.Task] = None
+        self.anchor_ns: Optional[int] = None  # Origin of the tick grid
+
+        # Counters
+        self.ticks = 0
+        self.tick_tasks_started = 0
+        self.frames_prepared = 0
+        self.late_ticks = 0
+        self.resyncs = 0  # Across all tracks, each track also counts its own
+
+    # Shared - the process-wide clock
+    @classmethod
+    def shared(cls) -> "MediaClock":
+        if cls.shared_clock is None:
+            cls.shared_clock = cls()
+        return cls.shared_clock
+
+    # Next Frame - resolves with the track's next frame once it is due
+    def next_frame(self, track) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = self.waiters.pop(track, None)
+        if future is None or future.done():
+            future = loop.create_future()
+        now_ns = time.monotonic_ns()
+        if self.anchor_ns is None:
+            self.anchor_ns = now_ns
+
+        if track.clock_anchor_ns is None:
+            # First frame - start the track's schedule on the latest tick
+            track.start_schedule(self.tick_at_or_before(now_ns))
+        elif now_ns - track.frame_due_ns() > self.max_lag_ns:
+            # Too far behind (e.g. a stalled consumer) - restart the schedule from now rather than bursting the backlog
+            track.start_schedule(self.tick_at_or_before(now_ns), resync=True)
+            self.resyncs += 1
+
+        # Behind schedule but within the lag bound - hand the frame out now so the track catches up
+        due_ns = track.frame_due_ns()
+        if due_ns <= now_ns:
+            self.prepare(track, future, due_ns, now_ns)
+            return future
+
+        self.waiters[track] = future
+        if self.tick_task is None or self.tick_task.done() or self.tick_task.get_loop() is not loop:
+            self.tick_task = asyncio.create_task(self.run())
+            self.tick_tasks_started += 1
+        return future
+
+    def remove(self, track):
+        future = self.waiters.pop(track, None)
+        if future and not future.done():
+            future.cancel()
+
+    # Tick At Or Before - the latest grid tick no later than the given time
+    def tick_at_or_before(self, time_ns: int) -> int:
+        return time_ns - (time_ns - self.anchor_ns) % self.frame_period_ns
+
+    async def run(self):
+        # Ticks on the grid while tracks are waiting - a stalled loop skips ticks instead of bursting them.
+        # Every tick hands out all waiting frames, so the waiters are empty until the tracks call recv()
+        # again; the task keeps ticking through a grace period of idle ticks rather than exiting and
+        # being recreated every frame
+        idle_ticks = 0
+        while idle_ticks <= self.idle_ticks_before_stop:
+            now_ns = time.monotonic_ns()
+            tick_due_ns = self.tick_at_or_before(now_ns) + self.frame_period_ns
+            await asyncio.sleep((tick_due_ns - now_ns) / 1_000_000_000)
+            if self.waiters:
+                idle_ticks = 0
+                self.tick(tick_due_ns)
+            else:
+                idle_ticks += 1
+
+    # Tick - prepares and hands out the frame of every waiting track that is due
+    def tick(self, tick_due_ns: int):
+        tick_ns = time.monotonic_ns()
+        if tick_ns - tick_due_ns > self.frame_period_ns // 2:
+            self.late_ticks += 1
+        self.ticks += 1
+
+        waiters, self.waiters = self.waiters, {}
+        for track, future in waiters.items():
+            if future.done():
+                continue  # recv() was cancelled
+            due_ns = track.frame_due_ns()
+            if due_ns > max(tick_ns, tick_due_ns):  # The sleep may wake a hair before the tick
+                self.waiters[track] = future
+                continue
+            self.prepare(track, future, due_ns, tick_ns)
+
+    def prepare(self, track, future: asyncio.Future, due_ns: int, now_ns: int):
+        try:
+            future.set_result(track.prepare_frame(due_ns, now_ns))
+            self.frames_prepared += 1
+        except Exception as e:
+            future.set_exception(e)
+
+    def stats(self) -> dict:
+        return {
+            "ticks": self.ticks,
+            "tick_tasks_started": self.tick_tasks_started,
+            "frames_prepared": self.frames_prepared,
+            "late_ticks": self.late_ticks,
+            "resyncs": self.resyncs,
+            "tracks_waiting": len(self.waiters),
+        }
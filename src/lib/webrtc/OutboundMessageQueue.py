@@ -0,0 +1,50 @@
+import asyncio
+from collections import deque
+from typing import Optional
+
+
+class OutboundMessageQueue:
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.messages: deque[list] = deque()  # [coalesce_key, message]
+        self.has_messages = asyncio.Event()
+        self.dropped = 0
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self.messages)
+
+    # Put - never blocks. When full, a status message replaces the pending one with the same key,
+    # otherwise the oldest status message is dropped to make room. Returns False if the message was dropped.
+    def put(self, message: str, coalesce_key: Optional[str] = None) -> bool:
+        if len(self.messages) >= self.maxsize:
+            if coalesce_key is not None:
+                for entry in self.messages:
+                    if entry[0] == coalesce_key:
+                        entry[1] = message
+                        self.coalesced += 1
+                        return True
+            if not self.drop_oldest_status():
+                self.dropped += 1
+                return False
+
+        self.messages.append([coalesce_key, message])
+        self.has_messages.set()
+        return True
+
+    def drop_oldest_status(self) -> bool:
+        for index, entry in enumerate(self.messages):
+            if entry[0] is not None:
+                del self.messages[index]
+                self.dropped += 1
+                return True
+        return False
+
+    async def get(self) -> str:
+        while not self.messages:
+            self.has_messages.clear()
+            await self.has_messages.wait()
+        return self.messages.popleft()[1]
+
+    def clear(self):
+        self.messages.clear()
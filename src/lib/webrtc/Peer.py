@@ -1,4 +1,4 @@
-from typing import Callable, List
+from typing import Callable, List, Optional
 import asyncio
 from aiortc import (
     RTCPeerConnection,
@@ -10,6 +10,8 @@ from aiortc import (
     MediaStreamTrack
 )
 from lib.webrtc.functions.parse_candidate_sdp import parse_candidate_sdp
+from lib.webrtc.OutboundMessageQueue import OutboundMessageQueue
+from lib.audio_features import AudioFeatures, extract_audio_features
 
 
 class Peer:
@@ -19,6 +21,8 @@ class Peer:
             self_description: str,
             create_data_channel: bool = False,
             tracks: List[MediaStreamTrack] = [],
+            max_outbound_messages: int = 256,
+            max_buffered_amount: int = 256 * 1024,
         ):
         self.peer_id = peer_id
         self.self_description = self_description
@@ -26,7 +30,11 @@ class Peer:
         self.create_data_channel = create_data_channel
         self.tracks = tracks
         self.data_channel: RTCDataChannel | None = None
-        self.on_audio_data: Callable[[str, list, int], None] = lambda peer_id, samples, sample_rate: print(f"Audio data received from {peer_id}: {samples[:10]}... (sample rate: {sample_rate})")
+        self.outbound_messages = OutboundMessageQueue(maxsize=max_outbound_messages)
+        self.outbound_task: Optional[asyncio.Task] = None
+        self.max_buffered_amount = max_buffered_amount
+        self.buffered_amount_low = asyncio.Event()
+        self.on_audio_data: Callable[[str, list, int, AudioFeatures], None] = lambda peer_id, samples, sample_rate, features: print(f"Audio data received from {peer_id}: {samples[:10]}... (sample rate: {sample_rate})")
         self.on_message: Callable[[str, str], None] = lambda peer_id, message: print(f"Message received: peer {peer_id}: message {message}")
         self.on_data_channel_connection_status: Callable[[str, str], None] = lambda peer_id: print(f"Data channel opened for peer {peer_id}")
         self.on_connection_status: Callable[[str, str], None] = lambda peer_id, status: print(f"Connection status for peer {peer_id}: {status}")
@@ -117,8 +125,14 @@ class Peer:
         self.data_channel = channel
         channel.on("message", lambda msg: asyncio.create_task(self.on_message(msg)))
 
+        # Wake the outbound drain once the SCTP send buffer has room again
+        channel.bufferedAmountLowThreshold = self.max_buffered_amount
+        channel.on("bufferedamountlow", self.buffered_amount_low.set)
+
         def handle_open():
             print(f"Data channel opened for Peer {self.peer_id}")
+            if self.outbound_task is None:
+                self.outbound_task = asyncio.create_task(self.drain_outbound_messages())
             asyncio.create_task(self.on_data_channel_connection_status(self.peer_id, "connected"))
 
         channel.on("open", handle_open)
@@ -129,17 +143,35 @@ class Peer:
 
         def handle_close():
             print(f"Data channel closed for Peer {self.peer_id}")
+            self.buffered_amount_low.set()
             asyncio.create_task(self.on_data_channel_connection_status(self.peer_id, "disconnected"))
 
         channel.on("close", handle_close)
 
     # Send Message
     async def send_message(self, message: str):
-        if self.data_channel and self.data_channel.readyState == "open":
-            self.data_channel.send(message)
-            print(f"Sent data channel message to peer {self.peer_id}: {message}")
-        else:
+        self.enqueue_message(message)
+
+    # Enqueue Message - queues a message for the drain task without awaiting the data channel
+    def enqueue_message(self, message: str, coalesce_key: Optional[str] = None):
+        if not self.data_channel or self.data_channel.readyState != "open":
             print(f"Cannot send message — data channel not open - peer id: {self.peer_id}")
+            return
+        if not self.outbound_messages.put(message, coalesce_key=coalesce_key):
+            print(f"Outbound queue full, dropped message - peer id: {self.peer_id}")
+
+    # Drain Outbound Messages - sends queued messages, pausing while the data channel is backed up
+    async def drain_outbound_messages(self):
+        while True:
+            message = await self.outbound_messages.get()
+            channel = self.data_channel
+            if not channel or channel.readyState != "open":
+                continue
+            while channel.bufferedAmount > self.max_buffered_amount and channel.readyState == "open":
+                self.buffered_amount_low.clear()
+                await self.buffered_amount_low.wait()
+            if channel.readyState == "open":
+                channel.send(message)
 
 
     #############################
@@ -206,8 +238,11 @@ class Peer:
                 interleaved_samples = frame.to_ndarray()[0]
                 samples = interleaved_samples[::2]
 
+                # Compute per-frame features once for every consumer
+                features = extract_audio_features(samples)
+
                 # Call callback with audio data
-                await self.on_audio_data(self.peer_id, samples, frame.sample_rate)
+                await self.on_audio_data(self.peer_id, samples, frame.sample_rate, features)
                 
             except Exception as e:
                 print(f"Error receiving audio frame: {e} - Peer id: {self.peer_id}")
@@ -220,6 +255,10 @@ class Peer:
     
     # Close Peer
     def close(self):
+        if self.outbound_task:
+            self.outbound_task.cancel()
+            self.outbound_task = None
+        self.outbound_messages.clear()
         if self.pc:
             asyncio.create_task(self.pc.close())
             self.pc = None
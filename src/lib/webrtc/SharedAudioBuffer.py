@@ -0,0 +1,88 @@
+from collections import deque
+import numpy as np
+from lib.webrtc.AudioRingBuffer import AudioRingBuffer
+
+
+class SharedAudioBuffer:
+    # Agent audio written once and read by any number of tracks, each at its own cursor.
+    # Samples are released once the slowest listener has read them. A listener that stops reading
+    # (a sender still negotiating ICE, or stalled) is skipped ahead once it falls max_listener_lag
+    # samples behind the one reading ahead of it, so it can't pin the room's audio.
+
+    def __init__(self, capacity: int = 48000 * 10, max_listener_lag: int = 48000 * 5):
+        self.samples = AudioRingBuffer(capacity=capacity)
+        self.max_listener_lag = max_listener_lag
+        self.skipped_samples = 0  # Audio skipped by lagging listeners, summed over listeners
+        self.sentence_ranges: deque[list] = deque()  # [start, end, sentence_id] in absolute buffer positions
+        self.cursors: dict = {}  # listener -> absolute read position
+
+    # Add Listener - new listeners start at the live edge, like a freshly created track
+    def add_listener(self, listener):
+        self.cursors[listener] = self.samples.write_position
+
+    def remove_listener(self, listener):
+        if self.cursors.pop(listener, None) is not None:
+            self.release()
+
+    def available(self, listener) -> int:
+        return self.samples.write_position - self.cursors[listener]
+
+    def cursor(self, listener) -> int:
+        return self.cursors[listener]
+
+    def enqueue_audio_samples(self, audio_samples, sentence_id=None):
+        # Nobody is listening - nothing to keep
+        if not self.cursors:
+            return
+        start = self.samples.write_position
+        self.samples.write(audio_samples)
+        end = self.samples.write_position
+        if sentence_id is not None and end > start:
+            last_range = self.sentence_ranges[-1] if self.sentence_ranges else None
+            if last_range and last_range[1] == start and last_range[2] == sentence_id:
+                last_range[1] = end
+            else:
+                self.sentence_ranges.append([start, end, sentence_id])
+
+    # Read Into - copies the listener's next len(out) samples into out and advances its cursor
+    def read_into(self, listener, out: np.ndarray):
+        position = self.cursors[listener]
+        self.samples.copy_into(position, out)
+        self.cursors[listener] = position + len(out)
+        if position + len(out) - self.samples.read_position > self.max_listener_lag:
+            self.skip_lagging_listeners(position + len(out))
+        # Only the slowest listener can free space
+        elif position == self.samples.read_position:
+            self.release()
+        return out
+
+    # Skip Lagging Listeners - moves listeners too far behind lead_position up to it
+    def skip_lagging_listeners(self, lead_position: int):
+        for listener, cursor in self.cursors.items():
+            if lead_position - cursor > self.max_listener_lag:
+                print(f"Shared audio listener fell {lead_position - cursor} samples behind, skipping it ahead")
+                self.skipped_samples += lead_position - cursor
+                self.cursors[listener] = lead_position
+        self.release()
+
+    def release(self):
+        if self.cursors:
+            self.samples.discard_to(min(self.cursors.values()))
+        else:
+            self.samples.clear()
+        while self.sentence_ranges and self.sentence_ranges[0][1] <= self.samples.read_position:
+            self.sentence_ranges.popleft()
+
+    # Sentence Id At - the sentence covering an absolute buffer position
+    def sentence_id_at(self, position: int):
+        for start, end, sentence_id in self.sentence_ranges:
+            if end > position:
+                return sentence_id if start <= position else None
+        return None
+
+    # Flush - drops all queued audio for every listener
+    def flush(self):
+        self.samples.clear()
+        self.sentence_ranges.clear()
+        for listener in self.cursors:
+            self.cursors[listener] = self.samples.write_position
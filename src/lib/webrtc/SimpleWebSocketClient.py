@@ -1,6 +1,6 @@
 import asyncio
 import websockets
-from typing import Callable, Optional
+from typing import Callable, Optional, Union
 
 class SimpleWebSocketClient:
     def __init__(self, url: str):
@@ -33,6 +33,9 @@ class SimpleWebSocketClient:
         try:
             async for message in self.websocket:
                 await self.on_message_callback(message)
+            # Iteration also ends without an exception on a clean close
+            print("WebSocket connection closed.")
+            await self.on_connection_status_callback("disconnected")
         except websockets.exceptions.ConnectionClosed:
             print("WebSocket connection closed.")
             await self.on_connection_status_callback("disconnected")
@@ -40,7 +43,7 @@ class SimpleWebSocketClient:
             print("Listening task was cancelled.")
             await self.on_connection_status_callback("disconnected")
 
-    async def send(self, message: str):
+    async def send(self, message: Union[str, bytes]):
         if self.websocket:
             await self.websocket.send(message)
         
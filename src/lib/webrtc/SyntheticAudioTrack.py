@@ -1,103 +1,213 @@
 import asyncio
-from typing import Callable
+from typing import Callable, Optional
 from aiortc import MediaStreamTrack
 import av
 import numpy as np
-from pydub import AudioSegment
-from collections import deque
+from lib.audio_bytes import wav_bytes_to_pcm
 import fractions
-import time
+from lib.webrtc.SharedAudioBuffer import SharedAudioBuffer
+from lib.webrtc.MediaClock import MediaClock
 
 class SyntheticAudioTrack(MediaStreamTrack):
     kind = "audio"
 
-    def __init__(self):
+    def __init__(self, media_clock: Optional[MediaClock] = None, shared_audio: Optional[SharedAudioBuffer] = None):
         super().__init__()
         self.sample_rate = 48000
-        self.channels = 2
+        self.channels = 2  # Channels of the emitted frames
+        # Queued audio is mono - stereo is only produced when a frame is filled, which halves
+        # the queue: 96,000 instead of 192,000 bytes per queued second at 48kHz
         self.frame_size = 960  # 20ms frame at 48kHz
-        self.samples = deque()
-        self.sentence_ids = deque()
+        # Queued audio - a private buffer, or one shared with every listener of a broadcast
+        self.audio = shared_audio or SharedAudioBuffer(capacity=self.sample_rate * 10)
+        self.audio.add_listener(self)
         self.timestamp = 0
         self.time_base = fractions.Fraction(1, self.sample_rate)
-        self.start_time = time.time()
+        self.media_clock = media_clock or MediaClock.shared()  # Paces recv() for every track on one timer
+        self.frame_period_ns = self.frame_size * 1_000_000_000 // self.sample_rate
+        self.clock_anchor_ns = None  # Monotonic time of media time 0 - the next frame is due at anchor + timestamp
+        self.resyncs = 0
+        self.last_sent_ns = None
+        self.frames_sent = 0
+        self.late_frames = 0
+        self.jitter_ns = 0.0  # RFC 3550 style running estimate of inter-frame interval deviation
+        self.max_lateness_ns = 0
         self.on_is_speaking_sentence: Callable[[str], None] = lambda sentence_id: print(f"Is speaking sentence: {sentence_id}")
         self.on_stoped_speaking: Callable[[], None] = lambda: print("Stopped speaking")
+        self.on_sentence_gap: Callable[[float], None] = lambda gap_ms: print(f"Sentence gap: {gap_ms:.0f}ms")
+        self.on_flushed: Callable[[], None] = lambda: print("Flushed audio, playing silence")
+        self.on_frame: Optional[Callable[[np.ndarray], None]] = None  # Sees every outgoing frame's mono samples, must not block
+        self.flush_pending = False
         self.current_sentence_id = None
+        self.last_played_sentence_id = None
+        self.last_played_sentence_end = None  # pts right after the last frame of the previous sentence
         self.validating_speaking_stop = False
 
+        # Reusable outgoing frames - the sender encodes a frame before asking for the next one,
+        # so a frame is free again long before the pool wraps around to it
+        self.frame_pool = [self.create_pooled_frame() for _ in range(4)]
+        self.frame_pool_index = 0
+
     def on(self, event: str, callback: Callable):
         if event == "is_speaking_sentence":
             self.on_is_speaking_sentence = callback
         elif event == "stoped_speaking":
             self.on_stoped_speaking = callback
+        elif event == "sentence_gap":
+            self.on_sentence_gap = callback
+        elif event == "flushed":
+            self.on_flushed = callback
+        elif event == "frame":
+            self.on_frame = callback
         else:
             raise ValueError(f"Unknown event: {event}")
 
     async def recv(self):
-        # Wait until it's time to send the next 20ms frame
-        elapsed = time.time() - self.start_time
-        expected_ts = self.timestamp * self.time_base
-        sleep_time = float(expected_ts - elapsed)
-        if sleep_time > 0:
-            await asyncio.sleep(sleep_time)
-
-        # Get 20ms worth of samples or silence
-        needed_samples = self.frame_size * self.channels
-        if len(self.samples) >= needed_samples:
-            frame_data = [self.samples.popleft() for _ in range(needed_samples)]
-            chunk_sentence_ids = [self.sentence_ids.popleft() for _ in range(needed_samples)]
-            if self.current_sentence_id is None or chunk_sentence_ids[-1] != self.current_sentence_id:
-                self.current_sentence_id = chunk_sentence_ids[-1]
+        # Wait for the media clock's next 20ms tick, which prepares this track's frame
+        return await self.media_clock.next_frame(self)
+
+    def stop(self):
+        self.media_clock.remove(self)
+        self.audio.remove_listener(self)
+        super().stop()
+
+    # Start Schedule - anchors the track's schedule so its next frame is due at start_ns
+    def start_schedule(self, start_ns: int, resync: bool = False):
+        self.clock_anchor_ns = start_ns - self.timestamp * 1_000_000_000 // self.sample_rate
+        if resync:
+            self.resyncs += 1
+
+    # Frame Due - when the next frame is due on the track's own schedule
+    def frame_due_ns(self) -> int:
+        return self.clock_anchor_ns + self.timestamp * 1_000_000_000 // self.sample_rate
+
+    # Prepare Frame - called by the media clock once this track's next frame is due
+    def prepare_frame(self, due_ns: int, sent_ns: int):
+        self.track_pacing(due_ns, sent_ns)
+
+        # Get 20ms worth of samples or silence, written straight into a pooled frame
+        pooled_frame = self.frame_pool[self.frame_pool_index]
+        self.frame_pool_index = (self.frame_pool_index + 1) % len(self.frame_pool)
+        audio_frame, frame_data = pooled_frame[0], pooled_frame[1]
+        left, right = frame_data[0::2], frame_data[1::2]
+        if self.audio.available(self) >= self.frame_size:
+            last_position = self.audio.cursor(self) + self.frame_size - 1
+            sentence_id = self.audio.sentence_id_at(last_position)
+            # Mono samples go into the left channel and are copied to the right
+            self.audio.read_into(self, left)
+            right[:] = left
+            pooled_frame[2] = False
+            if sentence_id is not None and sentence_id != self.current_sentence_id:
+                self.current_sentence_id = sentence_id
                 self.on_is_speaking_sentence(self.current_sentence_id)
+            if sentence_id is not None:
+                self.track_sentence_gap(sentence_id)
         else:
-            frame_data = [0] * needed_samples  # Silence
+            # Silence - frames that already hold silence are sent as they are
+            if not pooled_frame[2]:
+                frame_data.fill(0)
+                pooled_frame[2] = True
             if self.current_sentence_id is not None:
                 self.current_sentence_id = None
                 asyncio.create_task(self.possible_speaking_stop())
-                
-        frame = np.array(frame_data, dtype=np.int16).reshape((1, -1))
-        audio_frame = av.AudioFrame.from_ndarray(frame, format='s16', layout='stereo')
-        audio_frame.sample_rate = self.sample_rate
+
         audio_frame.pts = self.timestamp
-        audio_frame.time_base = self.time_base
+
+        if self.on_frame:
+            self.on_frame(left)
+
+        # First frame after a flush - report that silence is now going out
+        if self.flush_pending:
+            self.flush_pending = False
+            self.on_flushed()
 
         self.timestamp += self.frame_size
         return audio_frame
     
+    # Create Pooled Frame - [frame, int16 view of its samples, holds silence]
+    def create_pooled_frame(self):
+        audio_frame = av.AudioFrame(format='s16', layout='stereo', samples=self.frame_size)
+        audio_frame.sample_rate = self.sample_rate
+        audio_frame.time_base = self.time_base
+        frame_data = np.frombuffer(audio_frame.planes[0], dtype=np.int16)[:self.frame_size * self.channels]
+        frame_data.fill(0)
+        return [audio_frame, frame_data, True]
+
+    # Track Pacing - lateness and jitter of the frames handed to the sender
+    def track_pacing(self, due_ns: int, sent_ns: int):
+        lateness_ns = sent_ns - due_ns
+        if lateness_ns > self.frame_period_ns // 2:
+            self.late_frames += 1
+        self.max_lateness_ns = max(self.max_lateness_ns, lateness_ns)
+        if self.last_sent_ns is not None:
+            deviation = abs((sent_ns - self.last_sent_ns) - self.frame_period_ns)
+            self.jitter_ns += (deviation - self.jitter_ns) / 16
+        self.last_sent_ns = sent_ns
+        self.frames_sent += 1
+
+    def pacing_stats(self) -> dict:
+        return {
+            "frames_sent": self.frames_sent,
+            "late_frames": self.late_frames,
+            "resyncs": self.resyncs,
+            "jitter_ms": self.jitter_ns / 1_000_000,
+            "max_lateness_ms": self.max_lateness_ns / 1_000_000,
+        }
+
     async def possible_speaking_stop(self):
         if self.validating_speaking_stop:
             return
         self.validating_speaking_stop = True
         await asyncio.sleep(1)  # Wait a bit to see if more samples come in
-        if len(self.samples) < (self.frame_size * self.channels):
+        if self.audio.available(self) < self.frame_size:
+            self.last_played_sentence_id = None
+            self.last_played_sentence_end = None
             self.on_stoped_speaking()
         self.validating_speaking_stop = False
 
+    # Track Sentence Gap - measures the silence played between the end of one sentence and the start of the next
+    def track_sentence_gap(self, sentence_id):
+        if sentence_id != self.last_played_sentence_id and self.last_played_sentence_end is not None:
+            gap_ms = (self.timestamp - self.last_played_sentence_end) * 1000 / self.sample_rate
+            self.on_sentence_gap(gap_ms)
+        self.last_played_sentence_id = sentence_id
+        self.last_played_sentence_end = self.timestamp + self.frame_size
+
+    # Flush - drops all queued audio so the next frame is silence, for every listener of a shared buffer
+    def flush(self):
+        self.audio.flush()
+        self.last_played_sentence_id = None
+        self.last_played_sentence_end = None
+        self.flush_pending = True
+
+    # Enqueue Audio Samples - with a shared buffer this reaches every listener, so enqueue once per broadcast
     def enqueue_audio_samples(self, audio_samples, sentence_id=None):
         try:
-            self.samples.extend(audio_samples)
-            if sentence_id is not None:
-                self.sentence_ids.extend([sentence_id] * len(audio_samples))
+            self.audio.enqueue_audio_samples(audio_samples, sentence_id)
         except Exception as e:
             print(f"[enqueue_audio_samples] Error: {e}")
             raise
 
-    async def enqueue_wav(self, wav_path):
-        try:
-            audio = AudioSegment.from_wav(wav_path)
+    # Enqueue PCM Bytes - mono int16 bytes viewed in place, the ring write is the only copy
+    def enqueue_pcm_bytes(self, pcm_bytes, sentence_id=None):
+        view = memoryview(pcm_bytes).cast("B")
+        if len(view) % 2:
+            raise ValueError("PCM bytes must hold whole 16-bit samples")
+        self.enqueue_audio_samples(np.frombuffer(view, dtype=np.int16), sentence_id)
 
-            if audio.channels != self.channels:
-                audio = audio.set_channels(self.channels)
-            if audio.frame_rate != self.sample_rate:
-                audio = audio.set_frame_rate(self.sample_rate)
+    # Enqueue WAV Bytes - parses the WAV in memory, converting only when it isn't already mono at the track's rate
+    def enqueue_wav_bytes(self, wav_bytes, sentence_id=None):
+        samples, _, _ = wav_bytes_to_pcm(wav_bytes, sample_rate=self.sample_rate, channels=1)
+        self.enqueue_audio_samples(samples, sentence_id)
 
-            samples = np.frombuffer(audio.raw_data, dtype=np.int16)
-            self.samples.extend(samples)
+    async def enqueue_wav(self, wav_path):
+        try:
+            with open(wav_path, "rb") as f:
+                self.enqueue_wav_bytes(f.read())
 
         except Exception as e:
             print(f"[enqueue_wav] Error: {e}")
             raise
 
     def is_speaking(self):
-        return len(self.samples) > (self.frame_size * self.channels)
+        return self.audio.available(self) > self.frame_size
@@ -0,0 +1,92 @@
+from collections import deque
+from typing import Optional
+import numpy as np
+from lib.audio_features import AudioFeatures
+
+
+# Words that usually mean the speaker is mid-thought when they pause
+CONTINUATION_WORDS = {
+    "and", "but", "or", "so", "because", "if", "then", "that", "which", "with",
+    "to", "of", "for", "the", "a", "an", "my", "um", "uh", "like", "is", "are",
+}
+
+
+class AdaptiveEndpointer:
+    # Weights are tuned with benchmarks/endpointing_replay.py - re-run it when changing them
+
+    def __init__(
+            self,
+            min_silence_ms: int = 300,
+            max_silence_ms: int = 1200,
+            long_utterance_ms: int = 4000,
+            level_window_frames: int = 10,
+            history_frames: int = 500,
+        ):
+        # Configuration
+        self.min_silence_ms = min_silence_ms
+        self.max_silence_ms = max_silence_ms
+        self.long_utterance_ms = long_utterance_ms
+        self.level_window_frames = level_window_frames
+
+        # State variables
+        self.voiced_energies_db = deque(maxlen=history_frames)
+        self.speech_ms = 0.0
+        self.partial_text: Optional[str] = None
+        self.partial_is_current = False  # False once speech continues past the partial transcript
+
+    def reset(self):
+        self.voiced_energies_db.clear()
+        self.speech_ms = 0.0
+        self.partial_text = None
+        self.partial_is_current = False
+
+    # Add Frame - tracks utterance length and the energy of recent voiced frames
+    def add_frame(self, features: AudioFeatures, has_voice: bool, sample_rate: int):
+        if not has_voice or features.sample_count == 0:
+            return
+        self.partial_is_current = False
+        self.speech_ms += features.sample_count / sample_rate * 1000
+        mean_square = features.energy / features.sample_count
+        self.voiced_energies_db.append(10 * np.log10(mean_square + 1))
+
+    def set_partial_transcript(self, text: Optional[str]):
+        self.partial_text = text
+        self.partial_is_current = True
+
+    # Trailing Level - dB of the last voiced frames relative to the utterance's median, negative when speech trails off.
+    # A slope over the last frames mostly measures the final syllable's own decay, so it barely tells turns apart.
+    def trailing_level_db(self) -> float:
+        if len(self.voiced_energies_db) < 3:
+            return 0.0
+        energies = np.array(self.voiced_energies_db)
+        return float(energies[-self.level_window_frames:].mean() - np.median(energies))
+
+    # Silence Duration - how much silence ends this utterance, between min and max silence
+    def silence_duration_ms(self) -> float:
+        # 0 ends the turn after min_silence_ms, 1 waits the full max_silence_ms. Without other evidence
+        # wait long - thinking pauses inside a turn are common
+        score = 0.85
+
+        # Long turns tend to contain thinking pauses
+        if self.speech_ms > self.long_utterance_ms:
+            score += 0.1
+
+        # Speech that fades out sounds finished, speech cut off at full energy usually isn't
+        level = self.trailing_level_db()
+        if level < -3.0:
+            score -= 0.35
+        elif level > -1.0:
+            score += 0.15
+
+        # Completeness of the partial transcript, when one covers the speech before this pause
+        if self.partial_text and self.partial_is_current:
+            text = self.partial_text.rstrip()
+            words = text.split()
+            last_word = words[-1].strip("\"'").lower() if words else ""
+            if text.endswith(("...", ",", ";", ":", "-")) or last_word in CONTINUATION_WORDS:
+                score += 0.5
+            elif text.endswith((".", "?", "!")):
+                score -= 0.45
+
+        score = min(max(score, 0.0), 1.0)
+        return self.min_silence_ms + score * (self.max_silence_ms - self.min_silence_ms)
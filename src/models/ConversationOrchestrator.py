@@ -1,21 +1,43 @@
 import asyncio
 import os
-from typing import Optional
+import time
+from collections import deque
+from typing import List, Optional
 from lib.webrtc.JSONRPCPeer import JSONRPCPeer
 from lib.webrtc.Room import Room
 from lib.webrtc.Peer import Peer
 from lib.webrtc.SyntheticAudioTrack import SyntheticAudioTrack
+from lib.webrtc.SharedAudioBuffer import SharedAudioBuffer
 from models.SoundCalibrator import SoundCalibrator
+from models.ConversationRecorder import ConversationRecorder
 from models.SpeechToText import SpeechToText
+from models.AdaptiveEndpointer import AdaptiveEndpointer
 from models.TokenStreamingService import TokenStreamingService
-from lib.sentence_stream import sentence_stream
+from lib.sentence_stream import sentence_stream, ResponseStart
 from lib.text_to_speech_stream import text_to_speech_stream
+from lib.tts.TTSEngine import TTSEngine
+from lib.tts.get_tts_engine import get_tts_engine
+from lib.audio_features import AudioFeatures
 
 
 class ConversationOrchestrator:
 
     # Constructor
-    def __init__(self, context_id: str, allows_inturrptions: bool = False, auth_token: Optional[str] = None):
+    def __init__(
+            self,
+            context_id: str,
+            allows_inturrptions: bool = False,
+            auth_token: Optional[str] = None,
+            tts_look_ahead: int = 2,
+            partial_transcription_interval_ms: Optional[int] = None,
+            silence_duration_ms: int = 1000,
+            adaptive_endpointing: Optional[dict] = None,
+            early_first_chunk: bool = True,
+            tts_engine: Optional[str] = None,
+            recording_dir: Optional[str] = None,
+            broadcast_agent_audio: bool = True,
+            transcription_sample_rate: Optional[int] = None,
+        ):
         self.context_id = context_id
         self.auth_token = auth_token
         self.allows_inturrptions = allows_inturrptions
@@ -23,12 +45,34 @@ class ConversationOrchestrator:
         self.room: Optional[Room] = None
         self.token_streaming_service: Optional[TokenStreamingService] = None
         self.voice_id: Optional[str] = None
+        self.tts_engine_name = tts_engine  # Overrides the engine in the agent config, e.g. "local" for offline load tests
+        self.tts_engine: Optional[TTSEngine] = None
+        self.recording_dir = recording_dir  # Records caller and agent audio for QA when set
+        self.recorder: Optional[ConversationRecorder] = None
+        self.agent_recording_peer_id: Optional[str] = None  # Track whose frames record the shared agent audio
         self.token_queue = asyncio.Queue()
         self.peer_to_stt: dict[str, SpeechToText] = {}
         self.peer_to_calibration: dict[str, SoundCalibrator] = {}
         self.peer_to_media_stream: dict[str, SyntheticAudioTrack] = {}
         self.peer_to_data_channel_rpc_layer: dict[str, JSONRPCPeer] = {}
+        self.peer_to_peer: dict[str, Peer] = {}
         self.sentence_counter = 0
+        self.tts_look_ahead = tts_look_ahead
+        self.partial_transcription_interval_ms = partial_transcription_interval_ms
+        self.silence_duration_ms = silence_duration_ms
+        self.adaptive_endpointing = adaptive_endpointing  # AdaptiveEndpointer kwargs, None keeps the fixed wait
+        self.early_first_chunk = early_first_chunk
+        self.transcription_sample_rate = transcription_sample_rate  # e.g. 16000 to downsample caller audio before upload
+        # Agent audio is buffered once for every peer, each track reading at its own cursor
+        self.shared_agent_audio: Optional[SharedAudioBuffer] = SharedAudioBuffer() if broadcast_agent_audio else None
+        self.sentence_gaps_ms: deque[float] = deque(maxlen=200)
+        self.speech_generator_task: Optional[asyncio.Task] = None
+        self.synthesis_tasks: set[asyncio.Task] = set()
+        self.player_task: Optional[asyncio.Task] = None
+        self.current_response_id: Optional[str] = None
+        self.interrupted_response_ids: deque[str] = deque(maxlen=32)  # Recent ones only, late tokens come soon after
+        self.interrupted_at: Optional[float] = None
+        self.interrupt_to_silence_ms: deque[float] = deque(maxlen=200)
     
 
     ##################
@@ -38,6 +82,13 @@ class ConversationOrchestrator:
     # Initialize
     async def initialize(self):
         try:
+            # RECORDER
+            if self.recording_dir:
+                self.recorder = ConversationRecorder(
+                    session_id=f"{self.context_id}-{int(time.time())}",
+                    recording_dir=self.recording_dir,
+                )
+
             # WEBRTC ROOM
             self.room = Room(
                 room_id=self.context_id,
@@ -54,17 +105,21 @@ class ConversationOrchestrator:
                 context_id=self.context_id,
                 auth_token=self.auth_token,
             )
-            self.token_streaming_service.on("token", self.on_token)
+            self.token_streaming_service.on("tokens", self.on_tokens)
             self.token_streaming_service.on("tool_call", self.on_tool_call)
             self.token_streaming_service.on("tool_response", self.on_tool_response)
             self.token_streaming_service.on("connection_status", self.on_token_streaming_service_connection_status)
             connection_request = await self.token_streaming_service.connect()
 
+            agent_tts_engine = None
             if connection_request.get("success", False):
                 self.voice_id = connection_request["agent"]["voice_id"]
+                agent_tts_engine = connection_request["agent"].get("tts_engine")
+            self.tts_engine = get_tts_engine(self.tts_engine_name or agent_tts_engine)
+            print(f"Using TTS engine: {self.tts_engine.name}")
 
             # Create thread to run speech generation
-            asyncio.create_task(self.start_speech_generator())
+            self.speech_generator_task = asyncio.create_task(self.start_speech_generator())
         except Exception as e:
             print(f"Error initializing ConversationOrchestrator: {e}")
             raise e
@@ -81,12 +136,16 @@ class ConversationOrchestrator:
             # SPEECH TO TEXT
             stt =  SpeechToText(
                 transcription_service_url=os.environ["TRANSCRIPTION_SERVER_URL"],
-                silence_duration_ms=1000,
+                silence_duration_ms=self.silence_duration_ms,
                 vad_threshold=0.001,
+                partial_interval_ms=self.partial_transcription_interval_ms,
+                endpointer=AdaptiveEndpointer(**self.adaptive_endpointing) if self.adaptive_endpointing is not None else None,
+                target_sample_rate=self.transcription_sample_rate,
             )
             stt.on("connection_status", lambda status: asyncio.create_task(self.on_transcription_service_connection_status(peer_id, status)))
             stt.on("is_speaking_status", lambda is_speaking: asyncio.create_task(self.on_is_speaking_status(peer_id, is_speaking)))
             stt.on("speech_detected", lambda text: asyncio.create_task(self.on_speach_detected(peer_id, text)))
+            stt.on("partial_speech_detected", lambda text: asyncio.create_task(self.on_partial_speech_detected(peer_id, text)))
             await stt.connect()
             self.peer_to_stt[peer_id] = stt
 
@@ -96,9 +155,13 @@ class ConversationOrchestrator:
             self.peer_to_calibration[peer_id] = calibrator
 
             # SYNTHETIC AUDIO TRACK
-            audioTrack = SyntheticAudioTrack()
+            audioTrack = SyntheticAudioTrack(shared_audio=self.shared_agent_audio)
             audioTrack.on("is_speaking_sentence", lambda sentence_id: asyncio.create_task(self.on_is_speaking_sentence(peer_id, sentence_id)))
             audioTrack.on("stoped_speaking", lambda: asyncio.create_task(self.on_stoped_speaking(peer_id)))
+            audioTrack.on("sentence_gap", lambda gap_ms: self.on_sentence_gap(peer_id, gap_ms))
+            audioTrack.on("flushed", lambda: self.on_audio_flushed(peer_id))
+            if self.recorder:
+                audioTrack.on("frame", lambda frame_data: self.on_agent_frame(peer_id, frame_data, audioTrack.sample_rate))
             self.peer_to_media_stream[peer_id] = audioTrack
 
             # WEBRTC PEER
@@ -115,6 +178,7 @@ class ConversationOrchestrator:
             data_channel_rpc_layer = JSONRPCPeer(sender=peer.send_message)
             peer.on("data_channel_message", data_channel_rpc_layer.handle_message)
             self.peer_to_data_channel_rpc_layer[peer_id] = data_channel_rpc_layer
+            self.peer_to_peer[peer_id] = peer
 
             # Return peer
             return peer
@@ -135,10 +199,13 @@ class ConversationOrchestrator:
     #########################
 
     # On Audio Data - Audio packets received from the remote peer
-    async def on_audio_data(self, peer_id, audio_data, sample_rate):
+    async def on_audio_data(self, peer_id, audio_data, sample_rate, features: Optional[AudioFeatures] = None):
         try:
+            if self.recorder:
+                self.recorder.record(f"caller-{peer_id}", audio_data, sample_rate)
+
             # Add audio data to the SpeechToText instance
-            self.peer_to_calibration[peer_id].add_audio_data(audio_data=audio_data)
+            self.peer_to_calibration[peer_id].add_audio_data(audio_data=audio_data, features=features)
 
             # If not calibrated, ignore the audio data
             if not self.has_calibrated:
@@ -148,7 +215,7 @@ class ConversationOrchestrator:
             if not self.allows_inturrptions and self.peer_to_media_stream[peer_id].is_speaking():
                 return
 
-            await self.peer_to_stt[peer_id].add_audio_data(audio_data=audio_data, sample_rate=sample_rate)
+            await self.peer_to_stt[peer_id].add_audio_data(audio_data=audio_data, sample_rate=sample_rate, features=features)
         except Exception as e:
             print(f"Error processing audio data from peer {peer_id}: {e}")
             raise e
@@ -192,6 +259,7 @@ class ConversationOrchestrator:
 
         # Remove the SyntheticAudioTrack instance for the peer
         if peer_id in self.peer_to_media_stream:
+            self.peer_to_media_stream[peer_id].stop()  # Releases its cursor on the shared agent audio
             del self.peer_to_media_stream[peer_id]
             print(f"Removed SyntheticAudioTrack instance for peer {peer_id}")
 
@@ -200,6 +268,10 @@ class ConversationOrchestrator:
             del self.peer_to_data_channel_rpc_layer[peer_id]
             print(f"Removed JSON RPC layer for peer {peer_id}")
 
+        # Remove the peer reference
+        if peer_id in self.peer_to_peer:
+            del self.peer_to_peer[peer_id]
+
         # Remove peer from the room
         self.room.remove_peer(peer_id)
         
@@ -210,6 +282,9 @@ class ConversationOrchestrator:
             print(f"Room {self.room.room_id} closed")
             self.token_streaming_service.close()
             print("Closed token streaming service connection")
+            if self.recorder:
+                self.recorder.close()
+                print(f"Closed recording {self.recorder.session_dir}")
     
     
 
@@ -217,32 +292,126 @@ class ConversationOrchestrator:
     ## TOKEN STREAMING SERVICE CALLBACKS #
     ######################################
 
-    # On Token - When the agent receives a token from the token streaming service
+    # On Tokens - When the agent receives a batch of tokens of one response from the token streaming service
+    async def on_tokens(self, tokens: List[str], response_id: str):
+        # Tokens still arriving for an interrupted response are dropped
+        if response_id in self.interrupted_response_ids:
+            return
+        self.current_response_id = response_id
+        self.token_queue.put_nowait((response_id, "".join(tokens)))
+
+    # On Token - When the agent receives a single token from the token streaming service
     async def on_token(self, token: str, response_id: str):
-        # print(f"Received token: {token}")
-        await self.token_queue.put(token)
+        await self.on_tokens([token], response_id)
 
-    # Generator to stream tokens
+    # Generator to stream tokens - drains everything queued per wakeup and marks response boundaries
     async def token_stream(self):
+        response_id = None
         while True:
-            token = await self.token_queue.get()
-            yield token
+            batches = [await self.token_queue.get()]
+            while not self.token_queue.empty():
+                batches.append(self.token_queue.get_nowait())
+
+            text = []
+            for batch_response_id, batch_text in batches:
+                # A new response id flushes the sentence stream and cuts the next first chunk early
+                if batch_response_id != response_id:
+                    if text:
+                        yield "".join(text)
+                        text = []
+                    response_id = batch_response_id
+                    yield ResponseStart(response_id)
+                text.append(batch_text)
+            if text:
+                yield "".join(text)
 
     # Speech Generator - Generates speech from the token stream and enqueues it to the media stream
     async def start_speech_generator(self):
-        async for sentence in sentence_stream(self.token_stream()):
-            sentence_id = self.sentence_counter
-            self.sentence_counter += 1
-            await self.send_call_to_all_peers("ai_sentence", {
-                "sentence": sentence,
-                "sentence_id": sentence_id,
-            })
+        # Sentences waiting for playback - bounds how many synthesize ahead of the one playing
+        pending_sentences: asyncio.Queue = asyncio.Queue(maxsize=self.tts_look_ahead)
+        self.synthesis_tasks = synthesis_tasks = set()
+        self.player_task = player_task = asyncio.create_task(self.play_synthesized_sentences(pending_sentences))
+        try:
+            async for sentence in sentence_stream(self.token_stream(), early_first_chunk=self.early_first_chunk):
+                sentence_id = self.sentence_counter
+                self.sentence_counter += 1
+                await self.send_call_to_all_peers("ai_sentence", {
+                    "sentence": sentence,
+                    "sentence_id": sentence_id,
+                })
+
+                # Wait for a look-ahead slot, then start synthesizing while earlier sentences play
+                chunk_queue: asyncio.Queue = asyncio.Queue()
+                await pending_sentences.put((sentence_id, chunk_queue))
+                synthesis_task = asyncio.create_task(self.synthesize_sentence(sentence, chunk_queue))
+                synthesis_tasks.add(synthesis_task)
+                synthesis_task.add_done_callback(synthesis_tasks.discard)
+        finally:
+            player_task.cancel()
+            for synthesis_task in list(synthesis_tasks):
+                synthesis_task.cancel()
+
+    # Synthesize Sentence - Streams TTS audio for one sentence into its chunk queue, None marks the end
+    async def synthesize_sentence(self, sentence: str, chunk_queue: asyncio.Queue):
+        try:
+            async for pcm_data in text_to_speech_stream(sentence, voice_id=self.voice_id, engine=self.tts_engine):
+                chunk_queue.put_nowait(pcm_data)
+        except Exception as e:
+            print(f"Error synthesizing sentence: {e}")
+        finally:
+            chunk_queue.put_nowait(None)
 
-            async for pcm_data in text_to_speech_stream(sentence, voice_id=self.voice_id):
+    # Play Synthesized Sentences - Enqueues audio to the media streams strictly in sentence order
+    async def play_synthesized_sentences(self, pending_sentences: asyncio.Queue):
+        while True:
+            sentence_id, chunk_queue = await pending_sentences.get()
+            while (pcm_data := await chunk_queue.get()) is not None:
+                if self.shared_agent_audio:
+                    self.shared_agent_audio.enqueue_audio_samples(pcm_data, sentence_id)
+                    continue
                 for synthetic_audio_track in self.peer_to_media_stream.values():
                     synthetic_audio_track.enqueue_audio_samples(pcm_data, sentence_id)
 
 
+    # Interrupt - Barge-in: silence the agent and abandon the current response
+    async def interrupt(self):
+        self.interrupted_at = time.monotonic()
+        print("User interrupted the agent")
+
+        # Flush queued audio so the next frame on every track is silence
+        for synthetic_audio_track in self.peer_to_media_stream.values():
+            synthetic_audio_track.flush()
+
+        # Cancel in-flight TTS and the sentence buffer, then start a fresh generator.
+        # The player is cancelled directly so no already-synthesized chunk lands after the flush.
+        if self.player_task:
+            self.player_task.cancel()
+        for synthesis_task in list(self.synthesis_tasks):
+            synthesis_task.cancel()
+        self.synthesis_tasks = set()
+        if self.speech_generator_task:
+            self.speech_generator_task.cancel()
+        while not self.token_queue.empty():
+            self.token_queue.get_nowait()
+        self.speech_generator_task = asyncio.create_task(self.start_speech_generator())
+
+        # Stop the LLM response and ignore any of its tokens still in flight
+        response_id = self.current_response_id
+        if response_id is not None:
+            self.interrupted_response_ids.append(response_id)
+        self.current_response_id = None
+        await self.send_call_to_all_peers("ai_interrupted", {
+            "response_id": response_id,
+        })
+        if self.token_streaming_service:
+            await self.token_streaming_service.stop_response(response_id)
+
+    # Is Agent Speaking - audio queued on any track or sentences still being synthesized
+    def is_agent_speaking(self) -> bool:
+        if self.synthesis_tasks:
+            return True
+        return any(track.is_speaking() for track in self.peer_to_media_stream.values())
+
     # On Tool Call - When the agent calls a tool
     async def on_tool_call(self, tool_call_id: str, tool_name: str, tool_input: dict):
         print(f"Tool call: {tool_call_id}, Tool: {tool_name}, Input: {tool_input}")
@@ -286,10 +455,21 @@ class ConversationOrchestrator:
         # Send the text to the token streaming service
         asyncio.create_task(self.token_streaming_service.add_message(text))
 
+    # On Partial Speech Detected - Interim transcript while the user is still speaking
+    async def on_partial_speech_detected(self, peer_id: str, text: str):
+        # Send the partial transcript to the peer
+        await self.send_call_to_peer(peer_id, "partial_speech_detected", {
+            "text": text
+        })
+
     # On Is Speaking Status - Callback used by the SpeechToText instance
     async def on_is_speaking_status(self, peer_id: str, is_speaking: bool):
         print(f"Is speaking status for peer {peer_id}: {is_speaking}")
 
+        # Barge-in - the user started talking over the agent
+        if is_speaking and self.allows_inturrptions and self.is_agent_speaking():
+            await self.interrupt()
+
         # Send is speaking status to the peer
         await self.send_call_to_peer(peer_id, "is_speaking_status", {
             "is_speaking": is_speaking
@@ -323,6 +503,32 @@ class ConversationOrchestrator:
         # Send stoped speaking to the peer
         await self.send_call_to_peer(peer_id, "stoped_speaking", {})
 
+    # On Audio Flushed - Callback used by the SyntheticAudioTrack instance when silence follows a flush
+    def on_audio_flushed(self, peer_id: str):
+        if self.interrupted_at is None:
+            return
+        latency_ms = (time.monotonic() - self.interrupted_at) * 1000
+        self.interrupt_to_silence_ms.append(latency_ms)
+        latencies = sorted(self.interrupt_to_silence_ms)
+        print(f"Interrupt to silence for peer {peer_id}: {latency_ms:.1f}ms (median {latencies[len(latencies) // 2]:.1f}ms, max {latencies[-1]:.1f}ms over {len(latencies)} flushes)")
+
+    # On Agent Frame - Callback used by the SyntheticAudioTrack instance for every outgoing frame while recording.
+    # With shared agent audio every track plays the same samples, so one track at a time records them.
+    def on_agent_frame(self, peer_id: str, frame_data, sample_rate: int):
+        if self.shared_agent_audio is None:
+            self.recorder.record(f"agent-{peer_id}", frame_data, sample_rate)
+            return
+        if self.agent_recording_peer_id not in self.peer_to_media_stream:
+            self.agent_recording_peer_id = peer_id  # First track to send, or the next one after it left
+        if peer_id == self.agent_recording_peer_id:
+            self.recorder.record("agent", frame_data, sample_rate)
+
+    # On Sentence Gap - Callback used by the SyntheticAudioTrack instance with the silence between two sentences
+    def on_sentence_gap(self, peer_id: str, gap_ms: float):
+        self.sentence_gaps_ms.append(gap_ms)
+        gaps = sorted(self.sentence_gaps_ms)
+        print(f"Sentence gap for peer {peer_id}: {gap_ms:.0f}ms (median {gaps[len(gaps) // 2]:.0f}ms, max {gaps[-1]:.0f}ms over {len(gaps)} gaps)")
+
 
     #########################
     # CALIBRATION CALLBACKS #
@@ -352,15 +558,22 @@ class ConversationOrchestrator:
     # HELPER FUNCTIONS #
     ####################
 
-    # Send call to peer - helper function to make RPC calls
+    # Send call to peer - helper function to make RPC calls, queued on the peer's outbound queue
     async def send_call_to_peer(self, peer_id: str, method: str, params: dict):
-        if peer_id in self.peer_to_data_channel_rpc_layer:
-            await self.peer_to_data_channel_rpc_layer[peer_id].call(method, params)
+        if peer_id in self.peer_to_peer:
+            message = JSONRPCPeer.encode_call(method, params)
+            self.peer_to_peer[peer_id].enqueue_message(message, coalesce_key=self.coalesce_key(method))
     
-    # Send call to all peers - helper function to make RPC calls to all peers
+    # Send call to all peers - serializes once and enqueues for every peer without awaiting any of them
     async def send_call_to_all_peers(self, method: str, params: dict):
-        for peer_id in self.peer_to_data_channel_rpc_layer.keys():
-            await self.send_call_to_peer(peer_id, method, params)
+        message = JSONRPCPeer.encode_call(method, params)
+        coalesce_key = self.coalesce_key(method)
+        for peer in self.peer_to_peer.values():
+            peer.enqueue_message(message, coalesce_key=coalesce_key)
+
+    # Coalesce key - only the latest status message or partial transcript matters when a peer's queue is full
+    def coalesce_key(self, method: str) -> Optional[str]:
+        return method if method.endswith("_status") or method == "partial_speech_detected" else None
         
         
 
@@ -0,0 +1,186 @@
+import mmap
+import os
+import queue
+import re
+import threading
+import time
+from typing import Optional
+import numpy as np
+
+
+class RecordedSource:
+    # Write state of one audio source - only touched on the event loop
+    def __init__(self, name: str, sample_rate: int):
+        self.name = name
+        self.sample_rate = sample_rate
+        self.segment: Optional[int] = None  # Segment currently being filled
+        self.segment_fill = 0
+        self.position = 0  # Samples recorded so far
+        self.anchor_position = 0  # Position and session time of the last index entry
+        self.anchor_time: Optional[float] = None
+
+
+class ConversationRecorder:
+    # Records every audio source of a session to <recording_dir>/<session_id>/<source>.pcm (mono int16)
+    # plus <source>.idx lines of "sample_position session_seconds sample_rate" marking where the timeline jumps.
+    # The audio path only copies into preallocated segments of a memory-mapped spill file and hands full
+    # segments to a writer thread. When every segment is in flight frames are dropped, never waited on.
+
+    def __init__(
+            self,
+            session_id: str,
+            recording_dir: str,
+            segment_samples: int = 48000,
+            segment_count: int = 16,
+            resync_threshold_ms: int = 100,
+        ):
+        # Configuration
+        self.session_id = session_id
+        self.session_dir = os.path.join(recording_dir, re.sub(r"[^\w.-]", "_", session_id))
+        self.segment_samples = segment_samples
+        self.segment_count = segment_count
+        self.resync_threshold_ms = resync_threshold_ms
+
+        # Spill file - segment_count * segment_samples int16 samples, the session's whole memory budget
+        os.makedirs(self.session_dir, exist_ok=True)
+        spill_path = os.path.join(self.session_dir, "segments.mmap")
+        spill_bytes = segment_count * segment_samples * 2
+        with open(spill_path, "w+b") as f:
+            f.truncate(spill_bytes)
+            self.spill = mmap.mmap(f.fileno(), spill_bytes)
+        self.segments = np.frombuffer(self.spill, dtype=np.int16).reshape(segment_count, segment_samples)
+        self.segments.fill(0)  # Fault the pages in now rather than on the audio path
+
+        # Segments move between the event loop and the writer thread through lock-free queues
+        self.free_segments: queue.SimpleQueue = queue.SimpleQueue()
+        for segment in range(segment_count):
+            self.free_segments.put(segment)
+        self.write_queue: queue.SimpleQueue = queue.SimpleQueue()
+
+        # State variables
+        self.sources: dict[str, RecordedSource] = {}
+        self.start_time = time.monotonic()
+        self.dropped_samples = 0
+        self.closed = False
+        self.writer = threading.Thread(target=self.write_segments, name=f"recorder-{session_id}", daemon=True)
+        self.writer.start()
+
+    # Record - copies samples of a source into the current segment, never blocks
+    def record(self, source: str, samples: np.ndarray, sample_rate: int = 48000):
+        if self.closed:
+            return
+        recorded = self.sources.get(source)
+        if recorded is None:
+            recorded = self.sources[source] = RecordedSource(source, sample_rate)
+        samples = np.asarray(samples, dtype=np.int16).reshape(-1)
+
+        # Only index frames that are actually recorded, so a run of dropped frames leaves one entry
+        if not self.acquire_segment(recorded, samples, 0):
+            return
+        self.index_if_resynced(recorded, sample_rate)
+
+        offset = 0
+        while offset < len(samples):
+            if not self.acquire_segment(recorded, samples, offset):
+                return
+
+            count = min(len(samples) - offset, self.segment_samples - recorded.segment_fill)
+            self.segments[recorded.segment, recorded.segment_fill:recorded.segment_fill + count] = samples[offset:offset + count]
+            recorded.segment_fill += count
+            recorded.position += count
+            offset += count
+
+            if recorded.segment_fill == self.segment_samples:
+                self.hand_off_segment(recorded)
+
+    # Acquire Segment - makes sure the source has a segment to fill, dropping the rest of the frame if none is free
+    def acquire_segment(self, recorded: RecordedSource, samples: np.ndarray, offset: int) -> bool:
+        if recorded.segment is not None:
+            return True
+        try:
+            recorded.segment = self.free_segments.get_nowait()
+        except queue.Empty:
+            # Writer is behind - drop the rest of the frame and mark the jump in the timeline
+            self.dropped_samples += len(samples) - offset
+            recorded.anchor_time = None
+            return False
+        recorded.segment_fill = 0
+        return True
+
+    # Index If Resynced - adds an index entry when the source's samples no longer line up with wall time
+    def index_if_resynced(self, recorded: RecordedSource, sample_rate: int):
+        now = time.monotonic() - self.start_time
+        if recorded.anchor_time is not None and sample_rate == recorded.sample_rate:
+            expected = recorded.anchor_time + (recorded.position - recorded.anchor_position) / recorded.sample_rate
+            if abs(now - expected) * 1000 < self.resync_threshold_ms:
+                return
+        recorded.sample_rate = sample_rate
+        recorded.anchor_position = recorded.position
+        recorded.anchor_time = now
+        self.write_queue.put(("index", recorded.name, f"{recorded.position} {now:.6f} {sample_rate}\n"))
+
+    def hand_off_segment(self, recorded: RecordedSource):
+        self.write_queue.put(("segment", recorded.name, (recorded.segment, recorded.segment_fill)))
+        recorded.segment = None
+        recorded.segment_fill = 0
+
+    # Write Segments - writer thread, appends handed off segments to the source files and frees them
+    def write_segments(self):
+        files = {}
+        try:
+            while True:
+                kind, source, payload = self.write_queue.get()
+                if kind == "close":
+                    return
+                try:
+                    if source not in files:
+                        name = re.sub(r"[^\w.-]", "_", source)
+                        files[source] = (
+                            open(os.path.join(self.session_dir, f"{name}.pcm"), "ab"),
+                            open(os.path.join(self.session_dir, f"{name}.idx"), "a"),
+                        )
+                    pcm_file, index_file = files[source]
+                    if kind == "index":
+                        index_file.write(payload)
+                    else:
+                        segment, length = payload
+                        pcm_file.write(memoryview(self.segments[segment, :length]).cast("B"))
+                        self.free_segments.put(segment)
+                except Exception as e:
+                    print(f"Error writing recording for {source}: {e}")
+                    if kind == "segment":
+                        self.free_segments.put(payload[0])
+        finally:
+            for pcm_file, index_file in files.values():
+                pcm_file.close()
+                index_file.close()
+            self.segments = None  # Release the view so the mapping can close
+            self.spill.close()
+            os.remove(os.path.join(self.session_dir, "segments.mmap"))
+
+    # Close - hands off partially filled segments and lets the writer finish in the background
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        for recorded in self.sources.values():
+            if recorded.segment is not None and recorded.segment_fill > 0:
+                self.hand_off_segment(recorded)
+        self.write_queue.put(("close", None, None))
+        if self.dropped_samples:
+            print(f"Recording {self.session_id} dropped {self.dropped_samples} samples")
+
+    def wait_closed(self, timeout: Optional[float] = None):
+        self.writer.join(timeout)
+
+    # Read Recording - loads a source's samples and index, e.g. for QA tooling
+    @staticmethod
+    def read_recording(session_dir: str, source: str):
+        name = re.sub(r"[^\w.-]", "_", source)
+        samples = np.fromfile(os.path.join(session_dir, f"{name}.pcm"), dtype=np.int16)
+        index = []
+        with open(os.path.join(session_dir, f"{name}.idx")) as f:
+            for line in f:
+                position, session_seconds, sample_rate = line.split()
+                index.append((int(position), float(session_seconds), int(sample_rate)))
+        return samples, index
@@ -0,0 +1,58 @@
+from typing import List
+import av
+import numpy as np
+
+# Sample rates libopus can encode natively
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+
+class OpusUplinkEncoder:
+    # Encodes one transcription stream's mono int16 audio into 20 ms Opus packets
+
+    def __init__(self, sample_rate: int = 16000, bit_rate: int = 24000):
+        if sample_rate not in OPUS_SAMPLE_RATES:
+            raise ValueError(f"Opus does not support a {sample_rate} Hz sample rate")
+        self.sample_rate = sample_rate
+        self.frame_size = sample_rate // 50  # 20 ms
+        self.codec = av.CodecContext.create("libopus", "w")
+        self.codec.sample_rate = sample_rate
+        self.codec.layout = "mono"
+        self.codec.format = "s16"
+        self.codec.bit_rate = bit_rate
+        self.codec.open()
+
+        # State variables
+        self.pending = np.zeros(0, dtype=np.int16)  # Samples short of a full 20 ms frame
+        self.pts = 0
+        self.bytes_encoded = 0
+
+    # Encode - returns the packets completed by these samples
+    def encode(self, samples) -> List[bytes]:
+        samples = np.concatenate((self.pending, np.asarray(samples, dtype=np.int16).reshape(-1)))
+        usable = len(samples) - len(samples) % self.frame_size
+        self.pending = samples[usable:]
+        packets = []
+        for start in range(0, usable, self.frame_size):
+            packets += self.encode_frame(samples[start:start + self.frame_size])
+        return packets
+
+    # Flush - pads the last partial frame with silence and drains the encoder, ending the stream
+    def flush(self) -> List[bytes]:
+        packets = []
+        if len(self.pending):
+            packets += self.encode_frame(np.concatenate((self.pending, np.zeros(self.frame_size - len(self.pending), dtype=np.int16))))
+            self.pending = np.zeros(0, dtype=np.int16)
+        packets += self.collect(self.codec.encode(None))
+        return packets
+
+    def encode_frame(self, samples: np.ndarray) -> List[bytes]:
+        frame = av.AudioFrame.from_ndarray(samples.reshape(1, -1), format="s16", layout="mono")
+        frame.sample_rate = self.sample_rate
+        frame.pts = self.pts
+        self.pts += len(samples)
+        return self.collect(self.codec.encode(frame))
+
+    def collect(self, packets) -> List[bytes]:
+        payloads = [bytes(packet) for packet in packets]
+        self.bytes_encoded += sum(len(payload) for payload in payloads)
+        return payloads
@@ -1,5 +1,7 @@
 from typing import Callable
 import numpy as np
+from lib.audio_features import AudioFeatures
+from lib.vad import calculate_energy
 
 
 class SoundCalibrator:
@@ -23,9 +25,9 @@ class SoundCalibrator:
         else:
             raise ValueError(f"Unknown event: {event}")
 
-    def add_audio_data(self, audio_data):
+    def add_audio_data(self, audio_data, features: AudioFeatures = None):
         # Calculate energy
-        energy = np.sum(audio_data ** 2)
+        energy = features.energy if features is not None else calculate_energy(audio_data)
         self.energy_samples.append(energy)
         
         # If over calibration
@@ -5,7 +5,10 @@ from typing import Optional, Callable
 
 import numpy as np
 from lib.vad import vad
-from models.TranscriptionService import TranscriptionService
+from lib.audio_features import AudioFeatures, extract_audio_features
+from models.AdaptiveEndpointer import AdaptiveEndpointer
+from models.StreamingResampler import StreamingResampler
+from models.TranscriptionServicePool import TranscriptionServicePool, TranscriptionStream
 import time
 
 class SpeechToText:
@@ -15,19 +18,28 @@ class SpeechToText:
             transcription_service_url: str,
             vad_threshold: float = 0.001,
             silence_duration_ms: int = 1000,
+            partial_interval_ms: Optional[int] = None,
+            endpointer: Optional[AdaptiveEndpointer] = None,
+            target_sample_rate: Optional[int] = None,
+            max_partial_failures: int = 3,
         ):
         # Configuration
         self.transcription_service_url = transcription_service_url
         self.vad_threshold = vad_threshold
         self.silence_duration_ms = silence_duration_ms
+        self.partial_interval_ms = partial_interval_ms  # None disables partial transcripts
+        self.endpointer = endpointer  # None waits a fixed silence_duration_ms
+        self.target_sample_rate = target_sample_rate  # Rate uploaded to the transcription service, None sends the input rate
+        self.max_partial_failures = max_partial_failures  # Consecutive failed partial requests before giving up on them
 
         # Callbacks
         self.on_speech_detected: Callable[[str], None] = lambda text: print(f"Speech detected: {text}")
+        self.on_partial_speech_detected: Callable[[str], None] = lambda text: print(f"Partial speech detected: {text}")
         self.on_is_speaking_status: Callable[[bool], None] = lambda is_speaking: print(f"Is speaking: {is_speaking}")
         self.on_connection_status: Callable[[str], None] = lambda status: print(f"Transcription Service Conneciton Status: {status}")
 
-        # Transcription service
-        self.transcription_service = None
+        # Transcription service - a stream multiplexed over the process-wide connection pool
+        self.transcription_service: TranscriptionStream = None
 
         # State variables
         self.speaking = False
@@ -36,17 +48,23 @@ class SpeechToText:
         self.start_speaking_time = None
         self.end_speaking_time = None
         self.vad_detections = []
+        self.partial_sample_count = 0
+        self.partial_task: Optional[asyncio.Task] = None
+        self.partial_text = None
+        self.partial_supported = True
+        self.partial_failures = 0
+        self.resampler: Optional[StreamingResampler] = None
 
     async def connect(self):
-        self.transcription_service = TranscriptionService(
-            transcription_service_url=self.transcription_service_url,
-        )
-        self.transcription_service.on("connection_status", self.on_connection_status)
-        await self.transcription_service.connect()
+        pool = TranscriptionServicePool.for_url(self.transcription_service_url)
+        self.transcription_service = pool.open_stream()
+        self.transcription_service.on("connection_status", lambda status: self.on_connection_status(status))
 
     def on(self, event: str, callback: Callable):
         if event == "speech_detected":
             self.on_speech_detected = callback
+        elif event == "partial_speech_detected":
+            self.on_partial_speech_detected = callback
         elif event == "is_speaking_status":
             self.on_is_speaking_status = callback
         elif event == "connection_status":
@@ -57,23 +75,32 @@ class SpeechToText:
     def update_vad_threshold(self, vad_threshold: float):
         self.vad_threshold = vad_threshold
 
-    async def add_audio_data(self, audio_data, sample_rate):
+    async def add_audio_data(self, audio_data, sample_rate, features: AudioFeatures = None):
         try:
+            if features is None:
+                features = extract_audio_features(audio_data)
+
+            # Resample every frame, even unsent ones, so the filter history stays continuous.
+            # VAD and silence timing keep using the input samples and rate.
+            upload_data, upload_sample_rate = self.resample_for_upload(audio_data, sample_rate)
+
             # VAD
-            has_voice = vad(audio_data=audio_data, energy_threshold=self.vad_threshold)
+            has_voice = vad(audio_data=audio_data, energy_threshold=self.vad_threshold, features=features)
             if has_voice:
                 if not self.speaking:
                     self.speaking = True
                     await self.on_is_speaking_status(True)
                     self.current_transcribe_id = f"{uuid.uuid4()}"
                     self.start_speaking_time = time.time()
+                    if self.endpointer:
+                        self.endpointer.reset()
                 self.silence_sample_count = 0
-                await self.transcription_service.add_audio_data(self.current_transcribe_id, audio_data)
+                await self.transcription_service.add_audio_data(self.current_transcribe_id, upload_data, upload_sample_rate)
             else:
                 if self.speaking:
-                    await self.transcription_service.add_audio_data(self.current_transcribe_id, audio_data)
+                    await self.transcription_service.add_audio_data(self.current_transcribe_id, upload_data, upload_sample_rate)
                     self.silence_sample_count += len(audio_data)
-                    silence_samples_to_wait = int((self.silence_duration_ms / 1000) * sample_rate)
+                    silence_samples_to_wait = int((self.current_silence_duration_ms() / 1000) * sample_rate)
                     # If enough silence detected
                     if self.silence_sample_count >= silence_samples_to_wait:
                         # Check that sample is not mostly silence
@@ -81,7 +108,7 @@ class SpeechToText:
                         #print("Vad detections:", self.vad_detections)
                         if np.array(self.vad_detections).mean() > 0.2:
                             # Finalize the transcription
-                            asyncio.create_task(self.finalize_transcript(self.current_transcribe_id, sample_rate))
+                            asyncio.create_task(self.finalize_transcript(self.current_transcribe_id, upload_sample_rate))
                             self.end_speaking_time = time.time()
                             print(f"Finalizing transcription on a {self.end_speaking_time - self.start_speaking_time:.2f} second file")
                         else:
@@ -89,25 +116,87 @@ class SpeechToText:
                             # Cancel transcription
                             await self.transcription_service.cancel_transcription(self.current_transcribe_id)
                             
-                        # Reset state
+                        # Reset state - the utterance ends before any await so late partials for it are ignored
+                        self.current_transcribe_id = None
+                        self.cancel_partial_request()
+                        self.partial_sample_count = 0
+                        self.partial_text = None
                         self.vad_detections = []
                         self.speaking = False
-                        await self.on_is_speaking_status(False)
                         self.silence_sample_count = 0
-                        self.current_transcribe_id = None
                         self.start_speaking_time = None
                         self.end_speaking_time = None
+                        await self.on_is_speaking_status(False)
             
             # Add vad detection if speaking - used to 
             if self.speaking:
                 # print(f"Is Speeking: {has_voice}")
                 self.vad_detections.append(has_voice)
+                if self.endpointer:
+                    self.endpointer.add_frame(features, has_voice, sample_rate)
+                self.maybe_request_partial_transcript(len(audio_data), sample_rate, upload_sample_rate)
 
         except Exception as e:
             print(f"Error durring vad: {e}")
             raise e
                 
 
+    # Resample For Upload - the audio and rate sent to the transcription service
+    def resample_for_upload(self, audio_data, sample_rate):
+        if not self.target_sample_rate or self.target_sample_rate == sample_rate:
+            return audio_data, sample_rate
+        if self.resampler is None or self.resampler.input_rate != sample_rate:
+            self.resampler = StreamingResampler(sample_rate, self.target_sample_rate)
+        return self.resampler.process(audio_data), self.target_sample_rate
+
+    # Current Silence Duration - silence that ends the current utterance
+    def current_silence_duration_ms(self) -> float:
+        if self.endpointer:
+            return self.endpointer.silence_duration_ms()
+        return self.silence_duration_ms
+
+    # Maybe Request Partial Transcript - asks for an interim transcript every partial_interval_ms of speech
+    def maybe_request_partial_transcript(self, sample_count, sample_rate, upload_sample_rate):
+        if self.partial_interval_ms is None or not self.partial_supported:
+            return
+        self.partial_sample_count += sample_count
+        if self.partial_sample_count < int((self.partial_interval_ms / 1000) * sample_rate):
+            return
+        # Only one partial request in flight at a time
+        if self.partial_task and not self.partial_task.done():
+            return
+        self.partial_sample_count = 0
+        self.partial_task = asyncio.create_task(self.request_partial_transcript(self.current_transcribe_id, upload_sample_rate))
+
+    # Cancel Partial Request - a partial still in flight when the utterance is finalized or cancelled is never emitted
+    def cancel_partial_request(self):
+        if self.partial_task and not self.partial_task.done():
+            self.partial_task.cancel()
+        self.partial_task = None
+
+    async def request_partial_transcript(self, transcribe_id, sample_rate):
+        try:
+            text = await self.transcription_service.partial_transcription(transcribe_id, sample_rate)
+        except Exception as e:
+            # Servers without partial support say so or never answer - stop asking once that's clear,
+            # a single timeout may just be a busy server
+            self.partial_failures += 1
+            if "method not found" in str(e).lower() or self.partial_failures >= self.max_partial_failures:
+                print(f"Partial transcription unavailable, disabling: {e}")
+                self.partial_supported = False
+            else:
+                print(f"Partial transcription failed ({self.partial_failures}/{self.max_partial_failures}): {e}")
+            return
+        self.partial_failures = 0
+
+        # Ignore results that arrive after the utterance ended or that didn't change
+        if transcribe_id != self.current_transcribe_id or not text or text == self.partial_text:
+            return
+        self.partial_text = text
+        if self.endpointer:
+            self.endpointer.set_partial_transcript(text)
+        await self.on_partial_speech_detected(text)
+
     async def finalize_transcript(self, transcribe_id, sample_rate):
         start = time.time()
         # Get transcription
@@ -122,8 +211,14 @@ class SpeechToText:
                 await self.on_speech_detected(text)
 
     def close(self):
-        # Close the transcription service connection
+        # Cancel an utterance cut off by the hang up so the shared connection and server drop it
+        self.cancel_partial_request()
+        if self.speaking and self.current_transcribe_id:
+            self.transcription_service.enqueue_cancel(self.current_transcribe_id)
+            self.speaking = False
+            self.current_transcribe_id = None
+        # Release the stream - the pooled connection stays open for other peers
         self.transcription_service.close()
-        print("Closed transcription service connection")
+        print("Closed transcription stream")
 
     
\ No newline at end of file
@@ -0,0 +1,58 @@
+from math import gcd
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import firwin
+
+
+class StreamingResampler:
+    # Polyphase resampler for audio that arrives in frames. Uses the same anti-aliasing filter as
+    # scipy's resample_poly but keeps the filter history and output phase between frames, so
+    # frame boundaries are seamless. Output is delayed by half the filter length (~0.6 ms at 48k -> 16k).
+
+    def __init__(self, input_rate: int, output_rate: int):
+        divisor = gcd(input_rate, output_rate)
+        self.input_rate = input_rate
+        self.output_rate = output_rate
+        self.up = output_rate // divisor
+        self.down = input_rate // divisor
+
+        # Filter design matching resample_poly's default kaiser window
+        max_rate = max(self.up, self.down)
+        half_len = 10 * max_rate
+        taps = firwin(2 * half_len + 1, 1 / max_rate, window=("kaiser", 5.0)) * self.up
+        taps = np.concatenate((taps, np.zeros(-len(taps) % self.up)))
+        # One reversed sub-filter per phase, so each output is a dot product with a window of input
+        self.phase_filters = np.stack([taps[phase::self.up][::-1] for phase in range(self.up)])
+        self.filter_length = self.phase_filters.shape[1]
+
+        # State variables
+        self.history = np.zeros(self.filter_length - 1, dtype=np.float64)  # Last inputs of the previous frame
+        self.input_count = 0  # Input samples seen so far
+        self.output_count = 0  # Output samples produced so far
+
+    # Process - resamples the next frame of int16 samples
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        samples = np.asarray(samples).reshape(-1)
+        frame_start = self.input_count
+        self.input_count += len(samples)
+
+        # Outputs whose newest input sample is now available: output n ends at input (n * down) // up
+        last_output = (self.input_count * self.up - 1) // self.down
+        outputs = np.arange(self.output_count, last_output + 1)
+        self.output_count = last_output + 1
+
+        signal = np.concatenate((self.history, samples))
+        self.history = signal[len(signal) - (self.filter_length - 1):]
+        if len(outputs) == 0:
+            return np.zeros(0, dtype=np.int16)
+
+        # Window i of the signal ends at input frame_start + i
+        windows = sliding_window_view(signal, self.filter_length)
+        upsampled_positions = outputs * self.down
+        window_indices = upsampled_positions // self.up - frame_start
+        phases = upsampled_positions % self.up
+        if self.up == 1:
+            resampled = windows[window_indices] @ self.phase_filters[0]
+        else:
+            resampled = np.einsum("ij,ij->i", windows[window_indices], self.phase_filters[phases])
+        return np.clip(np.round(resampled), -32768, 32767).astype(np.int16)
@@ -0,0 +1,146 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from collections import OrderedDict
+from typing import Optional
+import numpy as np
+
+
+class TTSAudioCache:
+
+    def __init__(
+            self,
+            max_memory_bytes: int = 64 * 1024 * 1024,
+            disk_dir: Optional[str] = None,
+            max_disk_bytes: int = 1024 * 1024 * 1024,
+            max_entry_bytes: int = 2 * 1024 * 1024,
+        ):
+        # Configuration
+        self.max_memory_bytes = max_memory_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.max_entry_bytes = max_entry_bytes
+
+        # In-memory LRU tier
+        self.entries: OrderedDict[str, np.ndarray] = OrderedDict()
+        self.memory_bytes = 0
+
+        # On-disk tier - raw int16 PCM files, memory-mapped on read
+        self.disk_bytes = 0
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self.disk_bytes = sum(entry.stat().st_size for entry in os.scandir(self.disk_dir) if entry.name.endswith(".pcm"))
+
+        # Counters
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    # Normalize Text - sentences that only differ in whitespace share an entry
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+    # Make Key - content address of a synthesis request
+    def make_key(self, text: str, voice_id: str, model_id: str, voice_settings: dict) -> str:
+        payload = json.dumps([self.normalize_text(text), voice_id, model_id, voice_settings], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    # Get - returns cached PCM samples or None
+    def get(self, key: str) -> Optional[np.ndarray]:
+        samples = self.entries.get(key)
+        if samples is not None:
+            self.entries.move_to_end(key)
+        else:
+            samples = self.read_from_disk(key)
+            if samples is not None:
+                self.disk_hits += 1
+                self.add_to_memory(key, samples)
+
+        if samples is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.bytes_saved += samples.nbytes
+        return samples
+
+    # Put - stores PCM samples in memory and, when configured, on disk in the background
+    def put(self, key: str, samples: np.ndarray):
+        samples = np.ascontiguousarray(samples, dtype=np.int16)
+        if samples.nbytes == 0 or samples.nbytes > self.max_entry_bytes:
+            return
+        self.add_to_memory(key, samples)
+        if self.disk_dir:
+            asyncio.get_running_loop().run_in_executor(None, self.write_to_disk, key, samples)
+
+    def add_to_memory(self, key: str, samples: np.ndarray):
+        if key in self.entries:
+            self.memory_bytes -= self.entries.pop(key).nbytes
+        self.entries[key] = samples
+        self.memory_bytes += samples.nbytes
+        while self.memory_bytes > self.max_memory_bytes and self.entries:
+            _, evicted = self.entries.popitem(last=False)
+            self.memory_bytes -= evicted.nbytes
+
+    def disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.pcm")
+
+    def read_from_disk(self, key: str) -> Optional[np.ndarray]:
+        if not self.disk_dir:
+            return None
+        path = self.disk_path(key)
+        try:
+            samples = np.memmap(path, dtype=np.int16, mode="r")
+            os.utime(path)  # Keep recently used files from being evicted
+            return samples
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def write_to_disk(self, key: str, samples: np.ndarray):
+        path = self.disk_path(key)
+        if os.path.exists(path):
+            return
+        try:
+            # Write then rename so readers never map a partial file
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(samples.tobytes())
+            os.replace(temp_path, path)
+            self.disk_bytes += samples.nbytes
+            if self.disk_bytes > self.max_disk_bytes:
+                self.evict_from_disk()
+        except Exception as e:
+            print(f"Error writing TTS cache entry to disk: {e}")
+
+    # Evict From Disk - removes least recently used files until under budget
+    def evict_from_disk(self):
+        files = sorted(
+            (entry for entry in os.scandir(self.disk_dir) if entry.name.endswith(".pcm")),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        self.disk_bytes = sum(entry.stat().st_size for entry in files)
+        for entry in files:
+            if self.disk_bytes <= self.max_disk_bytes:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                self.disk_bytes -= size
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "bytes_saved": self.bytes_saved,
+            "memory_entries": len(self.entries),
+            "memory_bytes": self.memory_bytes,
+            "disk_bytes": self.disk_bytes,
+        }
@@ -1,5 +1,7 @@
 import asyncio
-from typing import Callable
+import json
+from collections import deque
+from typing import Callable, List, Optional
 from lib.webrtc.JSONRPCPeer import JSONRPCPeer
 from lib.webrtc.SimpleWebSocketClient import SimpleWebSocketClient
 
@@ -18,24 +20,25 @@ class TokenStreamingService:
         self.rpc_layer = None
         self.on_connection_status_callback: Callable[[str], None] = lambda status: print(f"Connection status: {status}")
         self.on_token: Callable[[str, str], None] = lambda token, response_id: print(f"Received token: {token}, Response ID: {response_id}")
+        self.on_tokens_callback: Optional[Callable[[List[str], str], None]] = None
         self.on_tool_call_callback: Callable[[str, str, dict], None] = lambda call_id, tool_name, tool_input: print(f"Tool call: {call_id}, Tool: {tool_name}, Input: {tool_input}")
         self.on_tool_response_callback: Callable[[str, str], None] = lambda call_id, response: print(f"Tool response: {call_id}, Response: {response}") 
 
+        # Inbound messages are dispatched in order by one task instead of a task per message
+        self.inbox: deque = deque()
+        self.has_messages = asyncio.Event()
+        self.dispatch_task: Optional[asyncio.Task] = None
+
 
     async def connect(self):
         # Create a WebSocket client
         self.websocket = SimpleWebSocketClient(self.token_streaming_url)
 
         # Create RPC peer to interface with the token streaming service
-        self.rpc_layer = JSONRPCPeer(sender=lambda msg: asyncio.create_task(self.websocket.send(msg)))
-
-        # Register event handlers
-        self.rpc_layer.on("on_token", self.on_token)
-        self.rpc_layer.on("on_tool_call", self.on_tool_call_callback)
-        self.rpc_layer.on("on_tool_response", self.on_tool_response_callback)
+        self.start_dispatch(sender=lambda msg: asyncio.create_task(self.websocket.send(msg)))
 
         # Set the message handler for the WebSocket
-        self.websocket.on("message", lambda msg: asyncio.create_task(self.rpc_layer.handle_message(msg)))
+        self.websocket.on("message", self.receive_message)
         self.websocket.on("connection_status", self.on_connection_status_callback)
 
         # Connect to the token streaming service
@@ -58,6 +61,8 @@ class TokenStreamingService:
     def on(self, event: str, callback: Callable):
         if event == "token":
             self.on_token = callback
+        elif event == "tokens":
+            self.on_tokens_callback = callback
         elif event == "tool_call":
             self.on_tool_call_callback = callback
         elif event == "tool_response":
@@ -67,12 +72,92 @@ class TokenStreamingService:
         else:
             raise ValueError(f"Unknown event: {event}")
 
+    # Start Dispatch - creates the RPC peer with the registered handlers and starts the dispatcher
+    def start_dispatch(self, sender: Callable[[str], None]):
+        self.rpc_layer = JSONRPCPeer(sender=sender)
+        self.rpc_layer.on("on_token", self.on_token)
+        self.rpc_layer.on("on_tool_call", self.on_tool_call_callback)
+        self.rpc_layer.on("on_tool_response", self.on_tool_response_callback)
+        self.dispatch_task = asyncio.create_task(self.dispatch_messages())
+
+    # Receive Message - queues the raw message for the dispatcher
+    async def receive_message(self, message: str):
+        self.inbox.append(message)
+        self.has_messages.set()
+
+    # Dispatch Messages - drains the inbox per wakeup, handing consecutive tokens of a response downstream as one batch
+    async def dispatch_messages(self):
+        while True:
+            await self.has_messages.wait()
+            self.has_messages.clear()
+
+            batch: List[str] = []
+            batch_response_id = None
+            while self.inbox:
+                message = self.inbox.popleft()
+                try:
+                    parsed_message = json.loads(message)
+                except Exception as e:
+                    print("Error parsing message", e)
+                    continue
+
+                token_params = self.token_params(parsed_message)
+                if token_params and (not batch or token_params["response_id"] == batch_response_id):
+                    batch.append(token_params["token"])
+                    batch_response_id = token_params["response_id"]
+                    continue
+
+                # Anything else ends the batch so ordering with tool calls and responses is kept
+                if batch:
+                    await self.deliver_tokens(batch, batch_response_id)
+                    batch = []
+                if token_params:
+                    batch = [token_params["token"]]
+                    batch_response_id = token_params["response_id"]
+                    continue
+                try:
+                    await self.rpc_layer.handle_parsed_message(parsed_message)
+                except Exception as e:
+                    print(f"Error handling token streaming message: {e}")
+
+            if batch:
+                await self.deliver_tokens(batch, batch_response_id)
+
+    # Token Params - the params of an on_token notification, or None for any other message
+    @staticmethod
+    def token_params(parsed_message: dict) -> Optional[dict]:
+        if not isinstance(parsed_message, dict) or parsed_message.get("method") != "on_token" or parsed_message.get("id"):
+            return None
+        params = parsed_message.get("params")
+        if not isinstance(params, dict) or not isinstance(params.get("token"), str):
+            return None
+        return {"token": params["token"], "response_id": params.get("response_id")}
+
+    async def deliver_tokens(self, tokens: List[str], response_id: str):
+        try:
+            if self.on_tokens_callback:
+                await self.on_tokens_callback(tokens, response_id)
+            else:
+                for token in tokens:
+                    await self.on_token(token, response_id)
+        except Exception as e:
+            print(f"Error handling tokens: {e}")
+
     async def add_message(self, message: str):
         await self.rpc_layer.call("add_message", {
             "message": message,
         })
 
+    # Stop the response currently being streamed, e.g. when the user interrupts
+    async def stop_response(self, response_id: str = None):
+        await self.rpc_layer.call("stop_response", {
+            "context_id": self.context_id,
+            "response_id": response_id,
+        })
+
     def close(self):
+        if self.dispatch_task:
+            self.dispatch_task.cancel()
         if self.websocket:
             asyncio.create_task(self.websocket.close())
             print("Closed token streaming service connection")
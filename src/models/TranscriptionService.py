@@ -2,16 +2,34 @@ import asyncio
 from typing import Callable
 from lib.webrtc.SimpleWebSocketClient import SimpleWebSocketClient
 from lib.webrtc.JSONRPCPeer import JSONRPCPeer
+from lib.audio_framing import pack_audio_frame, pack_opus_frame
+from models.OpusUplinkEncoder import OpusUplinkEncoder, OPUS_SAMPLE_RATES
 
 class TranscriptionService:
+    # Framing each server URL agreed to, so later connections to it start on that framing
+    negotiated_framings: dict[str, str] = {}
+
     # Constructor
     def __init__(
             self,
             transcription_service_url: str,
+            binary_audio: bool = True,
+            negotiation_timeout: float = 2,
+            opus_audio: bool = False,
+            opus_bit_rate: int = 24000,
         ):
         self.transcription_service_url = transcription_service_url
+        self.binary_audio = binary_audio
+        self.negotiation_timeout = negotiation_timeout
+        self.opus_audio = opus_audio  # Offer Opus compressed audio frames during negotiation
+        self.opus_bit_rate = opus_bit_rate
         self.websocket: SimpleWebSocketClient = None
         self.rpc_layer: JSONRPCPeer = None
+        self.audio_framing = "json"
+        self.negotiation_task: asyncio.Task = None
+        self.json_ids: set[str] = set()  # Ids that started on JSON framing stay on it until finalized or cancelled
+        self.sequence_numbers: dict[str, int] = {}
+        self.opus_encoders: dict[str, OpusUplinkEncoder] = {}  # One encoder per transcription in progress
         self.on_connection_status_callback: Callable[[str], None] = lambda status: print(f"Connection status: {status}")
         
     # Connect
@@ -29,6 +47,38 @@ class TranscriptionService:
         # Connect to the signaling server
         await self.websocket.connect()
 
+        # Negotiate binary audio framing in the background - audio goes out as JSON, or on the framing
+        # this URL agreed to before, until the server answers. Servers that don't know the method never do
+        if self.binary_audio:
+            cached_framing = TranscriptionService.negotiated_framings.get(self.transcription_service_url)
+            if self.accepts_framing(cached_framing):
+                self.audio_framing = cached_framing
+            self.negotiation_task = asyncio.create_task(self.negotiate_audio_framing())
+
+    def accepts_framing(self, framing) -> bool:
+        return framing == "binary" or (framing == "opus" and self.opus_audio)
+
+    # Negotiate audio framing - servers that don't know the method keep the JSON framing
+    async def negotiate_audio_framing(self):
+        try:
+            response = await self.rpc_layer.call("audio_framing", {
+                    "supported": ["opus", "binary", "json"] if self.opus_audio else ["binary", "json"],
+                },
+                await_response=True,
+                timeout=self.negotiation_timeout,
+            )
+            framing = response.get("framing") if response else None
+            self.audio_framing = framing if self.accepts_framing(framing) else "json"
+            TranscriptionService.negotiated_framings[self.transcription_service_url] = self.audio_framing
+        except TimeoutError as e:
+            # Not cached - the server may just be slow to answer this time
+            print(f"Audio framing negotiation timed out, staying on {self.audio_framing}: {e}")
+            return
+        except Exception as e:
+            print(f"Audio framing negotiation failed, falling back to JSON: {e}")
+            self.audio_framing = "json"
+        print(f"Transcription service audio framing: {self.audio_framing}")
+
     # Event handler for connection status
     def on(self, event: str, callback: Callable):
         if event == "connection_status":
@@ -37,33 +87,104 @@ class TranscriptionService:
             raise ValueError(f"Unknown event: {event}")
 
     # Add audio data
-    async def add_audio_data(self, id, audio_data):
+    # Frames dropped before sending (skipped_frames) use up sequence numbers so the server can see the loss
+    async def add_audio_data(self, id, audio_data, sample_rate=None, skipped_frames=0):
+        # A stream that started on JSON framing, before negotiation finished, stays on it
+        binary = id not in self.json_ids
+
+        # Send Opus packets in binary frames - a stream stays on the format of its first frame
+        if binary and self.audio_framing == "opus" and self.uses_opus(id, sample_rate):
+            encoder = self.opus_encoders.get(id)
+            if encoder is None:
+                encoder = self.opus_encoders[id] = OpusUplinkEncoder(sample_rate, bit_rate=self.opus_bit_rate)
+            self.skip_sequence_numbers(id, skipped_frames)
+            await self.send_opus_packets(id, encoder.encode(audio_data))
+            return
+
+        # Send raw PCM in a binary frame, also used with Opus framing for rates Opus can't encode
+        if binary and self.audio_framing in ("binary", "opus"):
+            sequence = self.sequence_numbers.get(id, 0) + skipped_frames
+            self.sequence_numbers[id] = sequence + 1
+            await self.websocket.send(pack_audio_frame(id, sequence, audio_data))
+            return
+
         # Send audio data to the transcription service
+        self.json_ids.add(id)
         await self.rpc_layer.call("audio_data", {
             "id": id,
             "data": audio_data.tolist(),
         })
 
+    def uses_opus(self, id, sample_rate) -> bool:
+        if id in self.opus_encoders:
+            return True
+        return id not in self.sequence_numbers and sample_rate in OPUS_SAMPLE_RATES
+
+    def skip_sequence_numbers(self, id, count):
+        if count:
+            self.sequence_numbers[id] = self.sequence_numbers.get(id, 0) + count
+
+    async def send_opus_packets(self, id, packets):
+        for packet in packets:
+            sequence = self.sequence_numbers.get(id, 0)
+            self.sequence_numbers[id] = sequence + 1
+            await self.websocket.send(pack_opus_frame(id, sequence, packet))
+
     # Cancel transcription
     async def cancel_transcription(self, id):
+        self.sequence_numbers.pop(id, None)
+        self.json_ids.discard(id)
+        self.opus_encoders.pop(id, None)  # Nothing left to send for a cancelled stream
+
         # Send cancel request to the transcription service
         await self.rpc_layer.call("cancel_transcription", {
             "id": id,
         })
 
+    # Partial transcription - transcript of the audio received so far, the stream stays open
+    async def partial_transcription(self, id, sample_rate):
+        response = await self.request_partial_transcription(id, sample_rate)
+        return await response
+
+    async def request_partial_transcription(self, id, sample_rate):
+        response = await self.rpc_layer.request("transcribe_partial", {
+                "id": id,
+                "sample_rate": sample_rate,
+            },
+            timeout=5,
+        )
+        return self.transcription_text(response)
+
     # Finalize transcription
     async def finalize_transcription(self, id, sample_rate):
+        response = await self.request_finalize_transcription(id, sample_rate)
+        return await response
+
+    # Request finalize transcription - returns once the request is sent, with an awaitable for the text
+    async def request_finalize_transcription(self, id, sample_rate):
+        # Drain the encoder so the server has every sample before it transcribes
+        encoder = self.opus_encoders.pop(id, None)
+        if encoder:
+            await self.send_opus_packets(id, encoder.flush())
+        self.sequence_numbers.pop(id, None)
+        self.json_ids.discard(id)
+
         # Send finalize request to the transcription service
-        transciptionResponse = await self.rpc_layer.call("transcribe", {
+        response = await self.rpc_layer.request("transcribe", {
                 "id": id,
                 "sample_rate": sample_rate,
             },
-            await_response=True,
             timeout=10,
         )
+        return self.transcription_text(response)
+
+    async def transcription_text(self, response):
+        transciptionResponse = await response
         return transciptionResponse.get("text", None)
 
     def close(self):
+        if self.negotiation_task:
+            self.negotiation_task.cancel()
         if self.websocket:
             asyncio.create_task(self.websocket.close())
             print("Closed token streaming service connection")
@@ -0,0 +1,254 @@
+import asyncio
+import os
+from collections import deque
+from typing import Awaitable, Callable, Optional
+from models.TranscriptionService import TranscriptionService
+
+
+class TranscriptionStream:
+    # One SpeechToText's view of a shared connection - same API as TranscriptionService
+    def __init__(
+            self,
+            connection: "PooledTranscriptionConnection",
+            max_pending_frames: int = 50,
+            request_timeout: float = 15,
+        ):
+        self.connection = connection
+        self.max_pending_frames = max_pending_frames
+        self.request_timeout = request_timeout
+        self.on_connection_status_callback: Callable[[str], None] = lambda status: print(f"Connection status: {status}")
+
+        # Ordered outbound operations - audio is bounded, control messages are never dropped.
+        # Entries are (audio_id, send, result) with audio_id None for control messages.
+        self.pending: deque = deque()
+        self.pending_audio_frames = 0
+        self.dropped_audio_frames = 0
+        self.unsent_drops: dict[str, int] = {}  # Frames dropped per id, reported with the id's next frame
+        self.open_ids: set[str] = set()  # Ids with audio queued and no finalize or cancel queued yet
+        self.has_pending = asyncio.Event()
+        self.closing = False
+        self.drain_task = asyncio.create_task(self.drain())
+
+    # Event handler for connection status
+    def on(self, event: str, callback: Callable):
+        if event == "connection_status":
+            self.on_connection_status_callback = callback
+        else:
+            raise ValueError(f"Unknown event: {event}")
+
+    # Notify Connection Status - looks the callback up when it runs, so it reaches callbacks registered after open_stream
+    async def notify_connection_status(self, status: str):
+        await self.on_connection_status_callback(status)
+
+    # Add audio data - drops the oldest queued frame instead of stalling the audio path
+    async def add_audio_data(self, id, audio_data, sample_rate=None):
+        if self.pending_audio_frames >= self.max_pending_frames:
+            for index, (audio_id, _, _) in enumerate(self.pending):
+                if audio_id is not None:
+                    del self.pending[index]
+                    self.pending_audio_frames -= 1
+                    self.dropped_audio_frames += 1
+                    # The dropped frame is older than every queued frame of its id, so the next one sent reports it
+                    self.unsent_drops[audio_id] = self.unsent_drops.get(audio_id, 0) + 1
+                    break
+
+        def send(service: TranscriptionService):
+            return service.add_audio_data(id, audio_data, sample_rate, skipped_frames=self.unsent_drops.pop(id, 0))
+        self.open_ids.add(id)
+        self.enqueue(send, audio_id=id)
+
+    # Cancel transcription
+    async def cancel_transcription(self, id):
+        self.enqueue_cancel(id)
+
+    def enqueue_cancel(self, id):
+        self.open_ids.discard(id)
+
+        def send(service: TranscriptionService):
+            self.unsent_drops.pop(id, None)
+            return service.cancel_transcription(id)
+        self.enqueue(send)
+
+    # Partial transcription
+    async def partial_transcription(self, id, sample_rate):
+        result = asyncio.get_running_loop().create_future()
+        self.enqueue(lambda service: service.request_partial_transcription(id, sample_rate), result=result)
+        return await asyncio.wait_for(result, timeout=self.request_timeout)
+
+    # Finalize transcription
+    async def finalize_transcription(self, id, sample_rate):
+        result = asyncio.get_running_loop().create_future()
+
+        def send(service: TranscriptionService):
+            self.unsent_drops.pop(id, None)  # Drops after the id's last sent frame
+            return service.request_finalize_transcription(id, sample_rate)
+        self.open_ids.discard(id)
+        self.enqueue(send, result=result)
+        return await asyncio.wait_for(result, timeout=self.request_timeout)
+
+    def enqueue(self, send: Callable[[TranscriptionService], Awaitable], audio_id: Optional[str] = None, result: Optional[asyncio.Future] = None):
+        self.pending.append((audio_id, send, result))
+        if audio_id is not None:
+            self.pending_audio_frames += 1
+        self.has_pending.set()
+
+    # Drain - sends queued operations in order once the connection is up
+    async def drain(self):
+        while True:
+            await self.has_pending.wait()
+            while self.pending:
+                service = await self.connection.get_service()
+                audio_id, send, result = self.pending.popleft()
+                if audio_id is not None:
+                    self.pending_audio_frames -= 1
+                try:
+                    response = await send(service)
+                    # Requests resolve in the background so later audio isn't held behind the reply
+                    if result:
+                        asyncio.create_task(self.resolve(result, response))
+                except Exception as e:
+                    if result and not result.done():
+                        result.set_exception(e)
+                    else:
+                        print(f"Error sending to transcription service: {e}")
+            self.has_pending.clear()
+            if self.closing:
+                return
+
+    async def resolve(self, result: asyncio.Future, response: Awaitable):
+        try:
+            text = await response
+            if not result.done():
+                result.set_result(text)
+        except Exception as e:
+            if not result.done():
+                result.set_exception(e)
+
+    # Close - drops queued audio but still sends queued control messages (e.g. cancels) so the
+    # server and the shared connection release the stream's transcriptions. Ids that were never
+    # finalized or cancelled get a cancel too - the shared connection keeps an Opus encoder and a
+    # sequence number per id until then, and it outlives this stream
+    def close(self):
+        if self.closing:
+            return
+        self.closing = True
+        self.connection.streams.discard(self)
+        control = deque()
+        for audio_id, send, result in self.pending:
+            if result and not result.done():
+                result.cancel()
+            if audio_id is None:
+                control.append((audio_id, send, result))
+        self.pending = control
+        self.pending_audio_frames = 0
+        self.unsent_drops.clear()
+        for id in list(self.open_ids):
+            self.enqueue_cancel(id)
+        if not self.pending:
+            self.drain_task.cancel()
+            return
+        # Give up on the control messages if the connection doesn't come back in time
+        self.has_pending.set()
+        asyncio.get_running_loop().call_later(self.request_timeout, self.drain_task.cancel)
+
+
+class PooledTranscriptionConnection:
+    def __init__(
+            self,
+            transcription_service_url: str,
+            reconnect_delay: float = 1,
+            max_reconnect_delay: float = 30,
+            opus_audio: bool = False,
+        ):
+        self.transcription_service_url = transcription_service_url
+        self.opus_audio = opus_audio
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.transcription_service: Optional[TranscriptionService] = None
+        self.streams: set[TranscriptionStream] = set()
+        self.connected = asyncio.Event()
+        self.connect_task: Optional[asyncio.Task] = None
+        self.closing = False
+
+    # Ensure Connected - starts connecting in the background if not already connected or connecting
+    def ensure_connected(self, delay: float = 0):
+        if self.closing or self.connected.is_set():
+            return
+        if self.connect_task and not self.connect_task.done():
+            return
+        self.connect_task = asyncio.create_task(self.connect_with_retry(delay))
+
+    async def connect_with_retry(self, delay: float):
+        while not self.closing:
+            if delay:
+                await asyncio.sleep(delay)
+            try:
+                transcription_service = TranscriptionService(
+                    transcription_service_url=self.transcription_service_url,
+                    opus_audio=self.opus_audio,
+                )
+                transcription_service.on("connection_status", self.on_connection_status)
+                await transcription_service.connect()
+                self.transcription_service = transcription_service
+                self.connected.set()
+                print(f"Pooled transcription connection established to {self.transcription_service_url}")
+                return
+            except Exception as e:
+                print(f"Pooled transcription connection failed: {e}")
+                delay = min(max(delay * 2, self.reconnect_delay), self.max_reconnect_delay)
+
+    async def get_service(self) -> TranscriptionService:
+        self.ensure_connected()
+        await self.connected.wait()
+        return self.transcription_service
+
+    # On Connection Status - reconnects dropped connections and fans the status out to every stream
+    async def on_connection_status(self, status: str):
+        if status in ("disconnected", "failed") and self.connected.is_set() and not self.closing:
+            self.connected.clear()
+            self.ensure_connected(delay=self.reconnect_delay)
+        for stream in list(self.streams):
+            await stream.on_connection_status_callback(status)
+
+    def close(self):
+        self.closing = True
+        if self.connect_task:
+            self.connect_task.cancel()
+        if self.transcription_service:
+            self.transcription_service.close()
+        self.connected.clear()
+
+
+class TranscriptionServicePool:
+    # Process-wide pools, one per transcription service URL
+    pools: dict[str, "TranscriptionServicePool"] = {}
+
+    def __init__(self, transcription_service_url: str, pool_size: int = 2, opus_audio: bool = False):
+        self.transcription_service_url = transcription_service_url
+        self.connections = [PooledTranscriptionConnection(transcription_service_url, opus_audio=opus_audio) for _ in range(pool_size)]
+
+    @classmethod
+    def for_url(cls, transcription_service_url: str) -> "TranscriptionServicePool":
+        if transcription_service_url not in cls.pools:
+            cls.pools[transcription_service_url] = cls(
+                transcription_service_url,
+                pool_size=int(os.getenv("TRANSCRIPTION_POOL_SIZE", 2)),
+                opus_audio=os.getenv("TRANSCRIPTION_OPUS_AUDIO", "").lower() in ("1", "true", "yes"),
+            )
+        return cls.pools[transcription_service_url]
+
+    # Open Stream - binds a new stream to the least loaded connection without waiting for it to connect
+    def open_stream(self) -> TranscriptionStream:
+        connection = min(self.connections, key=lambda connection: len(connection.streams))
+        stream = TranscriptionStream(connection)
+        connection.streams.add(stream)
+        # Streams joining an established connection still hear that it's connected
+        if connection.connected.is_set():
+            asyncio.create_task(stream.notify_connection_status("connected"))
+        connection.ensure_connected()
+        return stream
+
+    def close(self):
+        for connection in self.connections:
+            connection.close()
+        TranscriptionServicePool.pools.pop(self.transcription_service_url, None)
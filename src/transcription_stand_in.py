@@ -0,0 +1,227 @@
+import argparse
+import asyncio
+import json
+import time
+import uuid
+import av
+import numpy as np
+import websockets
+from lib.webrtc.JSONRPCPeer import JSONRPCPeer
+from lib.audio_framing import AUDIO_FRAME_VERSION, OPUS_FRAME_VERSION, unpack_frame_header, unpack_audio_frame, unpack_opus_frame
+
+# Local stand-in for the transcription service. Speaks the same websocket protocol (JSON-RPC plus binary
+# audio frames), decodes the uplink and answers transcribe calls with a summary of what arrived instead of text.
+#
+#   python transcription_stand_in.py --port 8765                      # serve, point TRANSCRIPTION_SERVICE_URL here
+#   python transcription_stand_in.py --check [--sample-rate 16000]    # round trip a test signal and report fidelity/bandwidth
+
+
+class StandInStream:
+    # One transcription in progress
+    def __init__(self):
+        self.chunks = []
+        self.decoder = None
+        self.resampler = None
+        self.bytes_received = 0
+        self.frames_received = 0
+        self.next_sequence = 0
+        self.lost_frames = 0
+
+    def add_frame(self, sequence: int, size: int):
+        self.bytes_received += size
+        self.frames_received += 1
+        if sequence != self.next_sequence:
+            self.lost_frames += abs(sequence - self.next_sequence)
+        self.next_sequence = sequence + 1
+
+    def add_opus_packet(self, packet: bytes, sample_rate: int):
+        # libopus always decodes at 48 kHz, resample back to the rate the client encoded at
+        if self.decoder is None:
+            self.decoder = av.CodecContext.create("libopus", "r")
+            self.decoder.sample_rate = 48000
+            self.decoder.layout = "mono"
+            self.resampler = av.AudioResampler(format="s16", layout="mono", rate=sample_rate)
+        for frame in self.decoder.decode(av.Packet(packet)):
+            for resampled in self.resampler.resample(frame):
+                self.chunks.append(resampled.to_ndarray().reshape(-1))
+
+    def samples(self) -> np.ndarray:
+        if self.resampler is not None:
+            for resampled in self.resampler.resample(None):
+                self.chunks.append(resampled.to_ndarray().reshape(-1))
+            self.resampler = None
+        if not self.chunks:
+            return np.zeros(0, dtype=np.int16)
+        return np.concatenate(self.chunks).astype(np.int16)
+
+
+class TranscriptionStandIn:
+    def __init__(
+            self,
+            framings=("opus", "binary", "json"),
+            opus_sample_rate: int = 16000,
+            negotiates: bool = True,
+            transcribe_delay: float = 0,
+        ):
+        self.framings = framings
+        self.transcribe_delay = transcribe_delay  # Seconds a transcribe call takes, standing in for model time
+        self.negotiates = negotiates  # Servers that predate binary framing never answer audio_framing
+        self.opus_sample_rate = opus_sample_rate  # The protocol doesn't carry the rate until transcribe, so assume it
+        self.streams: dict[str, StandInStream] = {}
+        self.finished: dict[str, dict] = {}  # Results of transcribed streams, kept for --check
+
+    async def handle_connection(self, websocket):
+        rpc_layer = JSONRPCPeer(sender=websocket.send)
+
+        async def audio_framing(supported):
+            for framing in self.framings:
+                if framing in supported:
+                    return {"framing": framing}
+            return {"framing": "json"}
+
+        async def audio_data(id, data):
+            stream = self.streams.setdefault(id, StandInStream())
+            stream.add_frame(stream.next_sequence, len(json.dumps(data)))
+            stream.chunks.append(np.asarray(data, dtype=np.int16))
+
+        async def cancel_transcription(id):
+            self.streams.pop(id, None)
+
+        async def transcribe_partial(id, sample_rate):
+            await asyncio.sleep(self.transcribe_delay)
+            stream = self.streams.get(id)
+            return {"text": self.summarize(stream, sample_rate)["text"] if stream else ""}
+
+        async def transcribe(id, sample_rate):
+            stream = self.streams.pop(id, None) or StandInStream()
+            await asyncio.sleep(self.transcribe_delay)
+            result = self.summarize(stream, sample_rate)
+            self.finished[id] = {**result, "audio": stream.samples()}
+            print(f"Stand-in transcribed {id}: {result['text']}")
+            return result
+
+        if self.negotiates:
+            rpc_layer.on("audio_framing", audio_framing)
+        rpc_layer.on("audio_data", audio_data)
+        rpc_layer.on("cancel_transcription", cancel_transcription)
+        rpc_layer.on("transcribe_partial", transcribe_partial)
+        rpc_layer.on("transcribe", transcribe)
+
+        async for message in websocket:
+            if isinstance(message, bytes):
+                self.handle_audio_frame(message)
+            else:
+                # Handled concurrently like a real server, so a slow transcribe doesn't hold up later audio
+                asyncio.create_task(rpc_layer.handle_message(message))
+
+    def handle_audio_frame(self, frame: bytes):
+        version, id, sequence = unpack_frame_header(frame)
+        stream = self.streams.setdefault(id, StandInStream())
+        stream.add_frame(sequence, len(frame))
+        if version == AUDIO_FRAME_VERSION:
+            stream.chunks.append(unpack_audio_frame(frame)[2])
+        elif version == OPUS_FRAME_VERSION:
+            stream.add_opus_packet(unpack_opus_frame(frame)[2], self.opus_sample_rate)
+        else:
+            print(f"Stand-in dropped frame with unknown version {version}")
+
+    def summarize(self, stream: StandInStream, sample_rate: int) -> dict:
+        samples = stream.samples()
+        seconds = len(samples) / sample_rate if sample_rate else 0
+        kbps = stream.bytes_received * 8 / seconds / 1000 if seconds else 0
+        return {
+            "text": f"[{seconds:.2f}s of audio, {stream.bytes_received} bytes, {kbps:.1f} kbps, {stream.lost_frames} lost frames]",
+            "seconds": seconds,
+            "bytes_received": stream.bytes_received,
+            "kbps": kbps,
+            "lost_frames": stream.lost_frames,
+        }
+
+
+# Test Signal - a voiced, speech-like sweep with syllable shaped amplitude
+def test_signal(sample_rate: int, seconds: float = 3) -> np.ndarray:
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    pitch = 140 + 40 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+    voiced = sum(np.sin(harmonic * phase) / harmonic for harmonic in range(1, 12) if harmonic * 220 < sample_rate / 2)
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 3 * t) ** 2
+    return (6000 * voiced * envelope).astype(np.int16)
+
+
+# Fidelity - SNR of the decoded audio after aligning it with the original (Opus adds a few ms of delay)
+def fidelity(original: np.ndarray, decoded: np.ndarray, max_delay: int) -> tuple:
+    original = original.astype(np.float64)
+    decoded = decoded.astype(np.float64)
+    best = (-np.inf, 0)
+    for delay in range(0, min(max_delay, len(decoded) - len(original)) + 1):
+        error = decoded[delay:delay + len(original)] - original
+        snr = 10 * np.log10(np.sum(original ** 2) / max(np.sum(error ** 2), 1e-9))
+        best = max(best, (snr, delay))
+    return best
+
+
+async def check(sample_rate: int, chunk_ms: int, opus_audio: bool, port: int):
+    from models.TranscriptionService import TranscriptionService
+
+    stand_in = TranscriptionStandIn(opus_sample_rate=sample_rate)
+    async with websockets.serve(stand_in.handle_connection, "localhost", port):
+        service = TranscriptionService(f"ws://localhost:{port}", opus_audio=opus_audio)
+        async def on_connection_status(status):
+            pass
+        service.on("connection_status", on_connection_status)
+        await service.connect()
+        await service.negotiation_task  # Report on the negotiated framing, not the JSON used until the reply
+
+        original = test_signal(sample_rate)
+        chunk = sample_rate * chunk_ms // 1000
+        id = str(uuid.uuid4())
+        start = time.perf_counter()
+        for offset in range(0, len(original), chunk):
+            await service.add_audio_data(id, original[offset:offset + chunk], sample_rate)
+        encode_seconds = time.perf_counter() - start
+        await service.finalize_transcription(id, sample_rate)
+
+        # A cancelled stream must leave nothing behind on either side
+        cancelled_id = str(uuid.uuid4())
+        await service.add_audio_data(cancelled_id, original[:chunk], sample_rate)
+        await service.cancel_transcription(cancelled_id)
+        await asyncio.sleep(0.1)
+        service.close()
+        await asyncio.sleep(0.1)
+
+    result = stand_in.finished[id]
+    snr, delay = fidelity(original, result["audio"], max_delay=sample_rate // 50)
+    print(f"Framing:        {service.audio_framing}")
+    print(f"Audio:          {len(original) / sample_rate:.2f}s at {sample_rate} Hz in {chunk_ms} ms chunks")
+    print(f"Received:       {len(result['audio'])} samples, {result['lost_frames']} lost frames")
+    print(f"Uplink:         {result['bytes_received']} bytes, {result['bytes_received'] * 8 / (len(original) / sample_rate) / 1000:.1f} kbps")
+    print(f"Fidelity:       {snr:.1f} dB SNR at {delay * 1000 / sample_rate:.1f} ms delay")
+    print(f"Encode time:    {encode_seconds * 1000 / (len(original) / chunk):.3f} ms per chunk")
+    print(f"Leftover state: {len(service.opus_encoders)} encoders, {len(stand_in.streams)} server streams")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the transcription service")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--check", action="store_true", help="Round trip a test signal through TranscriptionService and exit")
+    parser.add_argument("--sample-rate", type=int, default=16000)
+    parser.add_argument("--chunk-ms", type=int, default=20)
+    parser.add_argument("--pcm", action="store_true", help="With --check, don't offer Opus")
+    parser.add_argument("--transcribe-delay-ms", type=int, default=0, help="Time each transcribe call takes")
+    args = parser.parse_args()
+
+    if args.check:
+        asyncio.run(check(args.sample_rate, args.chunk_ms, not args.pcm, args.port))
+        return
+
+    async def serve():
+        stand_in = TranscriptionStandIn(opus_sample_rate=args.sample_rate, transcribe_delay=args.transcribe_delay_ms / 1000)
+        async with websockets.serve(stand_in.handle_connection, "0.0.0.0", args.port):
+            print(f"Transcription stand-in listening on ws://localhost:{args.port}")
+            await asyncio.Future()
+
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The app runs from src/ (see the Dockerfiles), so tests import modules the same way it does
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
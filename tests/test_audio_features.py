@@ -0,0 +1,16 @@
+import numpy as np
+from lib.audio_features import extract_audio_features
+
+
+def test_features_match_direct_computation_without_overflow():
+    samples = np.array([-32768, 32767, -1, 0, 5, -5, 32767, -32768], dtype=np.int16)
+    features = extract_audio_features(samples)
+    assert features.energy == float(np.sum(samples.astype(np.int64) ** 2))
+    assert features.peak == 32768.0
+    assert features.zero_crossing_rate == 6 / 8  # Sign changes, counting 0 as positive
+    assert features.sample_count == 8
+
+
+def test_empty_frame():
+    features = extract_audio_features(np.zeros(0, dtype=np.int16))
+    assert (features.energy, features.peak, features.zero_crossing_rate, features.sample_count) == (0.0, 0.0, 0.0, 0)
@@ -0,0 +1,39 @@
+import numpy as np
+from lib.webrtc.AudioRingBuffer import AudioRingBuffer
+
+
+def test_random_writes_and_reads_match_a_plain_queue():
+    rng = np.random.default_rng(3)
+    ring = AudioRingBuffer(capacity=64)
+    written = np.zeros(0, dtype=np.int16)
+    read = []
+
+    # Sizes around the capacity so writes wrap around and the buffer grows several times
+    for _ in range(2000):
+        if rng.random() < 0.55:
+            samples = rng.integers(-32768, 32768, int(rng.integers(0, 150)), dtype=np.int16)
+            ring.write(samples)
+            written = np.concatenate((written, samples))
+        elif len(ring):
+            read.append(ring.read(int(rng.integers(1, len(ring) + 1))))
+        assert len(ring) == ring.write_position - ring.read_position
+    read.append(ring.read(len(ring)))
+
+    assert ring.capacity > 64
+    assert ring.write_position == len(written)
+    assert np.array_equal(np.concatenate(read), written)
+
+
+def test_grow_keeps_absolute_positions():
+    ring = AudioRingBuffer(capacity=8)
+    ring.write(np.arange(6))
+    ring.read(5)
+    ring.write(np.arange(6, 12))  # Wraps around: samples 5-11 are buffered at 5-7 and 0-3
+    assert (ring.read_position, ring.write_position, ring.capacity) == (5, 12, 8)
+
+    ring.write(np.arange(12, 20))  # 15 buffered - grows to 16 while the data is wrapped
+    assert (ring.read_position, ring.write_position, ring.capacity) == (5, 20, 16)
+
+    # Positions taken before the grow still address the same samples
+    assert np.array_equal(ring.copy_into(7, np.empty(10, dtype=np.int16)), np.arange(7, 17))
+    assert np.array_equal(ring.read(15), np.arange(5, 20))
@@ -0,0 +1,46 @@
+import asyncio
+from lib.webrtc.MediaClock import MediaClock
+from lib.webrtc.SyntheticAudioTrack import SyntheticAudioTrack
+from models.ConversationOrchestrator import ConversationOrchestrator
+
+
+def make_orchestrator():
+    orchestrator = ConversationOrchestrator("context", broadcast_agent_audio=False)
+
+    async def start_speech_generator():
+        pass
+    orchestrator.start_speech_generator = start_speech_generator
+    return orchestrator
+
+
+def test_interrupted_response_ids_are_bounded():
+    async def run():
+        orchestrator = make_orchestrator()
+        for index in range(100):
+            orchestrator.current_response_id = f"response-{index}"
+            await orchestrator.interrupt()
+        # Late tokens of the latest interrupted response are still dropped
+        await orchestrator.on_tokens(["late"], "response-99")
+        return list(orchestrator.interrupted_response_ids), orchestrator.token_queue.qsize()
+
+    interrupted, queued = asyncio.run(run())
+    assert len(interrupted) == 32
+    assert interrupted[-1] == "response-99"
+    assert queued == 0
+
+
+def test_interrupt_to_silence_latency_is_recorded():
+    async def run():
+        orchestrator = make_orchestrator()
+        track = SyntheticAudioTrack(media_clock=MediaClock())
+        track.on("flushed", lambda: orchestrator.on_audio_flushed("peer"))
+        orchestrator.peer_to_media_stream["peer"] = track
+
+        await orchestrator.interrupt()
+        await asyncio.sleep(0.01)
+        track.prepare_frame(0, 0)  # First frame after the flush
+        return list(orchestrator.interrupt_to_silence_ms)
+
+    latencies = asyncio.run(run())
+    assert len(latencies) == 1
+    assert 10 <= latencies[0] < 1000
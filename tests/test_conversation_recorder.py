@@ -0,0 +1,113 @@
+import threading
+import time
+import numpy as np
+import pytest
+from models import ConversationRecorder as recorder_module
+from models.ConversationRecorder import ConversationRecorder
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(recorder_module.time, "monotonic", clock.monotonic)
+    return clock
+
+
+def frames(rng, count, size=960):
+    return [rng.integers(-32768, 32768, size, dtype=np.int16) for _ in range(count)]
+
+
+def test_records_session_exactly(tmp_path, clock):
+    rng = np.random.default_rng(18)
+    caller = frames(rng, 120)
+    agent = frames(rng, 120)
+
+    # Segments smaller than a frame multiple so frames straddle segment boundaries, and enough of
+    # them to hold the whole session so the writer thread's pace doesn't matter
+    recorder = ConversationRecorder("session/1", str(tmp_path), segment_samples=1000, segment_count=256)
+    for caller_frame, agent_frame in zip(caller, agent):
+        recorder.record("caller", caller_frame, 48000)
+        recorder.record("agent", agent_frame, 48000)
+        clock.now += 0.02
+    recorder.close()
+    recorder.wait_closed(5)
+
+    for source, expected in (("caller", caller), ("agent", agent)):
+        samples, index = ConversationRecorder.read_recording(recorder.session_dir, source)
+        assert np.array_equal(samples, np.concatenate(expected))
+        assert index == [(0, 0.0, 48000)]
+    assert recorder.dropped_samples == 0
+    assert not (tmp_path / "session_1" / "segments.mmap").exists()
+
+
+def test_index_marks_gaps_and_rate_changes(tmp_path, clock):
+    rng = np.random.default_rng(19)
+    recorded = frames(rng, 30, size=480)
+    recorder = ConversationRecorder("gaps", str(tmp_path), segment_samples=4800, segment_count=8)
+
+    for frame in recorded[:10]:
+        recorder.record("caller", frame, 48000)
+        clock.now += 0.01
+    clock.now += 1.5  # Caller audio stopped for a while
+    for frame in recorded[10:20]:
+        recorder.record("caller", frame, 48000)
+        clock.now += 0.01
+    for frame in recorded[20:]:
+        recorder.record("caller", frame, 16000)
+        clock.now += 0.03
+    recorder.close()
+    recorder.wait_closed(5)
+
+    samples, index = ConversationRecorder.read_recording(recorder.session_dir, "caller")
+    assert np.array_equal(samples, np.concatenate(recorded))
+    assert [(position, rate) for position, _, rate in index] == [(0, 48000), (4800, 48000), (9600, 16000)]
+    assert index[1][1] == pytest.approx(1.6)
+
+
+class StalledWriterRecorder(ConversationRecorder):
+    # Writer thread waits for the gate, so handed off segments stay in flight
+    def __init__(self, *args, **kwargs):
+        self.writer_gate = threading.Event()
+        super().__init__(*args, **kwargs)
+
+    def write_segments(self):
+        self.writer_gate.wait()
+        super().write_segments()
+
+
+def test_drops_frames_when_writer_is_behind(tmp_path, clock):
+    rng = np.random.default_rng(20)
+    recorded = frames(rng, 8, size=500)
+    recorder = StalledWriterRecorder("drops", str(tmp_path), segment_samples=1000, segment_count=2)
+
+    # Two frames fill each segment - after four both are in flight and the next two frames are dropped
+    for frame in recorded[:6]:
+        recorder.record("caller", frame, 48000)
+        clock.now += 500 / 48000
+    assert recorder.dropped_samples == 1000
+
+    # Writer catches up and frees both segments
+    recorder.writer_gate.set()
+    for _ in range(500):
+        if recorder.free_segments.qsize() == 2:
+            break
+        time.sleep(0.01)
+    for frame in recorded[6:]:
+        recorder.record("caller", frame, 48000)
+        clock.now += 500 / 48000
+    recorder.close()
+    recorder.wait_closed(5)
+
+    samples, index = ConversationRecorder.read_recording(recorder.session_dir, "caller")
+    assert np.array_equal(samples, np.concatenate(recorded[:4] + recorded[6:]))
+    # One entry where recording resumed, at the session time of the first recorded frame after the drop
+    assert [position for position, _, _ in index] == [0, 2000]
+    assert index[1][1] == pytest.approx(6 * 500 / 48000)
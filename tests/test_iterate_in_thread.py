@@ -0,0 +1,90 @@
+import asyncio
+import threading
+import time
+import numpy as np
+from lib.iterate_in_thread import iterate_in_thread
+from lib.tts.ElevenLabsStreamEngine import ElevenLabsStreamEngine
+
+
+class SlowProvider:
+    # Stands in for the ElevenLabs client - each chunk takes delay seconds to "synthesize"
+    def __init__(self, chunks, delay=0.05):
+        self.chunks = chunks
+        self.delay = delay
+        self.finished = threading.Event()
+        self.closed = False
+        self.text_to_speech = self
+
+    def convert_as_stream(self, **kwargs):
+        try:
+            for chunk in self.chunks:
+                time.sleep(self.delay)
+                yield chunk
+            self.finished.set()
+        finally:
+            self.closed = True
+
+
+def slow_engine(provider):
+    engine = ElevenLabsStreamEngine.__new__(ElevenLabsStreamEngine)
+    engine.client = provider
+    return engine
+
+
+def test_first_chunk_arrives_before_stream_ends():
+    provider = SlowProvider([np.full(480, i, dtype=np.int16).tobytes() for i in range(5)])
+
+    async def consume():
+        received = []
+        async for samples in slow_engine(provider).stream("Hello there."):
+            received.append((samples, provider.finished.is_set()))
+        return received
+
+    received = asyncio.run(consume())
+    assert len(received) == 5
+    assert not received[0][1]  # Provider was still synthesizing when the first chunk reached us
+    assert all(np.array_equal(samples, np.full(480, i)) for i, (samples, _) in enumerate(received))
+
+
+def test_odd_byte_chunks_are_carried_over():
+    pcm = np.arange(1000, dtype=np.int16).tobytes()
+    provider = SlowProvider([pcm[:301], pcm[301:1001], pcm[1001:]], delay=0)
+
+    async def consume():
+        return [samples async for samples in slow_engine(provider).stream("Hi.")]
+
+    assert np.array_equal(np.concatenate(asyncio.run(consume())), np.arange(1000))
+
+
+def test_early_exit_closes_provider():
+    provider = SlowProvider([b"\x00\x00" * 480] * 50, delay=0.01)
+
+    async def consume_one():
+        stream = slow_engine(provider).stream("Stop early.")
+        async for _ in stream:
+            break
+        await stream.aclose()
+        for _ in range(100):
+            if provider.closed:
+                break
+            await asyncio.sleep(0.01)
+
+    asyncio.run(consume_one())
+    assert provider.closed
+    assert not provider.finished.is_set()
+
+
+def test_errors_are_raised_in_the_consumer():
+    def failing():
+        yield 1
+        raise ConnectionError("provider went away")
+
+    async def consume():
+        items = []
+        try:
+            async for item in iterate_in_thread(failing):
+                items.append(item)
+        except ConnectionError as e:
+            return items, str(e)
+
+    assert asyncio.run(consume()) == ([1], "provider went away")
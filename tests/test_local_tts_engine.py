@@ -0,0 +1,43 @@
+import asyncio
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+import pytest
+from lib.tts.LocalTTSEngine import LocalTTSEngine
+
+
+class BrokenExecutor:
+    def __init__(self):
+        self.shutdowns = 0
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_exception(BrokenProcessPool("worker died"))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shutdowns += 1
+
+
+def test_concurrent_failures_restart_the_pool_once():
+    engine = LocalTTSEngine.__new__(LocalTTSEngine)
+    broken = BrokenExecutor()
+    engine.executor = broken
+    started = []
+
+    def start_workers():
+        engine.executor = object()
+        started.append(engine.executor)
+    engine.start_workers = start_workers
+
+    async def synthesize(text):
+        with pytest.raises(BrokenProcessPool):
+            async for _ in engine.stream(text):
+                pass
+
+    async def run():
+        await asyncio.gather(*(synthesize(f"sentence {index}") for index in range(3)))
+
+    asyncio.run(run())
+    assert len(started) == 1
+    assert broken.shutdowns == 1
+    assert engine.executor is started[0]
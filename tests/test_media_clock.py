@@ -0,0 +1,104 @@
+import asyncio
+import time
+from lib.webrtc.MediaClock import MediaClock
+from lib.webrtc.SyntheticAudioTrack import SyntheticAudioTrack
+
+
+async def consume(track, seconds, slow_every=0, slow_seconds=0.025):
+    # Pulls frames like the sender, optionally stalling on every slow_every'th frame.
+    # Returns how far the track's media time ended up behind wall time, at worst
+    start = time.monotonic()
+    frames = 0
+    worst_behind = 0.0
+    while time.monotonic() - start < seconds:
+        frame = await track.recv()
+        frames += 1
+        if slow_every and frames % slow_every == 0:
+            await asyncio.sleep(slow_seconds)
+        media_end = (frame.pts + track.frame_size) / track.sample_rate
+        worst_behind = max(worst_behind, time.monotonic() - start - media_end)
+    return worst_behind
+
+
+def test_slow_consumer_catches_up_with_wall_time():
+    async def run():
+        clock = MediaClock()
+        steady, slow = SyntheticAudioTrack(media_clock=clock), SyntheticAudioTrack(media_clock=clock)
+        behind = await asyncio.gather(consume(steady, 2), consume(slow, 2, slow_every=10))
+        return behind, slow.pacing_stats()
+
+    (steady_behind, slow_behind), slow_stats = asyncio.run(run())
+    # 25ms lost every 10 frames adds up to ~250ms over 2s unless the track catches up
+    assert steady_behind < 0.03
+    assert slow_behind < 0.04
+    assert slow_stats["resyncs"] == 0
+
+
+def test_stalled_track_resyncs_on_its_own_schedule():
+    async def run():
+        clock = MediaClock()
+        stalled, steady = SyntheticAudioTrack(media_clock=clock), SyntheticAudioTrack(media_clock=clock)
+        steady_task = asyncio.create_task(consume(steady, 0.6))
+        for _ in range(5):
+            await stalled.recv()
+        await asyncio.sleep(0.3)  # Far beyond the lag bound
+        burst_start = time.monotonic()
+        for _ in range(3):
+            await stalled.recv()
+        burst_seconds = time.monotonic() - burst_start
+        await steady_task
+        return stalled.pacing_stats(), steady.pacing_stats(), clock.stats(), burst_seconds
+
+    stalled_stats, steady_stats, clock_stats, burst_seconds = asyncio.run(run())
+    assert stalled_stats["resyncs"] == 1
+    assert steady_stats["resyncs"] == 0
+    assert clock_stats["resyncs"] == 1
+    # After the resync frames are paced again instead of bursting out the backlog
+    assert burst_seconds > 0.015
+
+
+async def block_loop(block_seconds, every_seconds):
+    # Busy work on the loop thread, like a slow handler
+    while True:
+        await asyncio.sleep(every_seconds)
+        end = time.perf_counter() + block_seconds
+        while time.perf_counter() < end:
+            pass
+
+
+def test_pacing_counters_report_event_loop_load():
+    async def run(block_seconds):
+        track = SyntheticAudioTrack(media_clock=MediaClock())
+        load_task = asyncio.create_task(block_loop(block_seconds, 0.1)) if block_seconds else None
+        await consume(track, 1.5)
+        if load_task:
+            load_task.cancel()
+        return track.pacing_stats()
+
+    idle = asyncio.run(run(0))
+    loaded = asyncio.run(run(0.03))
+    assert idle["late_frames"] <= idle["frames_sent"] * 0.02
+    assert idle["jitter_ms"] < 2
+    # Each 30ms block holds back at least one frame past half a frame period, but stays within the lag bound
+    assert loaded["late_frames"] >= 5
+    assert loaded["jitter_ms"] > idle["jitter_ms"]
+    assert loaded["max_lateness_ms"] > 20
+    assert loaded["resyncs"] == 0
+
+
+def test_tick_task_outlives_the_frames_it_hands_out():
+    async def run():
+        clock = MediaClock(idle_ticks_before_stop=5)
+        tracks = [SyntheticAudioTrack(media_clock=clock) for _ in range(3)]
+        await asyncio.gather(*(consume(track, 0.5) for track in tracks))
+        tick_task = clock.tick_task
+        running_after_frames = not tick_task.done()
+        await asyncio.sleep(0.2)  # Well past 5 idle ticks
+        return clock.stats(), running_after_frames, tick_task.done()
+
+    stats, running_after_frames, stopped_when_idle = asyncio.run(run())
+    # One task ticks for the whole run instead of one per frame
+    assert stats["tick_tasks_started"] == 1
+    assert stats["ticks"] >= 20
+    assert running_after_frames
+    assert stopped_when_idle
@@ -0,0 +1,164 @@
+import asyncio
+import random
+import time
+from typing import AsyncGenerator, Optional, Union
+from lib import sentence_stream as sentence_stream_module
+from lib.sentence_stream import SENTENCE_END_RE, ResponseStart, first_chunk_end, sentence_stream
+
+
+# Reference - sentence_stream before the incremental scanner (buffer += token, regex over the whole buffer)
+async def reference_sentence_stream(
+        token_generator: AsyncGenerator[Union[str, ResponseStart], None],
+        early_first_chunk: bool = False,
+        first_chunk_min_words: int = 3,
+        first_chunk_max_words: int = 12,
+        first_chunk_max_delay_ms: Optional[float] = 600,
+    ) -> AsyncGenerator[str, None]:
+    buffer = ""
+    # Latency-aware mode: the first segment of each response may end at a clause boundary or budget
+    first_segment_pending = early_first_chunk
+    response_started_at = None
+
+    async for token in token_generator:
+        # New response - flush what's left of the previous one and reset the first-chunk state
+        if isinstance(token, ResponseStart):
+            if buffer.strip():
+                yield buffer.strip()
+            buffer = ""
+            first_segment_pending = early_first_chunk
+            response_started_at = None
+            continue
+
+        if response_started_at is None:
+            response_started_at = time.monotonic()
+        buffer += token
+
+        while True:
+            match = SENTENCE_END_RE.search(buffer)
+            if not match:
+                break
+
+            end_idx = match.end()
+            sentence = buffer[:end_idx].strip()
+            if sentence:
+                yield sentence
+                first_segment_pending = False
+            buffer = buffer[end_idx:]
+
+        if first_segment_pending:
+            elapsed_ms = (time.monotonic() - response_started_at) * 1000
+            end_idx = first_chunk_end(buffer, first_chunk_min_words, first_chunk_max_words, first_chunk_max_delay_ms, elapsed_ms)
+            if end_idx is not None:
+                yield buffer[:end_idx].strip()
+                buffer = buffer[end_idx:]
+                first_segment_pending = False
+
+    # Flush any remaining text at the end
+    if buffer.strip():
+        yield buffer.strip()
+
+
+PIECES = [
+    "Hello", " world", ".", "!", "?", " ", "\n", "  ", "Dr.", " Smith", "e.g.", " 3.5", " 1,000", ",", ";", ":",
+    " -", " \u2014", "...", "?!", "ok", " and", " then", " https://example.com/a.b", ".\n", "! ", "x", "",
+]
+
+
+def random_tokens(rng: random.Random, max_tokens: int) -> list:
+    tokens = []
+    for _ in range(rng.randint(0, max_tokens)):
+        if rng.random() < 0.03:
+            tokens.append(ResponseStart(str(rng.random())))
+        else:
+            tokens.append("".join(rng.choice(PIECES) for _ in range(rng.randint(1, 3))))
+    return tokens
+
+
+async def collect(stream_function, tokens, **kwargs):
+    async def token_generator():
+        for token in tokens:
+            yield token
+    return [sentence async for sentence in stream_function(token_generator(), **kwargs)]
+
+
+async def compare(tokens, **kwargs):
+    expected = await collect(reference_sentence_stream, tokens, **kwargs)
+    actual = await collect(sentence_stream, tokens, **kwargs)
+    assert actual == expected, (tokens, kwargs)
+
+
+def test_matches_reference_on_random_streams():
+    async def run():
+        rng = random.Random(14)
+        for _ in range(20000):
+            await compare(random_tokens(rng, 40))
+    asyncio.run(run())
+
+
+def test_matches_reference_with_early_first_chunk():
+    # The time budget is disabled so both runs are deterministic; streams stay under the early cut's scan limit
+    async def run():
+        rng = random.Random(1014)
+        for _ in range(5000):
+            await compare(random_tokens(rng, 40), early_first_chunk=True, first_chunk_max_delay_ms=None)
+    asyncio.run(run())
+
+
+def test_long_stream_without_sentence_end():
+    tokens = ["word "] * 3000 + ["done."]
+    asyncio.run(compare(tokens))
+    assert asyncio.run(collect(sentence_stream, tokens)) == [("word " * 3000) + "done."]
+
+
+def cut(buffer, elapsed_ms=0, max_delay_ms=600):
+    end_idx = first_chunk_end(buffer, 3, 12, max_delay_ms, elapsed_ms)
+    return None if end_idx is None else buffer[:end_idx].strip()
+
+
+def test_first_chunk_cuts_at_clause_boundaries():
+    assert cut("Sure, I can help with that, ") == "Sure, I can help with that,"
+    assert cut("Well, let me check; the order shipped ") == "Well, let me check;"
+    assert cut("Here is the plan - first we ") == "Here is the plan -"
+    # Too few words before the clause ends
+    assert cut("Sure, I ") is None
+    # Punctuation inside numbers and URLs is not a clause boundary
+    assert cut("It costs 1,000 dollars or 3,5 euros at https://example.com today") is None
+
+
+def test_first_chunk_word_budget():
+    words = "one two three four five six seven eight nine ten eleven twelve thirteen"
+    assert cut(words[:words.rfind(" ")]) is None  # 12 words is within budget
+    assert cut(words) == "one two three four five six seven eight nine ten eleven twelve"
+
+
+def test_first_chunk_time_budget():
+    assert cut("I think the answer ", elapsed_ms=599) is None
+    assert cut("I think the answer ", elapsed_ms=600) == "I think the answer"
+    assert cut("I think the answer ", elapsed_ms=10_000, max_delay_ms=None) is None
+    # Never cuts before min_words, however long it takes
+    assert cut("I think ", elapsed_ms=10_000) is None
+
+
+def test_first_chunk_never_cuts_after_an_abbreviation():
+    assert cut("We will ask Dr. ", elapsed_ms=700) is None
+    assert cut("We will ask Dr. Smith ", elapsed_ms=700) == "We will ask Dr. Smith"
+    assert cut("one two three four five six seven eight nine ten eleven e.g. ") is None
+
+
+def test_time_budget_cuts_a_slow_first_sentence(monkeypatch):
+    # Tokens arrive 100ms apart on a fake clock - the first segment is cut once 600ms have passed
+    clock = {"now": 0.0}
+    monkeypatch.setattr(sentence_stream_module.time, "monotonic", lambda: clock["now"])
+
+    async def token_generator():
+        for token in ["I", " think", " the", " answer", " is", " that", " we", " should", " wait", " longer", ".", " Okay", "."]:
+            yield token
+            clock["now"] += 0.1
+
+    async def run():
+        return [(segment, round(clock["now"], 1)) async for segment in sentence_stream(token_generator(), early_first_chunk=True)]
+
+    segments = asyncio.run(run())
+    # " we" arrives at 600ms and may not be a whole word yet, so the cut is before it
+    assert segments[0] == ("I think the answer is that", 0.6)
+    assert [segment for segment, _ in segments[1:]] == ["we should wait longer.", "Okay."]
@@ -0,0 +1,46 @@
+import numpy as np
+from lib.webrtc.SharedAudioBuffer import SharedAudioBuffer
+
+
+def read(buffer, listener, count):
+    return buffer.read_into(listener, np.empty(count, dtype=np.int16))
+
+
+def test_growing_keeps_every_cursor_in_place():
+    buffer = SharedAudioBuffer(capacity=1000)
+    buffer.add_listener("started")
+    buffer.add_listener("not started")
+    buffer.enqueue_audio_samples(np.arange(1000), "first")
+    assert np.array_equal(read(buffer, "started", 500), np.arange(500))
+
+    # 2200 samples pinned by the listener that hasn't read yet - more than the capacity
+    buffer.enqueue_audio_samples(np.arange(1000, 2200), "second")
+    assert buffer.samples.capacity > 1000
+
+    assert np.array_equal(read(buffer, "not started", 3), [0, 1, 2])
+    assert np.array_equal(read(buffer, "started", 3), [500, 501, 502])
+    assert buffer.sentence_id_at(buffer.cursor("not started")) == "first"
+    assert buffer.sentence_id_at(1500) == "second"
+    assert np.array_equal(read(buffer, "not started", 2197), np.arange(3, 2200))
+
+
+def test_stalled_listener_is_skipped_ahead():
+    buffer = SharedAudioBuffer(capacity=1000, max_listener_lag=800)
+    buffer.add_listener("steady")
+    buffer.add_listener("stalled")
+
+    # The steady listener plays 5000 samples while the other never reads
+    for start in range(0, 5000, 100):
+        buffer.enqueue_audio_samples(np.arange(start, start + 100), f"sentence {start // 1000}")
+        read(buffer, "steady", 100)
+        assert len(buffer.samples) <= 800 + 100
+
+    assert buffer.samples.capacity == 1000
+    assert buffer.skipped_samples > 0
+    assert buffer.cursor("steady") - buffer.cursor("stalled") <= 800
+    assert buffer.sentence_ranges[0][1] > buffer.samples.read_position
+
+    # Once it reads again it stays within the bound of the live audio
+    buffer.enqueue_audio_samples(np.arange(5000, 5100))
+    lag = buffer.available("stalled")
+    assert np.array_equal(read(buffer, "stalled", lag), np.arange(5100 - lag, 5100))
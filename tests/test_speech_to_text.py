@@ -0,0 +1,136 @@
+import asyncio
+import numpy as np
+from models.SpeechToText import SpeechToText
+
+
+class FakeTranscriptionStream:
+    # Replies to partial requests only when released, like a slow server
+    def __init__(self):
+        self.partial_reply = asyncio.Event()
+        self.finalized = []
+        self.cancelled = []
+
+    async def add_audio_data(self, id, audio_data, sample_rate=None):
+        pass
+
+    async def partial_transcription(self, id, sample_rate):
+        await self.partial_reply.wait()
+        return "hello there"
+
+    async def finalize_transcription(self, id, sample_rate):
+        self.finalized.append(id)
+        return "hello there, how are you?"
+
+    async def cancel_transcription(self, id):
+        self.cancelled.append(id)
+
+    def enqueue_cancel(self, id):
+        self.cancelled.append(id)
+
+    def close(self):
+        pass
+
+
+def test_partial_reply_after_finalize_is_ignored():
+    async def run():
+        speech_to_text = SpeechToText("ws://unused", silence_duration_ms=100, partial_interval_ms=40)
+        stream = speech_to_text.transcription_service = FakeTranscriptionStream()
+        events = []
+
+        async def on_partial_speech_detected(text):
+            events.append(("partial", text))
+
+        async def on_speech_detected(text):
+            events.append(("final", text))
+
+        async def on_is_speaking_status(is_speaking):
+            events.append(("speaking", is_speaking))
+            if not is_speaking:
+                # The partial reply lands while the end of turn is still being announced
+                stream.partial_reply.set()
+                await asyncio.sleep(0.01)
+
+        speech_to_text.on("partial_speech_detected", on_partial_speech_detected)
+        speech_to_text.on("speech_detected", on_speech_detected)
+        speech_to_text.on("is_speaking_status", on_is_speaking_status)
+
+        voiced = (8000 * np.sin(np.arange(960) / 3)).astype(np.int16)
+        silence = np.zeros(960, dtype=np.int16)
+        for _ in range(5):
+            await speech_to_text.add_audio_data(voiced, 48000)
+        transcribe_id = speech_to_text.current_transcribe_id
+        for _ in range(6):
+            await speech_to_text.add_audio_data(silence, 48000)
+        await asyncio.sleep(0.05)
+        return events, stream.finalized, transcribe_id
+
+    events, finalized, transcribe_id = asyncio.run(run())
+    assert finalized == [transcribe_id]
+    assert events == [("speaking", True), ("speaking", False), ("final", "hello there, how are you?")]
+
+
+def test_close_mid_utterance_cancels_it():
+    async def run():
+        speech_to_text = SpeechToText("ws://unused")
+        stream = speech_to_text.transcription_service = FakeTranscriptionStream()
+
+        async def on_is_speaking_status(is_speaking):
+            pass
+        speech_to_text.on("is_speaking_status", on_is_speaking_status)
+
+        await speech_to_text.add_audio_data((8000 * np.sin(np.arange(960) / 3)).astype(np.int16), 48000)
+        transcribe_id = speech_to_text.current_transcribe_id
+        speech_to_text.close()
+        return stream.cancelled, transcribe_id
+
+    cancelled, transcribe_id = asyncio.run(run())
+    assert cancelled == [transcribe_id]
+
+
+class FailingPartialStream(FakeTranscriptionStream):
+    # Answers partial requests from a script of errors and texts
+    def __init__(self, replies):
+        super().__init__()
+        self.replies = list(replies)
+
+    async def partial_transcription(self, id, sample_rate):
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+
+def run_partial_requests(replies):
+    async def run():
+        speech_to_text = SpeechToText("ws://unused", partial_interval_ms=200)
+        speech_to_text.transcription_service = FailingPartialStream(replies)
+        speech_to_text.current_transcribe_id = "utterance"
+        partials = []
+
+        async def on_partial_speech_detected(text):
+            partials.append(text)
+        speech_to_text.on("partial_speech_detected", on_partial_speech_detected)
+
+        supported = []
+        for _ in replies:
+            await speech_to_text.request_partial_transcript("utterance", 16000)
+            supported.append(speech_to_text.partial_supported)
+        return supported, partials
+
+    return asyncio.run(run())
+
+
+def test_transient_partial_failure_keeps_partials_on():
+    supported, partials = run_partial_requests([TimeoutError("Timeout waiting for response to transcribe_partial"), "hello", TimeoutError("again"), "hello there"])
+    assert supported == [True, True, True, True]
+    assert partials == ["hello", "hello there"]
+
+
+def test_repeated_partial_failures_turn_partials_off():
+    supported, _ = run_partial_requests([TimeoutError("Timeout waiting for response to transcribe_partial")] * 3)
+    assert supported == [True, True, False]
+
+
+def test_unknown_partial_method_turns_partials_off():
+    supported, _ = run_partial_requests([Exception("Error in response to transcribe_partial: Method not found")])
+    assert supported == [False]
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+from scipy.signal import resample_poly
+from models.StreamingResampler import StreamingResampler
+
+RATES = [(48000, 16000), (44100, 16000), (22050, 16000), (16000, 48000)]
+
+
+def process_in_chunks(resampler, samples, rng):
+    # Random frame sizes, including empty and sub-ratio frames that produce no output
+    chunks, start = [], 0
+    while start < len(samples):
+        size = int(rng.choice([0, 1, 2, 7, 160, 441, 480, 960, 1024, 1913]))
+        chunks.append(resampler.process(samples[start:start + size]))
+        start += size
+    return np.concatenate(chunks)
+
+
+@pytest.mark.parametrize("input_rate,output_rate", RATES)
+def test_chunked_output_matches_one_shot(input_rate, output_rate):
+    rng = np.random.default_rng(24)
+    samples = rng.integers(-20000, 20000, input_rate * 2).astype(np.int16)
+
+    one_shot = StreamingResampler(input_rate, output_rate).process(samples)
+    chunked = process_in_chunks(StreamingResampler(input_rate, output_rate), samples, rng)
+    assert chunked.dtype == np.int16
+    assert np.array_equal(chunked, one_shot)
+
+
+@pytest.mark.parametrize("input_rate,output_rate", RATES)
+def test_matches_resample_poly_across_frame_boundaries(input_rate, output_rate):
+    rng = np.random.default_rng(25)
+    # Quiet enough that neither side clips
+    samples = rng.integers(-8000, 8000, input_rate).astype(np.int16)
+
+    resampler = StreamingResampler(input_rate, output_rate)
+    streamed = np.concatenate([resampler.process(frame) for frame in np.array_split(samples, 50)])
+    expected = np.round(resample_poly(samples.astype(np.float64), resampler.up, resampler.down))
+
+    # Streamed output lags by half the filter length
+    delay = 10 * max(resampler.up, resampler.down) // resampler.down
+    assert len(streamed) == len(samples) * output_rate // input_rate
+    assert np.array_equal(streamed[delay:], expected[:len(streamed) - delay])
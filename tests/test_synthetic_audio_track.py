@@ -0,0 +1,72 @@
+import asyncio
+import tracemalloc
+import numpy as np
+from lib.webrtc.MediaClock import MediaClock
+from lib.webrtc.SyntheticAudioTrack import SyntheticAudioTrack
+
+FRAME_BYTES = 960 * 2 * 2  # One 20ms stereo int16 frame
+
+
+def traced_peak(prepare, frames):
+    # Peak traced allocation while preparing frames, above what was live before
+    tracemalloc.start()
+    try:
+        base, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        for _ in range(frames):
+            prepare()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak - base
+
+
+def test_prepare_frame_does_not_allocate_frames():
+    async def run():
+        track = SyntheticAudioTrack(media_clock=MediaClock())
+        track.on("is_speaking_sentence", lambda sentence_id: None)
+        track.enqueue_audio_samples((np.arange(48000 * 9) % 2000 - 1000).astype(np.int16), "sentence")
+        pooled = {id(pooled_frame[0]) for pooled_frame in track.frame_pool}
+        sent = set()
+
+        def prepare():
+            sent.add(id(track.prepare_frame(0, 0)))
+
+        # Warm up, then 8 seconds of speech and 8 seconds of silence
+        for _ in range(10):
+            prepare()
+        speech_peak = traced_peak(prepare, 400)
+        track.flush()
+        for _ in range(10):
+            prepare()
+        silence_peak = traced_peak(prepare, 400)
+        return speech_peak, silence_peak, sent <= pooled
+
+    speech_peak, silence_peak, only_pooled = asyncio.run(run())
+    # A fresh frame or sample buffer per frame would be at least FRAME_BYTES on its own
+    assert speech_peak < FRAME_BYTES // 2
+    assert silence_peak < FRAME_BYTES // 2
+    assert only_pooled
+
+
+def test_sentences_survive_buffer_growth():
+    async def run():
+        track = SyntheticAudioTrack(media_clock=MediaClock())
+        sentences, gaps = [], []
+        track.on("is_speaking_sentence", sentences.append)
+        track.on("sentence_gap", gaps.append)
+        first = (np.arange(48000 * 7) % 3000).astype(np.int16)
+        second = (np.arange(48000 * 7) % 2000 + 5000).astype(np.int16)
+
+        # Two seconds in, 12s is queued - more than the 10s the buffer started with
+        track.enqueue_audio_samples(first, "first")
+        played = [track.prepare_frame(0, 0).to_ndarray().reshape(-1)[0::2].copy() for _ in range(100)]
+        track.enqueue_audio_samples(second, "second")
+        played += [track.prepare_frame(0, 0).to_ndarray().reshape(-1)[0::2].copy() for _ in range(600)]
+        return sentences, gaps, np.concatenate(played), track.audio.samples.capacity, first, second
+
+    sentences, gaps, played, capacity, first, second = asyncio.run(run())
+    assert capacity > 48000 * 10
+    assert sentences == ["first", "second"]
+    assert gaps == [0]
+    assert np.array_equal(played, np.concatenate((first, second)))
@@ -0,0 +1,95 @@
+import asyncio
+import json
+import random
+from models.TokenStreamingService import TokenStreamingService
+
+
+def token_message(token, response_id):
+    return json.dumps({"method": "on_token", "params": {"token": token, "response_id": response_id}, "id": None})
+
+
+def tool_call_message(call_id):
+    return json.dumps({"method": "on_tool_call", "params": {"call_id": call_id, "tool_name": "lookup", "tool_input": {}}, "id": None})
+
+
+def merge_token_events(events):
+    # Batch boundaries depend on when the dispatcher wakes up - only the order of what's delivered matters
+    merged = []
+    for event in events:
+        if event[0] == "tokens" and merged and merged[-1][0] == "tokens" and merged[-1][2] == event[2]:
+            merged[-1] = ("tokens", merged[-1][1] + event[1], event[2])
+        else:
+            merged.append(event)
+    return merged
+
+
+async def start_service(events):
+    service = TokenStreamingService("ws://unused", "context")
+
+    async def on_tokens(tokens, response_id):
+        events.append(("tokens", "".join(tokens), response_id))
+
+    async def on_tool_call(call_id, tool_name, tool_input):
+        events.append(("tool_call", call_id))
+    service.on("tokens", on_tokens)
+    service.on("tool_call", on_tool_call)
+
+    async def sender(message):
+        pass
+    service.start_dispatch(sender)
+    return service
+
+
+def test_token_batches_keep_order_with_tool_calls():
+    rng = random.Random(15)
+    messages, expected = [], []
+    for index in range(3000):
+        if rng.random() < 0.05:
+            messages.append(tool_call_message(f"call-{index}"))
+            expected.append(("tool_call", f"call-{index}"))
+        else:
+            response_id = f"response-{index // 500}"
+            token = f"t{index} "
+            messages.append(token_message(token, response_id))
+            expected.append(("tokens", token, response_id))
+
+    async def run():
+        events = []
+        service = await start_service(events)
+        # Messages arrive in bursts of random size, like socket reads
+        for message in messages:
+            await service.receive_message(message)
+            if rng.random() < 0.1:
+                await asyncio.sleep(0)
+        await asyncio.sleep(0.01)
+        service.close()
+        return events
+
+    events = asyncio.run(run())
+    assert any(len(event[1].split()) > 1 for event in events if event[0] == "tokens")  # Tokens were batched
+    assert merge_token_events(events) == merge_token_events(expected)
+
+
+def test_rpc_reply_resolves_before_later_tokens_are_delivered():
+    async def run():
+        service = await start_service([])
+        response = await service.rpc_layer.request("connect_to_context", {"context_id": "context"})
+        reply_id, reply_future = next(iter(service.rpc_layer.response_queue.items()))
+
+        # Each batch notes whether the reply had been resolved when the batch was delivered
+        seen = []
+
+        async def on_tokens(tokens, response_id):
+            seen.append(("".join(tokens), reply_future.done()))
+        service.on("tokens", on_tokens)
+
+        for message in [token_message("before ", "r"), json.dumps({"id": reply_id, "result": {"ok": True}}), token_message("after", "r")]:
+            await service.receive_message(message)
+        result = await response
+        await asyncio.sleep(0.01)
+        service.close()
+        return seen, result
+
+    seen, result = asyncio.run(run())
+    assert seen == [("before ", False), ("after", True)]
+    assert result == {"ok": True}
@@ -0,0 +1,73 @@
+import asyncio
+import time
+import uuid
+import numpy as np
+import websockets
+from models.TranscriptionService import TranscriptionService
+from transcription_stand_in import TranscriptionStandIn
+
+
+async def connect_service(url):
+    service = TranscriptionService(url)
+
+    async def on_connection_status(status):
+        pass
+    service.on("connection_status", on_connection_status)
+    await service.connect()
+    return service
+
+
+def test_server_that_never_negotiates_does_not_delay_audio():
+    async def run():
+        stand_in = TranscriptionStandIn(negotiates=False)
+        server = await websockets.serve(stand_in.handle_connection, "localhost", 0)
+        url = f"ws://localhost:{server.sockets[0].getsockname()[1]}"
+
+        start = time.monotonic()
+        service = await connect_service(url)
+        id = str(uuid.uuid4())
+        await service.add_audio_data(id, np.arange(320, dtype=np.int16), 16000)
+        result = await service.finalize_transcription(id, 16000)
+        seconds = time.monotonic() - start
+        service.close()
+        server.close()
+        return seconds, service.audio_framing, result, stand_in.finished[id]
+
+    seconds, framing, result, finished = asyncio.run(run())
+    assert seconds < 1  # Well under the 2s negotiation timeout
+    assert framing == "json"
+    assert "0 lost frames" in result
+    assert np.array_equal(finished["audio"], np.arange(320))
+
+
+def test_stream_started_before_negotiation_stays_on_json():
+    async def run():
+        stand_in = TranscriptionStandIn(framings=("binary", "json"))
+        server = await websockets.serve(stand_in.handle_connection, "localhost", 0)
+        url = f"ws://localhost:{server.sockets[0].getsockname()[1]}"
+        service = await connect_service(url)
+
+        # The first frame goes out before the negotiation reply is back
+        early, late = str(uuid.uuid4()), str(uuid.uuid4())
+        await service.add_audio_data(early, np.full(320, 1, dtype=np.int16), 16000)
+        await service.negotiation_task
+        await service.add_audio_data(early, np.full(320, 2, dtype=np.int16), 16000)
+        await service.add_audio_data(late, np.full(320, 3, dtype=np.int16), 16000)
+        framings = ("json" if early in service.json_ids else "binary", "binary" if late in service.sequence_numbers else "json")
+        await service.finalize_transcription(early, 16000)
+        await service.finalize_transcription(late, 16000)
+
+        # Later connections to the same server start on the framing it agreed to
+        reconnected = await connect_service(url)
+        reconnected_framing = reconnected.audio_framing
+        service.close()
+        reconnected.close()
+        server.close()
+        return framings, stand_in.finished[early], service.json_ids, reconnected_framing
+
+    framings, early_result, json_ids, reconnected_framing = asyncio.run(run())
+    assert framings == ("json", "binary")
+    assert early_result["lost_frames"] == 0
+    assert np.array_equal(early_result["audio"], np.repeat([1, 2], 320))
+    assert json_ids == set()
+    assert reconnected_framing == "binary"
@@ -0,0 +1,151 @@
+import asyncio
+import uuid
+import numpy as np
+import websockets
+from models.SpeechToText import SpeechToText
+from models.TranscriptionService import TranscriptionService
+from models.TranscriptionServicePool import TranscriptionServicePool
+from transcription_stand_in import TranscriptionStandIn
+
+
+async def start_stand_in(framings=("binary", "json")):
+    stand_in = TranscriptionStandIn(framings=framings)
+    server = await websockets.serve(stand_in.handle_connection, "localhost", 0)
+    port = server.sockets[0].getsockname()[1]
+    return stand_in, server, f"ws://localhost:{port}"
+
+
+def record_statuses(stream):
+    statuses = []
+
+    async def on_connection_status(status):
+        statuses.append(status)
+    stream.on("connection_status", on_connection_status)
+    return statuses
+
+
+async def wait_for(condition, timeout=2):
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+
+
+def test_late_stream_hears_connected():
+    async def run():
+        stand_in, server, url = await start_stand_in()
+        pool = TranscriptionServicePool(url, pool_size=1)
+        first = pool.open_stream()
+        first_statuses = record_statuses(first)
+        await pool.connections[0].get_service()
+        await wait_for(lambda: first_statuses)
+
+        # Joins after the shared connection is already up
+        second = pool.open_stream()
+        second_statuses = record_statuses(second)
+        await wait_for(lambda: second_statuses)
+
+        first.close()
+        second.close()
+        pool.close()
+        server.close()
+        return first_statuses, second_statuses
+
+    first_statuses, second_statuses = asyncio.run(run())
+    assert first_statuses == ["connected"]
+    assert second_statuses == ["connected"]
+
+
+def test_close_cancels_open_transcription():
+    async def run():
+        stand_in, server, url = await start_stand_in()
+        speech_to_text = SpeechToText(url)
+        await speech_to_text.connect()
+        record_statuses(speech_to_text.transcription_service)
+        pool = TranscriptionServicePool.for_url(url)
+        service = await pool.connections[0].get_service()
+        await service.negotiation_task
+
+        async def on_is_speaking_status(is_speaking):
+            pass
+        speech_to_text.on("is_speaking_status", on_is_speaking_status)
+
+        # Caller starts talking
+        loud = (8000 * np.sin(np.arange(960) / 3)).astype(np.int16)
+        await speech_to_text.add_audio_data(loud, 48000)
+        id = speech_to_text.current_transcribe_id
+        await wait_for(lambda: id in stand_in.streams)
+        assert service.sequence_numbers == {id: 1}
+
+        # Peer hangs up mid utterance
+        speech_to_text.close()
+        await wait_for(lambda: not stand_in.streams)
+        result = dict(service.sequence_numbers), dict(stand_in.streams), speech_to_text.transcription_service.drain_task.done()
+        pool.close()
+        server.close()
+        return result
+
+    sequence_numbers, server_streams, drain_done = asyncio.run(run())
+    assert sequence_numbers == {}
+    assert server_streams == {}
+    assert drain_done
+
+
+def test_dropped_frames_leave_a_sequence_gap():
+    async def run():
+        stand_in, server, url = await start_stand_in()
+        # Sequence numbers only exist on binary framing - the server agreed to it on an earlier connection
+        TranscriptionService.negotiated_framings[url] = "binary"
+        pool = TranscriptionServicePool(url, pool_size=1)
+        stream = pool.open_stream()
+        record_statuses(stream)
+        stream.max_pending_frames = 5
+
+        # Queue faster than the not yet connected stream can send, so the oldest frames are dropped
+        id = str(uuid.uuid4())
+        for i in range(8):
+            await stream.add_audio_data(id, np.full(320, i, dtype=np.int16), 16000)
+        text = await stream.finalize_transcription(id, 16000)
+        stream.close()
+        pool.close()
+        server.close()
+        return stream.dropped_audio_frames, stand_in.finished[id], text
+
+    dropped, result, text = asyncio.run(run())
+    assert dropped == 3
+    assert result["lost_frames"] == 3
+    # The frames that did arrive are the newest ones
+    assert np.array_equal(result["audio"], np.repeat(np.arange(3, 8), 320))
+    assert "3 lost frames" in text
+
+
+def test_close_releases_abandoned_opus_encoders():
+    async def run():
+        stand_in, server, url = await start_stand_in(framings=("opus", "binary", "json"))
+        pool = TranscriptionServicePool(url, pool_size=1, opus_audio=True)
+        stream = pool.open_stream()
+        record_statuses(stream)
+        service = await pool.connections[0].get_service()
+        await service.negotiation_task
+
+        # One transcription is finalized, the other is abandoned mid utterance
+        finalized, abandoned = str(uuid.uuid4()), str(uuid.uuid4())
+        for id in (finalized, abandoned):
+            for _ in range(3):
+                await stream.add_audio_data(id, np.zeros(320, dtype=np.int16), 16000)
+        await stream.finalize_transcription(finalized, 16000)
+        await wait_for(lambda: abandoned in service.opus_encoders)
+        encoders_before_close = set(service.opus_encoders)
+
+        stream.close()
+        await wait_for(lambda: not service.opus_encoders and not stand_in.streams)
+        result = encoders_before_close == {abandoned}, dict(service.opus_encoders), dict(service.sequence_numbers), dict(stand_in.streams)
+        pool.close()
+        server.close()
+        return result
+
+    only_abandoned_open, encoders, sequence_numbers, server_streams = asyncio.run(run())
+    assert only_abandoned_open
+    assert encoders == {}
+    assert sequence_numbers == {}
+    assert server_streams == {}